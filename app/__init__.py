@@ -2,33 +2,79 @@ from flask import Flask
 from flask_sqlalchemy import SQLAlchemy
 from flask_migrate import Migrate
 from flask_login import LoginManager
-import os
 
-db = SQLAlchemy()
+from .routing import RoutingSession
+
+db = SQLAlchemy(session_options={"class_": RoutingSession})
 migrate = Migrate()
 login_manager = LoginManager()
 
-def create_app():
+def create_app(config=None):
     app = Flask(__name__, template_folder='templates', static_folder='static')
 
-    app.config['SECRET_KEY'] = "CHANGE_IT_LATER"
-    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///BUGTRACKER.db'
-    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    app.config.from_object("config.Config")
+    # optional deployment overrides, e.g. BUGTRACKER_SETTINGS=/etc/bugtracker.cfg
+    app.config.from_envvar("BUGTRACKER_SETTINGS", silent=True)
+    if config:
+        app.config.from_mapping(config)
+
+    from .database import engine_options, tune_sqlite
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options(app.config)
+
+    from . import routing
+    routing.init_app(app)
 
     db.init_app(app)
+    with app.app_context():
+        for engine in db.engines.values():
+            tune_sqlite(engine, app.config)
     login_manager.init_app(app)
     migrate.init_app(app, db)
 
     login_manager.login_view = "main.login"
 
+    from . import identity
+    identity.init_app(app, login_manager)
+
+    from .passwords import passwords
+    passwords.init_app(app)
+
+    from . import assignees
+    assignees.init_app(app)
+
+    from . import my_issues
+    my_issues.init_app(app)
+
+    from .jobs import jobs
+    jobs.init_app(app)
+
+    from .search import search
+    search.init_app(app)
+
+    from .events import events
+    events.init_app(app)
+
+    from .fragments import fragments
+    fragments.init_app(app)
+
     from .routes import main
     from . import models
     app.register_blueprint(main)
 
-    return app
+    from .api import api
+    app.register_blueprint(api)
+    # API clients get a 401 instead of a redirect to the login form
+    login_manager.blueprint_login_views["api"] = None
 
-from .models import User
+    from . import metrics
+    metrics.init_app(app)
+
+    # after metrics, so the requests it turns away are still measured
+    from .ratelimit import limiter
+    limiter.init_app(app)
+
+    from .commands import register_commands
+    register_commands(app)
+
+    return app
 
-@login_manager.user_loader
-def load_user(user_id):
-    return User.query.get(int(user_id))
@@ -0,0 +1,103 @@
+# app/access.py
+from collections import namedtuple
+from functools import wraps
+
+from flask import abort, flash, g, redirect, url_for
+from flask_login import current_user
+from sqlalchemy import and_
+
+from . import db
+from .cache import TTLCache
+from .models import Issue, Project, ProjectMember
+
+
+class ProjectAccess(namedtuple("ProjectAccess", "project_id owner_id role")):
+    """What one user may do in one project. role is None for non-members."""
+
+    def is_owner(self, user_id):
+        return self.owner_id == user_id
+
+    def allows(self, user_id):
+        return self.role is not None or self.is_owner(user_id)
+
+
+# (user_id, project_id) -> ProjectAccess, shared across requests in this
+# process. Only access that is allowed is cached: invalidation reaches this
+# process alone, and a user just added must not be turned away by the others
+_access = TTLCache(maxsize=8192, ttl=300)
+# issue_id -> project_id; issues never move between projects
+_issue_projects = TTLCache(maxsize=16384, ttl=3600)
+
+
+def _load_access(user_id, project_id):
+    row = (
+        db.session.query(Project.owner_id, ProjectMember.role)
+        .outerjoin(ProjectMember, and_(ProjectMember.project_id == Project.id, ProjectMember.user_id == user_id))
+        .filter(Project.id == project_id)
+        .first()
+    )
+    if row is None:
+        return None
+    return ProjectAccess(project_id, row.owner_id, row.role)
+
+
+def project_access(user_id, project_id):
+    """Return the user's ProjectAccess, or None if the project does not exist.
+
+    Memoized for the rest of the request on g, and, when it lets the user
+    in, across requests in a bounded TTL cache that membership changes
+    invalidate.
+    """
+    memo = g.setdefault("_project_access", {})
+    key = (user_id, project_id)
+    if key not in memo:
+        access = _access.get(key)
+        if access is None:
+            access = _load_access(user_id, project_id)
+            if access is not None and access.allows(user_id):
+                _access.set(key, access)
+        memo[key] = access
+    return memo[key]
+
+
+def invalidate_project_access(project_id, user_id=None):
+    if user_id is None:
+        _access.delete_where(lambda key: key[1] == project_id)
+    else:
+        _access.delete((user_id, project_id))
+    g.pop("_project_access", None)
+
+
+def issue_project_id(issue_id):
+    project_id = _issue_projects.get(issue_id)
+    if project_id is None:
+        project_id = db.session.query(Issue.project_id).filter(Issue.id == issue_id).scalar()
+        if project_id is None:
+            abort(404)
+        _issue_projects.set(issue_id, project_id)
+    return project_id
+
+
+def require_project_access(view):
+    """Only let project owners and members through to a project-scoped view.
+
+    The project comes from the view's project_id argument, or from the
+    issue_id argument for issue views. The user's ProjectAccess is left on
+    g.project_access for the view to use. Goes below @login_required.
+    """
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        project_id = kwargs.get("project_id")
+        if project_id is None:
+            project_id = issue_project_id(kwargs["issue_id"])
+
+        access = project_access(current_user.id, project_id)
+        if access is None:
+            abort(404)
+        if not access.allows(current_user.id):
+            flash("You do not have access to this project.", "error")
+            return redirect(url_for("main.dashboard"))
+
+        g.project_access = access
+        return view(*args, **kwargs)
+    return wrapper
@@ -0,0 +1,78 @@
+# app/activity.py
+from sqlalchemy import delete, insert, select, union_all
+
+from . import db
+from .models import Activity, ActivityArchive, User
+
+# the live table first; ids never overlap, since archiving moves rows with their ids
+SOURCES = (Activity, ActivityArchive)
+
+
+def columns(model):
+    return (
+        model.id, model.issue_id, model.user_id, model.action, model.detail,
+        model.field, model.old_value, model.new_value, model.created_at,
+    )
+
+
+def activity_log():
+    """Live and archived activity as one subquery, with Activity's column names.
+
+    Filter it like a table; both databases push the conditions down into
+    each side, so each still uses its own indexes.
+    """
+    return union_all(*(select(*columns(model)) for model in SOURCES)).subquery("activity_log")
+
+
+def issue_activity(issue_id, after_id=0, limit=50):
+    """Up to limit of an issue's activity rows after after_id, live or archived,
+    oldest first, each with its user's username."""
+    branches = [
+        select(
+            select(*columns(model))
+            .where(model.issue_id == issue_id, model.id > after_id)
+            .order_by(model.id)
+            .limit(limit)
+            .subquery()
+        )
+        for model in SOURCES
+    ]
+    merged = union_all(*branches).subquery()
+    return db.session.execute(
+        select(merged, User.username)
+        .outerjoin(User, merged.c.user_id == User.id)
+        .order_by(merged.c.id)
+        .limit(limit)
+    ).all()
+
+
+def archive(before, batch_size=1000):
+    """Move activity created before `before` into activity_archive.
+
+    Every row moves, whatever its action, so the API and exports, which
+    read both tables, show the same history afterwards. Works through the
+    oldest rows batch_size at a time, one transaction per batch, so the
+    activity table is never locked for long and an interrupted run just
+    leaves less to do. Returns how many rows moved.
+    """
+    archived = 0
+    names = [column.key for column in columns(ActivityArchive)]
+    while True:
+        ids = db.session.scalars(
+            select(Activity.id).where(Activity.created_at < before).order_by(Activity.id).limit(batch_size)
+        ).all()
+        if not ids:
+            return archived
+        db.session.execute(
+            insert(ActivityArchive).from_select(names, select(*columns(Activity)).where(Activity.id.in_(ids)))
+        )
+        db.session.execute(delete(Activity).where(Activity.id.in_(ids)))
+        db.session.commit()
+        archived += len(ids)
+
+
+def prune(before):
+    """Delete archived activity created before `before`, returning how many rows went."""
+    result = db.session.execute(delete(ActivityArchive).where(ActivityArchive.created_at < before))
+    db.session.commit()
+    return result.rowcount
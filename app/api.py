@@ -0,0 +1,284 @@
+# app/api.py
+import hashlib
+from datetime import timezone
+
+from flask import Blueprint, Response, abort, g, jsonify, request, url_for
+from flask_login import current_user, login_required
+from sqlalchemy import func, select
+from werkzeug.exceptions import HTTPException
+
+from . import counters, db, history
+from .access import issue_project_id, project_access
+from .activity import issue_activity as activity_rows
+from .filters import filter_issues, issue_filters
+from .loaders import ISSUE_LIST
+from .models import IST, Comment, Issue, Project, ProjectMember, User
+from .pagination import KeysetPagination
+from .querycount import query_budget
+
+api = Blueprint("api", __name__, url_prefix="/api/v1")
+
+DEFAULT_LIMIT = 50
+MAX_LIMIT = 200
+
+
+def _iso(value):
+    return value.isoformat() if value is not None else None
+
+
+def _user(user):
+    return {"id": user.id, "username": user.username} if user is not None else None
+
+
+ISSUE_FIELDS = {
+    "id": lambda issue: issue.id,
+    "project_id": lambda issue: issue.project_id,
+    "title": lambda issue: issue.title,
+    "description": lambda issue: issue.description,
+    "status": lambda issue: issue.status,
+    "priority": lambda issue: issue.priority,
+    "reporter": lambda issue: _user(issue.reporter),
+    "assignee": lambda issue: _user(issue.assignee),
+    "created_at": lambda issue: _iso(issue.created_at),
+    "updated_at": lambda issue: _iso(issue.updated_at),
+    "due_date": lambda issue: _iso(issue.due_date),
+    "url": lambda issue: url_for("api.issue", issue_id=issue.id, _external=True),
+}
+
+
+@api.errorhandler(HTTPException)
+def _json_error(error):
+    response = jsonify(error=error.name, message=error.description)
+    response.status_code = error.code
+    # keep headers the error carries, such as Retry-After on a 429 or 503
+    for name, value in error.get_headers():
+        if name.lower() != "content-type":
+            response.headers.add(name, value)
+    return response
+
+
+def _require_project(project_id):
+    access = project_access(current_user.id, project_id)
+    if access is None:
+        abort(404)
+    if not access.allows(current_user.id):
+        abort(403, "You do not have access to this project.")
+    g.project_access = access
+
+
+def _fields():
+    """The issue fields asked for with ?fields=a,b, in ISSUE_FIELDS order; all by default."""
+    raw = request.args.get("fields")
+    if not raw:
+        return tuple(ISSUE_FIELDS)
+    wanted = {name.strip() for name in raw.split(",") if name.strip()}
+    unknown = wanted - ISSUE_FIELDS.keys()
+    if unknown:
+        abort(400, f"Unknown fields: {', '.join(sorted(unknown))}.")
+    return tuple(name for name in ISSUE_FIELDS if name in wanted)
+
+
+def _limit():
+    return max(1, min(request.args.get("limit", DEFAULT_LIMIT, type=int), MAX_LIMIT))
+
+
+def _validators(*parts, last_modified=None):
+    """An ETag over the response's inputs and the Last-Modified to send with it.
+
+    parts must pin down everything the body depends on: the request args
+    and a cheap fingerprint of the rows, such as their newest updated_at.
+    """
+    digest = hashlib.sha1(repr((request.path, sorted(request.args.items(multi=True)), parts)).encode())
+    if last_modified is not None:
+        if last_modified.tzinfo is None:
+            # SQLite returns IST wall time without the zone
+            last_modified = last_modified.replace(tzinfo=IST)
+        last_modified = last_modified.astimezone(timezone.utc).replace(microsecond=0)
+    return digest.hexdigest(), last_modified
+
+
+def _not_modified(etag, last_modified, check_since):
+    if request.if_none_match:
+        return request.if_none_match.contains(etag)
+    since = request.if_modified_since
+    return check_since and since is not None and last_modified is not None and last_modified <= since
+
+
+def _conditional(etag, last_modified, build, check_since=True):
+    """304 if the client's copy is current, else build() as JSON. Either way with validators.
+
+    Pass check_since=False when last_modified alone cannot tell that the
+    body changed (a list an issue has just been filtered out of), so only
+    the ETag decides.
+    """
+    if _not_modified(etag, last_modified, check_since):
+        response = Response(status=304)
+    else:
+        response = jsonify(build())
+    response.set_etag(etag)
+    if last_modified is not None:
+        response.last_modified = last_modified
+    # let clients keep the body but always revalidate it
+    response.cache_control.private = True
+    response.cache_control.no_cache = True
+    return response
+
+
+@api.route("/projects")
+@login_required
+@query_budget(3)
+def projects():
+    rows = (
+        Project.query
+        .join(ProjectMember)
+        .filter(ProjectMember.user_id == current_user.id)
+        .order_by(Project.created_at.desc())
+        .all()
+    )
+    summaries = counters.project_summaries([project.id for project in rows])
+    body = {"items": [_project(project, summaries[project.id]) for project in rows]}
+    etag, _ = _validators(body)
+    return _conditional(etag, None, lambda: body)
+
+
+def _project(project, summary):
+    return {
+        "id": project.id,
+        "name": project.name,
+        "description": project.description,
+        "owner_id": project.owner_id,
+        "created_at": _iso(project.created_at),
+        "issues": summary,
+        "issues_url": url_for("api.project_issues", project_id=project.id, _external=True),
+    }
+
+
+@api.route("/projects/<int:project_id>")
+@login_required
+@query_budget(3)
+def project(project_id):
+    _require_project(project_id)
+    project = db.get_or_404(Project, project_id)
+    body = _project(project, counters.project_summaries([project_id])[project_id])
+    etag, _ = _validators(body)
+    return _conditional(etag, None, lambda: body)
+
+
+@api.route("/projects/<int:project_id>/issues")
+@login_required
+@query_budget(4)
+def project_issues(project_id):
+    """Issues newest first, filtered like the issue list, in pages of ?limit.
+
+    With q only matching issues are returned, still newest first, so that
+    the cursors stay stable.
+    """
+    _require_project(project_id)
+    filters = issue_filters(request.args)
+    fields = _fields()
+    limit = _limit()
+
+    query = filter_issues(Issue.query.filter(Issue.project_id == project_id), filters).order_by(None)
+    newest, total = query.with_entities(func.max(Issue.updated_at), func.count(Issue.id)).one()
+    etag, last_modified = _validators(newest, total, last_modified=newest)
+
+    def build():
+        page = KeysetPagination(query.options(*ISSUE_LIST), cursor=request.args.get("cursor"), per_page=limit)
+        return {
+            "items": [{name: ISSUE_FIELDS[name](issue) for name in fields} for issue in page.items],
+            "total": total,
+            "next_cursor": page.next_cursor,
+            "prev_cursor": page.prev_cursor,
+        }
+
+    return _conditional(etag, last_modified, build, check_since=False)
+
+
+def _issue_version(issue_id):
+    """An issue's updated_at, after checking access to its project."""
+    project_id = issue_project_id(issue_id)
+    _require_project(project_id)
+    return db.session.execute(select(Issue.updated_at).where(Issue.id == issue_id)).scalar_one()
+
+
+@api.route("/issues/<int:issue_id>")
+@login_required
+@query_budget(4)
+def issue(issue_id):
+    updated_at = _issue_version(issue_id)
+    fields = _fields()
+    etag, last_modified = _validators(updated_at, last_modified=updated_at)
+
+    def build():
+        issue = Issue.query.options(*ISSUE_LIST).get_or_404(issue_id)
+        body = {name: ISSUE_FIELDS[name](issue) for name in fields}
+        body["comments_url"] = url_for("api.issue_comments", issue_id=issue_id, _external=True)
+        body["activity_url"] = url_for("api.issue_activity", issue_id=issue_id, _external=True)
+        return body
+
+    return _conditional(etag, last_modified, build)
+
+
+def _timeline(fetch, issue_id, serialize):
+    """A page of an issue's comments or activity, oldest first, after ?cursor (an id).
+
+    fetch(issue_id, after, limit) returns up to limit rows for serialize.
+    """
+    updated_at = _issue_version(issue_id)
+    limit = _limit()
+    after = request.args.get("cursor", 0, type=int)
+    etag, last_modified = _validators(updated_at, last_modified=updated_at)
+
+    def build():
+        rows = fetch(issue_id, after, limit + 1)
+        items = serialize(rows[:limit])
+        return {
+            "items": items,
+            "next_cursor": str(items[-1]["id"]) if len(rows) > limit else None,
+        }
+
+    return _conditional(etag, last_modified, build)
+
+
+def _fetch_comments(issue_id, after, limit):
+    return db.session.execute(
+        select(Comment, User.username)
+        .outerjoin(User, Comment.user_id == User.id)
+        .where(Comment.issue_id == issue_id, Comment.id > after)
+        .order_by(Comment.id)
+        .limit(limit)
+    ).all()
+
+
+@api.route("/issues/<int:issue_id>/comments")
+@login_required
+@query_budget(4)
+def issue_comments(issue_id):
+    return _timeline(_fetch_comments, issue_id, lambda rows: [{
+        "id": comment.id,
+        "user": {"id": comment.user_id, "username": username},
+        "content": comment.content,
+        "created_at": _iso(comment.created_at),
+    } for comment, username in rows])
+
+
+@api.route("/issues/<int:issue_id>/activity")
+@login_required
+@query_budget(5)
+def issue_activity(issue_id):
+    """Live and archived activity alike. An "Updated" entry also carries the
+    changed field with its old and new values as stored."""
+    def serialize(rows):
+        names = history.usernames(history.assignee_ids(rows))
+        return [{
+            "id": row.id,
+            "user": {"id": row.user_id, "username": row.username} if row.user_id else None,
+            "action": row.action,
+            "detail": history.activity_detail(row.detail, row.field, row.old_value, row.new_value, names),
+            "field": row.field,
+            "old_value": row.old_value,
+            "new_value": row.new_value,
+            "created_at": _iso(row.created_at),
+        } for row in rows]
+
+    return _timeline(activity_rows, issue_id, serialize)
@@ -0,0 +1,92 @@
+# app/assignees.py
+from collections import namedtuple
+
+from flask import current_app
+from sqlalchemy import event, func, inspect, select
+
+from . import db
+from .cache import TTLCache
+from .models import ProjectMember, User
+
+Member = namedtuple("Member", "id username")
+
+
+class MemberList(namedtuple("MemberList", "members by_id truncated")):
+    """A project's assignable users for a picker.
+
+    members is empty and truncated is True when the project has more than
+    ASSIGNEE_SELECT_LIMIT of them; the picker then searches as you type.
+    """
+
+    def username(self, user_id):
+        member = self.by_id.get(user_id)
+        return member.username if member is not None else None
+
+
+# project_id -> tuple of Member, username order
+_members = TTLCache(maxsize=1024, ttl=600)
+
+
+def project_members(project_id):
+    """Every member of the project, cached until membership changes."""
+    members = _members.get(project_id)
+    if members is None:
+        rows = db.session.execute(
+            select(User.id, User.username)
+            .join(ProjectMember, ProjectMember.user_id == User.id)
+            .where(ProjectMember.project_id == project_id)
+            .order_by(User.username)
+        )
+        members = tuple(Member(*row) for row in rows)
+        _members.set(project_id, members)
+    return members
+
+
+def member_list(project_id):
+    members = project_members(project_id)
+    by_id = {member.id: member for member in members}
+    if len(members) > current_app.config["ASSIGNEE_SELECT_LIMIT"]:
+        return MemberList((), by_id, True)
+    return MemberList(members, by_id, False)
+
+
+def invalidate_project_members(project_id=None):
+    if project_id is None:
+        _members.clear()
+    else:
+        _members.delete(project_id)
+
+
+def _prefix_end(prefix):
+    # smallest string greater than every string starting with prefix
+    return prefix[:-1] + chr(ord(prefix[-1]) + 1)
+
+
+def search_members(project_id, prefix, limit=20):
+    """Members whose username starts with prefix, case-insensitively.
+
+    A range on lower(username) rather than LIKE, so both SQLite and
+    PostgreSQL walk the ix_user_username_lower index.
+    """
+    prefix = prefix.strip().lower()
+    if not prefix:
+        return []
+    username = func.lower(User.username)
+    rows = db.session.execute(
+        select(User.id, User.username)
+        .join(ProjectMember, ProjectMember.user_id == User.id)
+        .where(ProjectMember.project_id == project_id, username >= prefix, username < _prefix_end(prefix))
+        .order_by(username)
+        .limit(limit)
+    )
+    return [Member(*row) for row in rows]
+
+
+@event.listens_for(User, "after_update")
+def _user_renamed(mapper, connection, user):
+    if inspect(user).attrs.username.history.has_changes():
+        invalidate_project_members()
+
+
+def init_app(app):
+    app.config.setdefault("ASSIGNEE_SELECT_LIMIT", 200)
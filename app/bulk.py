@@ -0,0 +1,94 @@
+# app/bulk.py
+from sqlalchemy import insert, or_, select, tuple_, update
+
+from . import counters, db, history
+from .edits import ATTEMPTS
+from .events import activity_event, queue_event, streams_enabled
+from .fragments import touch_issues
+from .identity import load_identity
+from .my_issues import touch_assignees
+from .models import Activity, Issue, ist_now
+
+
+def bulk_update(project_id, issue_ids, values, user_id, is_owner):
+    """Set the same status/priority/assignee_id values on many issues of a project.
+
+    One SELECT reads the current values, one UPDATE writes every issue that
+    actually changes, and one batched INSERT adds the same "Updated"
+    activity rows a single edit would produce. Owners may change any
+    issue; other members only issues they reported or are assigned to.
+    Runs in the caller's transaction. Returns the ids of the changed issues.
+
+    The SELECT locks the rows where the database can (PostgreSQL). Where it
+    cannot, the UPDATE only writes rows still at the version it read, like
+    a single edit does; rows another edit changed in between are read again
+    and retried, so activity and counters start from the values replaced.
+    """
+    query = select(
+        Issue.id, Issue.project_id, Issue.status, Issue.priority, Issue.assignee_id, Issue.version
+    ).where(Issue.project_id == project_id, Issue.id.in_(issue_ids)).with_for_update()
+    if not is_owner:
+        query = query.where(or_(Issue.reporter_id == user_id, Issue.assignee_id == user_id))
+    rows = db.session.execute(query).all()
+
+    now = ist_now()
+    changed, activities, moves = [], [], []
+    assignees = {values.get("assignee_id")}
+    for _ in range(ATTEMPTS):
+        planned = {}
+        for row in rows:
+            changes = history.diff(row._asdict(), values)
+            if changes:
+                planned[row.id] = (row, changes)
+        if not planned:
+            break
+        # Core skips version_id_col, so check and bump it here
+        updated = set(db.session.scalars(
+            update(Issue)
+            .where(tuple_(Issue.id, Issue.version).in_([(row.id, row.version) for row, _ in planned.values()]))
+            .values(**values, updated_at=now, version=Issue.version + 1)
+            .returning(Issue.id)
+            .execution_options(synchronize_session=False)
+        ))
+        for issue_id in updated:
+            row, changes = planned[issue_id]
+            changed.append(row.id)
+            assignees.add(row.assignee_id)
+            activities += history.change_rows(row.id, user_id, changes, created_at=now)
+            after = {**row._asdict(), **values}
+            moves.append((
+                counters.bucket(row.project_id, row.status, row.priority, row.assignee_id),
+                counters.bucket(row.project_id, after["status"], after["priority"], after["assignee_id"]),
+            ))
+        stale = planned.keys() - updated
+        if not stale:
+            break
+        rows = db.session.execute(query.where(Issue.id.in_(stale))).all()
+
+    if changed:
+        # one multi-row INSERT; asking for the ids in parameter order would
+        # make SQLite insert row by row, so map them back by (issue, field),
+        # which is unique within one bulk update
+        activity_ids = {
+            (issue_id, field): activity_id
+            for activity_id, issue_id, field in db.session.execute(
+                insert(Activity).returning(Activity.id, Activity.issue_id, Activity.field), activities
+            )
+        }
+        counters.issues_moved(moves)
+
+        # Core statements skip the session's flush hooks, so queue their
+        # fragment and "My issues" invalidation and live events here
+        touch_issues(db.session, changed)
+        touch_assignees(db.session, assignees)
+        if not streams_enabled():
+            return changed
+        names = history.usernames(assignees) if "assignee_id" in values else {}
+        username = load_identity(user_id).username
+        for row in activities:
+            activity_id = activity_ids[row["issue_id"], row["field"]]
+            detail = history.describe(row["field"], row["old_value"], row["new_value"], names)
+            queue_event(db.session, activity_event(
+                activity_id, row["issue_id"], project_id, user_id, username, "Updated", detail, now,
+            ))
+    return changed
@@ -0,0 +1,216 @@
+# app/commands.py
+import gzip
+import multiprocessing
+import os
+import signal
+from datetime import timedelta
+
+import click
+from flask import current_app
+from flask.cli import AppGroup
+
+from . import activity, counters, db
+from .export import FORMATS as EXPORT_FORMATS, export_issues, gzip_stream
+from .importer import READERS as IMPORT_READERS, Importer
+from .jobs import jobs
+from .models import ist_now
+from .search import search
+
+search_cli = AppGroup("search", help="Manage the issue full-text search index.")
+
+
+@search_cli.command("rebuild")
+def search_rebuild():
+    """Rebuild the search index from every issue and comment."""
+    count = search.rebuild()
+    db.session.commit()
+    click.echo(f"Indexed {count} issues.")
+
+
+counters_cli = AppGroup("counters", help="Manage the per-project issue counters.")
+
+
+@counters_cli.command("reconcile")
+@click.option("--project", "project_id", type=int, help="Only rebuild this project's counters.")
+def counters_reconcile(project_id):
+    """Rebuild the issue counters from scratch."""
+    buckets = counters.rebuild(project_id)
+    db.session.commit()
+    click.echo(f"Rebuilt {buckets} counter buckets.")
+
+
+replica_cli = AppGroup("replica", help="Manage read replicas.")
+
+
+@replica_cli.command("sync")
+def replica_sync():
+    """Copy a SQLite primary into every SQLite replica, for local testing."""
+    primary = db.engines[None]
+    keys = current_app.config["REPLICA_BIND_KEYS"]
+    if not keys:
+        raise click.ClickException("No replicas configured; set DATABASE_REPLICA_URLS.")
+
+    for key in keys:
+        replica = db.engines[key]
+        if primary.dialect.name != "sqlite" or replica.dialect.name != "sqlite":
+            raise click.ClickException("replica sync only copies SQLite databases.")
+        source, target = primary.raw_connection(), replica.raw_connection()
+        try:
+            source.driver_connection.backup(target.driver_connection)
+        finally:
+            source.close()
+            target.close()
+        click.echo(f"Copied primary to {replica.url.database}.")
+
+
+export_cli = AppGroup("export", help="Export tracker data.")
+
+
+@export_cli.command("issues")
+@click.argument("project_id", type=int)
+@click.option("--format", "format", type=click.Choice(list(EXPORT_FORMATS)), default="jsonl", show_default=True)
+@click.option("--output", "-o", type=click.Path(dir_okay=False, writable=True), help="Write here instead of stdout.")
+@click.option("--gzip", "compress", is_flag=True, help="Gzip the output (implied by an output name ending in .gz).")
+@click.option("--status")
+@click.option("--priority")
+@click.option("--assignee", help="A user id, or 'unassigned'.")
+@click.option("-q", "q", help="Full-text search, as on the issue list.")
+def export_issues_command(project_id, format, output, compress, **filters):
+    """Stream a project's issues, comments and activity as CSV or JSONL."""
+    body = export_issues(project_id, filters, format)
+    compress = compress or (output or "").endswith(".gz")
+    stream = click.open_file(output or "-", "wb")
+    with stream:
+        for chunk in gzip_stream(body) if compress else (text.encode() for text in body):
+            stream.write(chunk)
+
+
+import_cli = AppGroup("import", help="Import data from other trackers.")
+
+
+@import_cli.command("issues")
+@click.argument("path", type=click.Path(exists=True, dir_okay=False))
+@click.option("--format", "format", type=click.Choice(list(IMPORT_READERS)),
+              help="Input format; guessed from the file name by default.")
+@click.option("--project", help="Project name for records that do not name one.")
+@click.option("--chunk-size", type=int, default=1000, show_default=True, help="Records per transaction.")
+@click.option("--source", help="Checkpoint name; defaults to the file's absolute path.")
+@click.option("--restart", is_flag=True, help="Ignore the checkpoint and import from the first record.")
+def import_issues(path, format, project, chunk_size, source, restart):
+    """Bulk-load issues with their comments and activity from JSONL or CSV.
+
+    Takes the files `flask export issues` writes. Re-running after an
+    interruption resumes from the last committed chunk.
+    """
+    name = path[:-3] if path.endswith(".gz") else path
+    format = format or ("csv" if name.endswith(".csv") else "jsonl")
+    importer = Importer(source or os.path.abspath(path), default_project=project, chunk_size=chunk_size)
+
+    def progress(importer, seconds):
+        stats = importer.stats
+        click.echo(f"{stats['issues']} issues, {stats['comments']} comments, {stats['activities']} activities "
+                   f"({importer.rows / seconds:.0f} rows/s)")
+
+    opener = gzip.open if path.endswith(".gz") else open
+    with opener(path, "rt", encoding="utf-8", newline="") as stream:
+        try:
+            imported = importer.run(IMPORT_READERS[format](stream), restart=restart, progress=progress)
+        except ValueError as error:
+            raise click.ClickException(f"{error}. Fix it and re-run to resume.")
+    click.echo(f"Imported {imported} issues, created {importer.stats['users']} users "
+               f"and {importer.stats['projects']} projects.")
+
+
+jobs_cli = AppGroup("jobs", help="Run and inspect background jobs.")
+
+
+def _worker(burst, poll):
+    # a forked child must not share its parent's pooled connections
+    for engine in db.engines.values():
+        engine.dispose(close=False)
+    jobs.work(burst=burst, poll=poll)
+
+
+@jobs_cli.command("work")
+@click.option("--processes", "-p", type=int, default=1, show_default=True, help="Worker processes to run.")
+@click.option("--burst", is_flag=True, help="Exit once no job is due instead of waiting for more.")
+@click.option("--poll", type=float, help="Seconds between looks for new jobs; JOBS_POLL_SECONDS by default.")
+def jobs_work(processes, burst, poll):
+    """Run queued jobs until interrupted.
+
+    Several processes, here or on other hosts, can work the same queue.
+    Ctrl-C or SIGTERM lets every worker finish its current job first.
+    """
+    if processes <= 1:
+        done = jobs.work(burst=burst, poll=poll)
+        click.echo(f"Ran {done} jobs.")
+        return
+
+    context = multiprocessing.get_context("fork")
+    children = [context.Process(target=_worker, args=(burst, poll), daemon=False) for _ in range(processes)]
+    for child in children:
+        child.start()
+
+    def forward(signum, frame):
+        for child in children:
+            if child.is_alive():
+                os.kill(child.pid, signal.SIGTERM)
+
+    signal.signal(signal.SIGTERM, forward)
+    signal.signal(signal.SIGINT, forward)
+    for child in children:
+        child.join()
+
+
+@jobs_cli.command("dead")
+def jobs_dead():
+    """List jobs that failed every attempt."""
+    for job in jobs.dead():
+        error = (job.last_error or "").strip().splitlines()
+        click.echo(f"{job.id}\t{job.name}\t{job.payload}\t{error[-1] if error else ''}")
+
+
+@jobs_cli.command("retry")
+@click.argument("job_ids", nargs=-1, type=int)
+def jobs_retry(job_ids):
+    """Queue dead jobs again, all of them unless JOB_IDS are given."""
+    count = jobs.retry(job_ids)
+    click.echo(f"Requeued {count} jobs.")
+
+
+activity_cli = AppGroup("activity", help="Archive and prune the issue activity log.")
+
+
+@activity_cli.command("archive")
+@click.option("--older-than", "days", type=int, help="Age in days; ACTIVITY_ARCHIVE_AFTER_DAYS by default.")
+@click.option("--batch-size", type=int, default=1000, show_default=True, help="Rows moved per transaction.")
+def activity_archive(days, batch_size):
+    """Move old activity out of the live table into activity_archive.
+
+    Issue timelines, the API and exports read both tables, so nothing
+    disappears from view. Run it from cron, e.g. nightly.
+    """
+    days = current_app.config["ACTIVITY_ARCHIVE_AFTER_DAYS"] if days is None else days
+    archived = activity.archive(ist_now() - timedelta(days=days), batch_size=batch_size)
+    click.echo(f"Archived {archived} activity rows older than {days} days.")
+
+
+@activity_cli.command("prune")
+@click.option("--older-than", "days", type=int, help="Age in days; ACTIVITY_RETENTION_DAYS by default.")
+def activity_prune(days):
+    """Delete archived activity past the retention period, for good."""
+    days = current_app.config["ACTIVITY_RETENTION_DAYS"] if days is None else days
+    if days is None:
+        raise click.ClickException("No retention period; set ACTIVITY_RETENTION_DAYS or pass --older-than.")
+    count = activity.prune(ist_now() - timedelta(days=days))
+    click.echo(f"Deleted {count} archived activity rows older than {days} days.")
+
+
+def register_commands(app):
+    app.cli.add_command(search_cli)
+    app.cli.add_command(counters_cli)
+    app.cli.add_command(replica_cli)
+    app.cli.add_command(export_cli)
+    app.cli.add_command(import_cli)
+    app.cli.add_command(jobs_cli)
+    app.cli.add_command(activity_cli)
@@ -0,0 +1,99 @@
+# app/counters.py
+from collections import Counter
+
+from sqlalchemy import delete, func, insert, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+
+from . import db
+from .models import ISSUE_PRIORITIES, ISSUE_STATUSES, Issue, ProjectIssueCount
+
+_counts = ProjectIssueCount.__table__
+_BUCKET = ("project_id", "status", "priority", "assignee_id")
+
+
+def bucket(project_id, status, priority, assignee_id):
+    return (project_id, status, priority, assignee_id or 0)
+
+
+def issue_bucket(issue):
+    return bucket(issue.project_id, issue.status, issue.priority, issue.assignee_id)
+
+
+def bump(key, delta):
+    """Add delta to one bucket, inside the caller's transaction."""
+    values = dict(zip(_BUCKET, key), count=delta)
+    dialect = db.session.get_bind(mapper=ProjectIssueCount).dialect.name
+
+    if dialect in ("sqlite", "postgresql"):
+        upsert = (sqlite if dialect == "sqlite" else postgresql).insert(_counts).values(**values)
+        db.session.execute(upsert.on_conflict_do_update(
+            index_elements=list(_BUCKET),
+            set_={"count": ProjectIssueCount.count + upsert.excluded["count"]},
+        ))
+        return
+
+    match = [_counts.c[name] == value for name, value in zip(_BUCKET, key)]
+    result = db.session.execute(update(_counts).where(*match).values(count=ProjectIssueCount.count + delta))
+    if result.rowcount == 0:
+        db.session.execute(insert(_counts).values(**values))
+
+
+def issue_added(issue):
+    bump(issue_bucket(issue), 1)
+
+
+def issue_moved(old_key, new_key):
+    issues_moved([(old_key, new_key)])
+
+
+def issues_moved(moves):
+    """Apply many (old bucket, new bucket) moves with one upsert per bucket touched."""
+    deltas = Counter()
+    for old_key, new_key in moves:
+        if old_key != new_key:
+            deltas[old_key] -= 1
+            deltas[new_key] += 1
+    for key, delta in deltas.items():
+        if delta:
+            bump(key, delta)
+
+
+def rebuild(project_id=None):
+    """Recompute the counters from the issue table. Returns the bucket count."""
+    clear = delete(_counts)
+    grouped = (
+        select(
+            Issue.project_id, Issue.status, Issue.priority,
+            func.coalesce(Issue.assignee_id, 0), func.count(),
+        )
+        .group_by(Issue.project_id, Issue.status, Issue.priority, func.coalesce(Issue.assignee_id, 0))
+    )
+    if project_id is not None:
+        clear = clear.where(_counts.c.project_id == project_id)
+        grouped = grouped.where(Issue.project_id == project_id)
+
+    db.session.execute(clear)
+    result = db.session.execute(insert(_counts).from_select([*_BUCKET, "count"], grouped))
+    return result.rowcount
+
+
+def project_summaries(project_ids):
+    """{project_id: {"total", "by_status", "by_priority"}} read from the counters."""
+    summaries = {
+        project_id: {"total": 0, "by_status": dict.fromkeys(ISSUE_STATUSES, 0), "by_priority": dict.fromkeys(ISSUE_PRIORITIES, 0)}
+        for project_id in project_ids
+    }
+    if not summaries:
+        return summaries
+
+    rows = db.session.execute(
+        select(_counts.c.project_id, _counts.c.status, _counts.c.priority, func.sum(ProjectIssueCount.count))
+        .where(_counts.c.project_id.in_(summaries))
+        .group_by(_counts.c.project_id, _counts.c.status, _counts.c.priority)
+    )
+    for project_id, status, priority, count in rows:
+        summary = summaries[project_id]
+        summary["total"] += count
+        summary["by_status"][status] = summary["by_status"].get(status, 0) + count
+        summary["by_priority"][priority] = summary["by_priority"].get(priority, 0) + count
+    return summaries
@@ -0,0 +1,43 @@
+# app/database.py
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+
+
+def engine_options(config, url=None):
+    """Engine options for url, by default the configured SQLALCHEMY_DATABASE_URI."""
+    options = dict(config.get("SQLALCHEMY_ENGINE_OPTIONS") or {})
+    url = make_url(url or config["SQLALCHEMY_DATABASE_URI"])
+    if url.get_backend_name() != "sqlite":
+        options.setdefault("pool_size", config["DB_POOL_SIZE"])
+        options.setdefault("max_overflow", config["DB_MAX_OVERFLOW"])
+        options.setdefault("pool_timeout", config["DB_POOL_TIMEOUT"])
+        options.setdefault("pool_recycle", config["DB_POOL_RECYCLE"])
+        options.setdefault("pool_pre_ping", config["DB_POOL_PRE_PING"])
+    return options
+
+
+def sqlite_pragmas(config):
+    return [
+        "PRAGMA journal_mode=WAL",
+        f"PRAGMA synchronous={config['SQLITE_SYNCHRONOUS']}",
+        f"PRAGMA busy_timeout={int(config['SQLITE_BUSY_TIMEOUT_MS'])}",
+        f"PRAGMA mmap_size={int(config['SQLITE_MMAP_SIZE'])}",
+        f"PRAGMA cache_size={int(config['SQLITE_CACHE_SIZE'])}",
+    ]
+
+
+def tune_sqlite(engine, config):
+    """Run the tuned-mode pragmas on every new connection to a SQLite engine."""
+    if engine.dialect.name != "sqlite" or not config["SQLITE_TUNED"]:
+        return
+    # in-memory databases have no journal to switch to WAL
+    if engine.url.database in (None, "", ":memory:"):
+        return
+    pragmas = sqlite_pragmas(config)
+
+    @event.listens_for(engine, "connect")
+    def _apply_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for pragma in pragmas:
+            cursor.execute(pragma)
+        cursor.close()
@@ -0,0 +1,110 @@
+# app/edits.py
+from datetime import datetime
+
+from sqlalchemy.orm.exc import StaleDataError
+
+from . import counters, db, history
+from .jobs import jobs
+from .metrics import registry
+from .models import Activity
+
+# times an edit is re-merged and retried when another one commits between
+# reading the issue and writing it, before the user is asked to look again
+ATTEMPTS = 5
+
+saves = registry.counter(
+    "bugtracker_issue_edits_total",
+    "Issue edits, by whether they applied as made, merged with concurrent edits or were refused.",
+)
+
+
+class EditConflict(Exception):
+    """An edit could not be merged with the issue's current values.
+
+    values is the edit merged as far as it goes; conflicts has a
+    history.Conflict for each field that was also changed meanwhile.
+    Empty conflicts means the issue kept changing under every attempt.
+    """
+
+    def __init__(self, values, conflicts):
+        super().__init__(", ".join(conflict.field for conflict in conflicts) or "issue kept changing")
+        self.values = values
+        self.conflicts = conflicts
+
+
+def read_form(form, issue, prefix=""):
+    """The tracked field values an edit form submitted, by history.TRACKED_FIELDS.
+
+    prefix reads another copy of the fields, e.g. "base_" for the values
+    the form was rendered with. Raises ValueError with a message for the
+    user when a value does not parse.
+    """
+    assignee_id = form.get(prefix + "assignee_id")
+    if assignee_id:
+        try:
+            assignee_id = int(assignee_id)
+        except ValueError:
+            raise ValueError("Invalid assignee ID.")
+    due_date = form.get(prefix + "due_date")
+    if due_date:
+        try:
+            due_date = datetime.strptime(due_date, "%Y-%m-%d")
+        except ValueError:
+            raise ValueError("Invalid due date format. Use YYYY-MM-DD.")
+    return {
+        "title": form.get(prefix + "title"),
+        "description": form.get(prefix + "description") or "",
+        "priority": form.get(prefix + "priority") or "Medium",
+        "due_date": due_date or None,
+        "status": form.get(prefix + "status") or issue.status,
+        "assignee_id": assignee_id or None,
+    }
+
+
+def save_edit(issue, values, user_id, version=None, base=None):
+    """Apply an edit of issue made from its version `version`, whose fields were then base.
+
+    Nothing is locked: Issue.version makes the UPDATE a no-op if another
+    edit committed since the issue was read. In that case, or when the form
+    was made from an older version, the edit is merged field by field with
+    the current values, so a field only it changed is applied and one only
+    the other edit changed is kept. A field both changed to different values
+    raises EditConflict without saving anything.
+
+    Without version the edit applies to whatever the issue is now, as
+    forms from before versioning did. Commits; returns the history.Change
+    list applied.
+    """
+    if version is None:
+        version, base = issue.version, history.snapshot(issue)
+    for _ in range(ATTEMPTS):
+        current = history.snapshot(issue)
+        merged, conflicts = values, []
+        stale = issue.version != version
+        if stale:
+            merged, conflicts = history.merge(base, values, current)
+            if conflicts:
+                saves.inc(result="conflict")
+                raise EditConflict(merged, conflicts)
+
+        old_bucket = counters.issue_bucket(issue)
+        changes = history.diff(current, merged)
+        try:
+            for field, value in merged.items():
+                setattr(issue, field, value)
+            for row in history.change_rows(issue.id, user_id, changes):
+                db.session.add(Activity(**row))
+            counters.issue_moved(old_bucket, counters.issue_bucket(issue))
+            if any(change.field in ("title", "description") for change in changes):
+                jobs.enqueue("search.index_issue", issue_id=issue.id)
+            db.session.commit()
+        except StaleDataError:
+            # another edit committed first; merge with what it saved and go again
+            db.session.rollback()
+            db.session.refresh(issue)
+            continue
+        saves.inc(result="merged" if stale else "applied")
+        return changes
+
+    saves.inc(result="retries_exhausted")
+    raise EditConflict(merged, [])
@@ -0,0 +1,336 @@
+# app/events.py
+import json
+import queue
+import threading
+import time
+
+from flask import current_app, has_app_context
+from sqlalchemy import event, select
+from werkzeug.utils import import_string
+
+from . import db, history
+from .models import Activity, Issue, User
+
+# session.info key for activity events waiting for their transaction to commit
+_PENDING = "_pending_events"
+
+
+def project_channel(project_id):
+    return f"project:{project_id}"
+
+
+def issue_channel(issue_id):
+    return f"issue:{issue_id}"
+
+
+class Subscription:
+    """Events for a set of channels, read with get() until closed."""
+
+    def get(self, timeout):
+        """The next event, or None if none arrived within timeout seconds.
+
+        Raises SubscriptionLost when events were dropped, so the client
+        should reconnect and catch up from its Last-Event-ID.
+        """
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class SubscriptionLost(Exception):
+    pass
+
+
+class Broker:
+    """Interface for activity event brokers."""
+
+    def publish(self, channels, event):
+        raise NotImplementedError
+
+    def subscribe(self, channels):
+        """Return a Subscription to the given channels."""
+        raise NotImplementedError
+
+
+class _LocalSubscription(Subscription):
+    def __init__(self, broker, channels, maxsize):
+        self.broker = broker
+        self.channels = channels
+        self.queue = queue.Queue(maxsize)
+        self.lost = False
+
+    def put(self, event):
+        try:
+            self.queue.put_nowait(event)
+        except queue.Full:
+            # a stalled client; drop it rather than buffer without bound
+            self.lost = True
+
+    def get(self, timeout):
+        if self.lost:
+            raise SubscriptionLost()
+        try:
+            return self.queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def close(self):
+        self.broker._unsubscribe(self)
+
+
+class LocalBroker(Broker):
+    """In-process pub/sub. Subscribers only see events published by the same
+    process, so with several gunicorn workers use RedisBroker instead.
+
+    Built on threading primitives, which gevent's monkey patching makes
+    cooperative.
+    """
+
+    def __init__(self, maxsize=1000):
+        self.maxsize = maxsize
+        self._subscribers = {}
+        self._lock = threading.Lock()
+
+    def publish(self, channels, event):
+        with self._lock:
+            targets = set()
+            for channel in channels:
+                targets |= self._subscribers.get(channel, set())
+        for subscription in targets:
+            subscription.put(event)
+
+    def subscribe(self, channels):
+        subscription = _LocalSubscription(self, tuple(channels), self.maxsize)
+        with self._lock:
+            for channel in subscription.channels:
+                self._subscribers.setdefault(channel, set()).add(subscription)
+        return subscription
+
+    def _unsubscribe(self, subscription):
+        with self._lock:
+            for channel in subscription.channels:
+                subscribers = self._subscribers.get(channel)
+                if subscribers is not None:
+                    subscribers.discard(subscription)
+                    if not subscribers:
+                        del self._subscribers[channel]
+
+
+class _RedisSubscription(Subscription):
+    def __init__(self, client, channels):
+        self.pubsub = client.pubsub(ignore_subscribe_messages=True)
+        self.pubsub.subscribe(*channels)
+
+    def get(self, timeout):
+        import redis
+
+        try:
+            message = self.pubsub.get_message(timeout=timeout)
+        except redis.ConnectionError:
+            # whatever was published meanwhile is gone; the client catches up
+            raise SubscriptionLost()
+        return json.loads(message["data"]) if message is not None else None
+
+    def close(self):
+        self.pubsub.close()
+
+
+class RedisBroker(Broker):
+    """Pub/sub through Redis at EVENTS_BROKER_URL, shared by every worker.
+
+    Needs the redis package. Each open stream holds its own Redis
+    connection for as long as it is open.
+    """
+
+    prefix = "bugtracker:events:"
+
+    def __init__(self, config):
+        import redis
+
+        self.client = redis.Redis.from_url(config["EVENTS_BROKER_URL"])
+
+    def publish(self, channels, event):
+        data = json.dumps(event)
+        for channel in channels:
+            self.client.publish(self.prefix + channel, data)
+
+    def subscribe(self, channels):
+        return _RedisSubscription(self.client, [self.prefix + channel for channel in channels])
+
+
+BROKERS = {
+    "local": lambda config: LocalBroker(),
+    "redis": RedisBroker,
+}
+
+
+def activity_event(activity_id, issue_id, project_id, user_id, username, action, detail, created_at):
+    return {
+        "id": activity_id,
+        "issue_id": issue_id,
+        "project_id": project_id,
+        "user": {"id": user_id, "username": username} if user_id else None,
+        "action": action,
+        "detail": detail,
+        "created_at": created_at.isoformat() if created_at is not None else None,
+    }
+
+
+def streams_enabled():
+    """Whether live streams are on, so activity events are worth building."""
+    return has_app_context() and current_app.config.get("EVENTS_ENABLED", False)
+
+
+def queue_event(session, event):
+    """Publish event once the session's transaction commits; drop it on rollback.
+
+    Callers check streams_enabled() first rather than build events nobody receives.
+    """
+    session.info.setdefault(_PENDING, []).append(event)
+
+
+def _username(user_id):
+    from .identity import load_identity
+
+    if not user_id:
+        return None
+    identity = load_identity(user_id)
+    return identity.username if identity is not None else None
+
+
+@event.listens_for(db.session, "after_flush")
+def _collect_activity(session, flush_context):
+    if not streams_enabled():
+        return
+    for obj in session.new:
+        if isinstance(obj, Activity):
+            issue = session.get(Issue, obj.issue_id)
+            names = {user_id: _username(user_id) for user_id in history.assignee_ids((obj,))}
+            detail = history.activity_detail(obj.detail, obj.field, obj.old_value, obj.new_value, names)
+            queue_event(session, activity_event(
+                obj.id, obj.issue_id, issue.project_id, obj.user_id, _username(obj.user_id),
+                obj.action, detail, obj.created_at,
+            ))
+
+
+@event.listens_for(db.session, "after_commit")
+def _publish_pending(session):
+    pending = session.info.pop(_PENDING, None)
+    if pending and streams_enabled() and "events" in current_app.extensions:
+        broker = events.broker
+        for item in pending:
+            broker.publish((project_channel(item["project_id"]), issue_channel(item["issue_id"])), item)
+
+
+@event.listens_for(db.session, "after_rollback")
+def _drop_pending(session):
+    session.info.pop(_PENDING, None)
+
+
+def format_event(item):
+    return f"id: {item['id']}\nevent: activity\ndata: {json.dumps(item)}\n\n"
+
+
+class EventStream:
+    """Flask extension that owns the activity event broker.
+
+    Off unless EVENTS_ENABLED is set: every open stream holds a gunicorn
+    thread, or a greenlet under gevent, for up to EVENTS_MAX_SECONDS, and
+    the default in-process LocalBroker only reaches streams served by the
+    worker that published. See gunicorn.conf.py.
+
+    EVENTS_BROKER may be a key of BROKERS or a dotted import path to a
+    callable taking the app config and returning a Broker.
+    """
+
+    def __init__(self, app=None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault("EVENTS_ENABLED", False)
+        app.config.setdefault("EVENTS_BROKER", "local")
+        app.config.setdefault("EVENTS_BROKER_URL", None)
+        app.config.setdefault("EVENTS_HEARTBEAT_SECONDS", 15)
+        app.config.setdefault("EVENTS_MAX_SECONDS", 300)
+        app.config.setdefault("EVENTS_BACKFILL_LIMIT", 500)
+        name = app.config["EVENTS_BROKER"]
+        factory = BROKERS.get(name) or import_string(name)
+        app.extensions["events"] = {"broker": factory(app.config)}
+
+    @property
+    def broker(self):
+        return current_app.extensions["events"]["broker"]
+
+    def backfill(self, last_event_id, project_id=None, issue_id=None):
+        """Activity after last_event_id for a project or an issue, oldest first.
+
+        Reads only the live activity table. Archiving only moves rows far
+        older than any reconnecting client's Last-Event-ID, and those are
+        still on the issue timeline.
+        """
+        query = (
+            select(Activity.id, Activity.issue_id, Issue.project_id, Activity.user_id, User.username,
+                   Activity.action, Activity.detail, Activity.field, Activity.old_value, Activity.new_value,
+                   Activity.created_at)
+            .join(Issue, Activity.issue_id == Issue.id)
+            .outerjoin(User, Activity.user_id == User.id)
+            .where(Activity.id > last_event_id)
+            .order_by(Activity.id)
+            .limit(current_app.config["EVENTS_BACKFILL_LIMIT"])
+        )
+        if issue_id is not None:
+            query = query.where(Activity.issue_id == issue_id)
+        else:
+            query = query.where(Issue.project_id == project_id)
+        rows = db.session.execute(query).all()
+        names = history.usernames(history.assignee_ids(rows))
+        return [
+            activity_event(
+                row.id, row.issue_id, row.project_id, row.user_id, row.username, row.action,
+                history.activity_detail(row.detail, row.field, row.old_value, row.new_value, names),
+                row.created_at,
+            )
+            for row in rows
+        ]
+
+    def stream(self, channel, last_event_id=None, project_id=None, issue_id=None):
+        """Yield a text/event-stream of activity on channel.
+
+        Subscribes before catching up from the database, so nothing
+        committed in between is missed, then skips live events already
+        sent. The connection closes after EVENTS_MAX_SECONDS; the browser
+        reconnects with Last-Event-ID and resumes where it left off.
+        """
+        config = current_app.config
+        heartbeat, deadline = config["EVENTS_HEARTBEAT_SECONDS"], time.monotonic() + config["EVENTS_MAX_SECONDS"]
+        with self.broker.subscribe((channel,)) as subscription:
+            yield "retry: 3000\n\n"
+            last = last_event_id or 0
+            if last_event_id is not None:
+                for item in self.backfill(last_event_id, project_id=project_id, issue_id=issue_id):
+                    last = item["id"]
+                    yield format_event(item)
+            # give the connection back to the pool; the stream may stay open for minutes
+            db.session.close()
+
+            while time.monotonic() < deadline:
+                try:
+                    item = subscription.get(timeout=min(heartbeat, max(deadline - time.monotonic(), 0)))
+                except SubscriptionLost:
+                    return
+                if item is None:
+                    yield ": keep-alive\n\n"
+                elif item["id"] > last:
+                    last = item["id"]
+                    yield format_event(item)
+
+
+events = EventStream()
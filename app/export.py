@@ -0,0 +1,177 @@
+# app/export.py
+import csv
+import io
+import json
+import zlib
+from collections import defaultdict, namedtuple
+
+from sqlalchemy import select
+from sqlalchemy.orm import aliased
+
+from . import db, history
+from .activity import activity_log
+from .filters import filter_issues
+from .models import Comment, Issue, User
+
+FORMATS = {
+    "csv": "text/csv",
+    "jsonl": "application/x-ndjson",
+}
+
+# issues fetched per round trip; their comments and activity are loaded per chunk
+CHUNK_SIZE = 500
+
+ExportedActivity = namedtuple("ExportedActivity", "user action created_at detail")
+
+CSV_COLUMNS = (
+    "record", "issue_id", "created_at", "user", "title", "status", "priority",
+    "assignee", "due_date", "updated_at", "action", "text",
+)
+
+
+def _iso(value):
+    return value.isoformat() if value is not None else None
+
+
+def _issue_chunks(project_id, filters, chunk_size):
+    reporter, assignee = aliased(User), aliased(User)
+    query = (
+        select(
+            Issue.id, Issue.title, Issue.description, Issue.status, Issue.priority,
+            Issue.created_at, Issue.updated_at, Issue.due_date,
+            reporter.username.label("reporter"), assignee.username.label("assignee"),
+        )
+        .join(reporter, Issue.reporter_id == reporter.id)
+        .outerjoin(assignee, Issue.assignee_id == assignee.id)
+        .where(Issue.project_id == project_id)
+    )
+    query = filter_issues(query, filters)
+    if not filters.get("q"):
+        query = query.order_by(Issue.id)
+    # plain rows, not ORM objects, so nothing piles up in the identity map;
+    # yield_per streams with a server-side cursor where the driver has one
+    result = db.session.execute(query.execution_options(yield_per=chunk_size))
+    yield from result.partitions()
+
+
+def _children(model, issue_ids, *columns):
+    # model may also be the columns of a subquery such as activity_log()
+    rows = db.session.execute(
+        select(model.issue_id, model.created_at, User.username.label("user"), *columns)
+        .outerjoin(User, model.user_id == User.id)
+        .where(model.issue_id.in_(issue_ids))
+        .order_by(model.issue_id, model.created_at, model.id)
+    )
+    grouped = defaultdict(list)
+    for row in rows:
+        grouped[row.issue_id].append(row)
+    return grouped
+
+
+def iter_records(project_id, filters, chunk_size=CHUNK_SIZE):
+    """Yield (issue row, comment rows, activity rows) for every matching issue.
+
+    Issues are read chunk_size at a time and each chunk's comments and
+    activity come from one query apiece, so memory stays flat however many
+    issues the project has.
+    """
+    for chunk in _issue_chunks(project_id, filters, chunk_size):
+        issue_ids = [row.id for row in chunk]
+        comments = _children(Comment, issue_ids, Comment.content)
+        activities = _activities(issue_ids)
+        for row in chunk:
+            yield row, comments.get(row.id, ()), activities.get(row.id, ())
+
+
+def _activities(issue_ids):
+    # live and archived, each "Updated" change written out as its text so
+    # the file reads (and imports) the same either way
+    log = activity_log().c
+    grouped = _children(log, issue_ids, log.action, log.detail, log.field, log.old_value, log.new_value)
+    names = history.usernames(history.assignee_ids(row for rows in grouped.values() for row in rows))
+    return {
+        issue_id: [
+            ExportedActivity(row.user, row.action, row.created_at,
+                             history.activity_detail(row.detail, row.field, row.old_value, row.new_value, names))
+            for row in rows
+        ]
+        for issue_id, rows in grouped.items()
+    }
+
+
+def _jsonl(records):
+    for issue, comments, activities in records:
+        document = {
+            "id": issue.id,
+            "title": issue.title,
+            "description": issue.description,
+            "status": issue.status,
+            "priority": issue.priority,
+            "reporter": issue.reporter,
+            "assignee": issue.assignee,
+            "created_at": _iso(issue.created_at),
+            "updated_at": _iso(issue.updated_at),
+            "due_date": _iso(issue.due_date),
+            "comments": [
+                {"user": c.user, "content": c.content, "created_at": _iso(c.created_at)} for c in comments
+            ],
+            "activity": [
+                {"user": a.user, "action": a.action, "detail": a.detail, "created_at": _iso(a.created_at)}
+                for a in activities
+            ],
+        }
+        yield json.dumps(document, ensure_ascii=False) + "\n"
+
+
+def _csv(records):
+    # one row per issue, each followed by its comment and activity rows
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+
+    def flush():
+        data = buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+        return data
+
+    writer.writerow(CSV_COLUMNS)
+    yield flush()
+    for issue, comments, activities in records:
+        writer.writerow((
+            "issue", issue.id, _iso(issue.created_at), issue.reporter, issue.title, issue.status,
+            issue.priority, issue.assignee, _iso(issue.due_date), _iso(issue.updated_at), None,
+            issue.description,
+        ))
+        for c in comments:
+            writer.writerow(("comment", issue.id, _iso(c.created_at), c.user, *[None] * 7, c.content))
+        for a in activities:
+            writer.writerow(("activity", issue.id, _iso(a.created_at), a.user, *[None] * 6, a.action, a.detail))
+        yield flush()
+
+
+def export_issues(project_id, filters, format="jsonl", chunk_size=CHUNK_SIZE):
+    """Yield a project's issues, comments and activity as CSV or JSONL text."""
+    if format not in FORMATS:
+        raise ValueError(f"unknown export format {format!r}")
+    records = iter_records(project_id, filters, chunk_size)
+    return _csv(records) if format == "csv" else _jsonl(records)
+
+
+def gzip_stream(chunks, min_size=64 * 1024):
+    """Gzip an iterable of text as it goes, yielding compressed bytes.
+
+    Output is held back until min_size bytes of input have gone in, so
+    the compressor works on reasonably large blocks.
+    """
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    pending = 0
+    for chunk in chunks:
+        data = chunk.encode()
+        pending += len(data)
+        out = compressor.compress(data)
+        if pending >= min_size:
+            out += compressor.flush(zlib.Z_SYNC_FLUSH)
+            pending = 0
+        if out:
+            yield out
+    yield compressor.flush()
@@ -0,0 +1,61 @@
+# app/filters.py
+from urllib.parse import urlencode
+
+from . import db
+from .models import Issue, SavedFilter
+from .search import search
+
+FILTER_ARGS = ("status", "priority", "assignee", "q")
+
+
+def issue_filters(args):
+    """The issue list filters set in request args (or any mapping), unset ones as None."""
+    return {name: args.get(name) or None for name in FILTER_ARGS}
+
+
+def filter_issues(query, filters):
+    """Restrict an Issue query or select() to the given issue list filters.
+
+    assignee is a user id or "unassigned". With q the results come back
+    best search match first; otherwise they are left unordered.
+    """
+    if filters.get("status"):
+        query = query.filter(Issue.status == filters["status"])
+    if filters.get("priority"):
+        query = query.filter(Issue.priority == filters["priority"])
+    assignee = filters.get("assignee")
+    if assignee:
+        if assignee == "unassigned":
+            query = query.filter(Issue.assignee_id.is_(None))
+        else:
+            try:
+                query = query.filter(Issue.assignee_id == int(assignee))
+            except ValueError:
+                query = query.filter(False)
+    if filters.get("q"):
+        query = search.apply(query, filters["q"])
+    return query
+
+
+def filter_query_string(filters):
+    """The set filters as a query string, in FILTER_ARGS order."""
+    return urlencode([(name, filters[name]) for name in FILTER_ARGS if filters.get(name)])
+
+
+def saved_filters(user_id, project_id):
+    return (
+        SavedFilter.query
+        .filter(SavedFilter.user_id == user_id, SavedFilter.project_id == project_id)
+        .order_by(SavedFilter.name)
+        .all()
+    )
+
+
+def save_filter(user_id, project_id, name, filters):
+    """Save filters under name for the user and project, replacing a filter of that name."""
+    saved = SavedFilter.query.filter_by(user_id=user_id, project_id=project_id, name=name).first()
+    if saved is None:
+        saved = SavedFilter(user_id=user_id, project_id=project_id, name=name)
+        db.session.add(saved)
+    saved.params = filter_query_string(filters)
+    return saved
@@ -0,0 +1,165 @@
+# app/fragments.py
+from flask import current_app, has_app_context
+from markupsafe import Markup
+from sqlalchemy import event
+from werkzeug.utils import import_string
+
+from . import db
+from .cache import TTLCache
+from .models import Activity, Comment, Issue
+
+# session.info key for issue ids whose fragments go stale when the transaction commits
+_TOUCHED = "_touched_issues"
+
+
+class FragmentBackend:
+    """Interface for rendered-fragment stores.
+
+    Keys are tuples whose second item is the issue id and whose last items
+    version the fragment (such as the issue's updated_at), so a changed issue
+    simply misses; invalidate_issues only frees the stale entries early.
+    """
+
+    def get(self, key):
+        raise NotImplementedError
+
+    def set(self, key, html):
+        raise NotImplementedError
+
+    def invalidate_issues(self, issue_ids):
+        pass
+
+
+class NullFragmentBackend(FragmentBackend):
+    """Caches nothing; every fragment is rendered."""
+
+    def get(self, key):
+        return None
+
+    def set(self, key, html):
+        pass
+
+
+class LocalFragmentBackend(FragmentBackend):
+    """Per-process LRU, bounded to FRAGMENT_CACHE_SIZE fragments."""
+
+    def __init__(self, config):
+        self.cache = TTLCache(maxsize=config["FRAGMENT_CACHE_SIZE"], ttl=config["FRAGMENT_CACHE_TTL"])
+
+    def get(self, key):
+        return self.cache.get(key)
+
+    def set(self, key, html):
+        self.cache.set(key, html)
+
+    def invalidate_issues(self, issue_ids):
+        self.cache.delete_where(lambda key: key[1] in issue_ids)
+
+
+class RedisFragmentBackend(FragmentBackend):
+    """Fragments shared by every worker in Redis at FRAGMENT_CACHE_URL.
+
+    Needs the redis package. Redis evicts by its own maxmemory LRU policy,
+    and stale versions expire after FRAGMENT_CACHE_TTL.
+    """
+
+    prefix = "bugtracker:fragment:"
+
+    def __init__(self, config):
+        import redis
+
+        self.client = redis.Redis.from_url(config["FRAGMENT_CACHE_URL"])
+        self.ttl = config["FRAGMENT_CACHE_TTL"]
+
+    def _key(self, key):
+        return self.prefix + ":".join(str(part) for part in key)
+
+    def get(self, key):
+        value = self.client.get(self._key(key))
+        return value.decode() if value is not None else None
+
+    def set(self, key, html):
+        self.client.set(self._key(key), html.encode(), ex=self.ttl)
+
+
+BACKENDS = {
+    "local": LocalFragmentBackend,
+    "redis": RedisFragmentBackend,
+    "null": lambda config: NullFragmentBackend(),
+}
+
+
+class FragmentCache:
+    """Flask extension caching rendered template fragments.
+
+    FRAGMENT_CACHE_BACKEND may be a key of BACKENDS or a dotted import path
+    to a callable taking the app config and returning a FragmentBackend.
+    In templates::
+
+        {% call cached("issue-row", issue.id, issue.updated_at) %}...{% endcall %}
+
+    Load anything costly the fragment shows from inside the block, e.g.
+    through a callable the view passes in, so a hit never loads it and a
+    miss always has it: checking the cache first from the view is a
+    separate lookup, and the entry can be evicted in between.
+    """
+
+    def __init__(self, app=None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault("FRAGMENT_CACHE_BACKEND", "local")
+        app.config.setdefault("FRAGMENT_CACHE_SIZE", 10000)
+        app.config.setdefault("FRAGMENT_CACHE_TTL", 3600)
+        app.config.setdefault("FRAGMENT_CACHE_URL", None)
+        name = app.config["FRAGMENT_CACHE_BACKEND"]
+        factory = BACKENDS.get(name) or import_string(name)
+        app.extensions["fragments"] = {"backend": factory(app.config)}
+        app.jinja_env.globals["cached"] = self.cached
+
+    @property
+    def backend(self):
+        return current_app.extensions["fragments"]["backend"]
+
+    def cached(self, *key, caller):
+        html = self.backend.get(key)
+        if html is None:
+            html = str(caller())
+            self.backend.set(key, html)
+        return Markup(html)
+
+    def invalidate_issues(self, issue_ids):
+        self.backend.invalidate_issues(issue_ids)
+
+
+def touch_issues(session, issue_ids):
+    """Invalidate these issues' fragments once the session's transaction commits."""
+    session.info.setdefault(_TOUCHED, set()).update(issue_ids)
+
+
+@event.listens_for(db.session, "after_flush")
+def _collect_touched(session, flush_context):
+    touched = set()
+    for obj in (*session.new, *session.dirty):
+        if isinstance(obj, Issue):
+            touched.add(obj.id)
+        elif isinstance(obj, (Comment, Activity)):
+            touched.add(obj.issue_id)
+    if touched:
+        touch_issues(session, touched)
+
+
+@event.listens_for(db.session, "after_commit")
+def _invalidate_touched(session):
+    touched = session.info.pop(_TOUCHED, None)
+    if touched and has_app_context() and "fragments" in current_app.extensions:
+        fragments.invalidate_issues(touched)
+
+
+@event.listens_for(db.session, "after_rollback")
+def _drop_touched(session):
+    session.info.pop(_TOUCHED, None)
+
+
+fragments = FragmentCache()
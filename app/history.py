@@ -0,0 +1,132 @@
+# app/history.py
+from collections import namedtuple
+
+from . import db
+from .models import User
+
+# fields an edit can change, in the order it records them
+TRACKED_FIELDS = ("title", "description", "priority", "due_date", "status", "assignee_id")
+
+# one changed field of an "Updated" activity, values as stored (text or None)
+Change = namedtuple("Change", "field old new")
+
+# a field two edits of the same version both changed, to different values
+Conflict = namedtuple("Conflict", "field base mine theirs")
+
+
+def snapshot(issue):
+    return {field: getattr(issue, field) for field in TRACKED_FIELDS}
+
+
+def usernames(user_ids):
+    """{user_id: username} for the given ids, in one query."""
+    ids = {user_id for user_id in user_ids if user_id}
+    if not ids:
+        return {}
+    return dict(db.session.query(User.id, User.username).filter(User.id.in_(ids)).all())
+
+
+def _text(field, value):
+    """How a tracked field's value is stored in an activity's old_value/new_value."""
+    if value is None or value == "":
+        return None
+    if field == "due_date":
+        return value.strftime("%Y-%m-%d")
+    return str(value)
+
+
+def diff(before, after):
+    """A Change for each tracked field that differs from before to after.
+
+    Only fields present in after are compared. Values are kept as text;
+    a description change is recorded without the old and new text, which
+    the issue itself still has.
+    """
+    changes = []
+    for field in TRACKED_FIELDS:
+        if field not in after:
+            continue
+        old, new = _text(field, before.get(field)), _text(field, after[field])
+        if old == new:
+            continue
+        if field == "description":
+            old = new = None
+        changes.append(Change(field, old, new))
+    return changes
+
+
+def merge(base, mine, theirs):
+    """Three-way merge of two edits, mine and theirs, both made from base.
+
+    A field only one side changed takes that side's value. Returns
+    (merged, conflicts): a Conflict for each field both changed to
+    different values, which merged holds mine for.
+    """
+    merged, conflicts = {}, []
+    for field in TRACKED_FIELDS:
+        old, ours, current = (_text(field, values.get(field)) for values in (base, mine, theirs))
+        if ours == old or ours == current:
+            merged[field] = theirs.get(field)
+        elif current == old:
+            merged[field] = mine.get(field)
+        else:
+            merged[field] = mine.get(field)
+            conflicts.append(Conflict(field, base.get(field), mine.get(field), theirs.get(field)))
+    return merged, conflicts
+
+
+def display(field, value, names):
+    """A tracked field's value as shown to users; names as for describe()."""
+    if field == "assignee_id":
+        return _assignee_name(value, names)
+    return _text(field, value) or "None"
+
+
+def change_rows(issue_id, user_id, changes, created_at=None):
+    """Activity row values recording changes, one "Updated" row per field."""
+    rows = [
+        {"issue_id": issue_id, "user_id": user_id, "action": "Updated",
+         "field": change.field, "old_value": change.old, "new_value": change.new}
+        for change in changes
+    ]
+    if created_at is not None:
+        for row in rows:
+            row["created_at"] = created_at
+    return rows
+
+
+def assignee_ids(rows):
+    """User ids an assignee change among activity rows refers to, for usernames()."""
+    ids = set()
+    for row in rows:
+        if row.field == "assignee_id":
+            ids.update(int(value) for value in (row.old_value, row.new_value) if value)
+    return ids
+
+
+def describe(field, old, new, names):
+    """The text shown for a change of field from old to new.
+
+    names maps user ids to usernames for assignee changes; see assignee_ids().
+    """
+    if field == "description":
+        return "description: (changed)"
+    if field == "title":
+        return f"title: '{old}' -> '{new}'"
+    if field == "assignee_id":
+        return f"assignee: {_assignee_name(old, names)} -> {_assignee_name(new, names)}"
+    return f"{field}: {old or 'None'} -> {new or 'None'}"
+
+
+def activity_detail(detail, field, old, new, names):
+    """An activity's text: its detail, or for a structured change the change described."""
+    if field is None:
+        return detail
+    return describe(field, old, new, names)
+
+
+def _assignee_name(user_id, names):
+    if not user_id:
+        return "Unassigned"
+    user_id = int(user_id)
+    return names.get(user_id, f"id:{user_id}")
@@ -0,0 +1,62 @@
+# app/identity.py
+from dataclasses import dataclass
+
+from flask_login import UserMixin
+from sqlalchemy import event
+
+from . import db
+from .cache import TTLCache
+from .models import User
+
+
+@dataclass(frozen=True, eq=False)
+class SessionUser(UserMixin):
+    """Read-only identity Flask-Login hands out as current_user.
+
+    It carries only what views and templates read, never password_hash.
+    Code that needs to change the account loads the User row itself.
+    """
+
+    id: int
+    username: str
+    email: str
+
+
+_identities = TTLCache(maxsize=4096, ttl=300)
+
+
+def load_identity(user_id):
+    try:
+        user_id = int(user_id)
+    except (TypeError, ValueError):
+        return None
+
+    identity = _identities.get(user_id)
+    if identity is None:
+        row = db.session.query(User.id, User.username, User.email).filter(User.id == user_id).first()
+        if row is None:
+            return None
+        identity = SessionUser(row.id, row.username, row.email)
+        _identities.set(user_id, identity)
+    return identity
+
+
+def invalidate_identity(user_id):
+    _identities.delete(user_id)
+
+
+def identity_cache_stats():
+    """Hits, misses and size of the identity cache in this process."""
+    return _identities.stats()
+
+
+@event.listens_for(User, "after_update")
+@event.listens_for(User, "after_delete")
+def _user_changed(mapper, connection, user):
+    invalidate_identity(user.id)
+
+
+def init_app(app, login_manager):
+    _identities.maxsize = app.config.setdefault("IDENTITY_CACHE_SIZE", 4096)
+    _identities.ttl = app.config.setdefault("IDENTITY_CACHE_TTL", 300)
+    login_manager.user_loader(load_identity)
@@ -0,0 +1,303 @@
+# app/importer.py
+import csv
+import json
+import time
+from collections import Counter
+from datetime import datetime
+from itertools import islice
+
+from sqlalchemy import func, insert, select
+
+from . import counters, db
+from .access import invalidate_project_access
+from .assignees import invalidate_project_members
+from .my_issues import invalidate_my_issues
+from .export import CSV_COLUMNS
+from .models import (
+    ISSUE_PRIORITIES, ISSUE_STATUSES, Activity, Comment, ImportCheckpoint, Issue, Project, ProjectMember,
+    User, ist_now,
+)
+from .search import search
+
+# password hash no password matches; imported users cannot log in until one is set
+UNUSABLE_PASSWORD = "!"
+IMPORTED_EMAIL_DOMAIN = "imported.invalid"
+
+
+class ImportRecordError(ValueError):
+    def __init__(self, position, message):
+        super().__init__(f"record {position}: {message}")
+        self.position = position
+
+
+def read_jsonl(stream):
+    """Issue records from the JSONL that `flask export issues` writes."""
+    for line in stream:
+        if line.strip():
+            yield json.loads(line)
+
+
+def read_csv(stream):
+    """Issue records from the CSV that `flask export issues` writes.
+
+    Comment and activity rows belong to the issue row before them. An
+    optional "project" column names each issue's project.
+    """
+    record = None
+    for row in csv.DictReader(stream):
+        kind = row.get("record")
+        if kind == "issue":
+            if record is not None:
+                yield record
+            record = {key: row.get(key) or None for key in (*CSV_COLUMNS, "project")}
+            record.update(reporter=row["user"], description=row["text"], comments=[], activity=[])
+        elif record is None:
+            raise ValueError(f"{kind} row before any issue row")
+        elif kind == "comment":
+            record["comments"].append({"user": row["user"], "content": row["text"], "created_at": row["created_at"]})
+        elif kind == "activity":
+            record["activity"].append({"user": row["user"], "action": row["action"], "detail": row["text"] or None,
+                                       "created_at": row["created_at"]})
+    if record is not None:
+        yield record
+
+
+READERS = {"jsonl": read_jsonl, "csv": read_csv}
+
+
+def _datetime(value, position, field):
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(value)
+    except (TypeError, ValueError):
+        raise ImportRecordError(position, f"bad {field} {value!r}") from None
+
+
+class Importer:
+    """Loads issue records with batched Core inserts, one transaction per chunk.
+
+    Users and projects are resolved through name -> id maps loaded once up
+    front; unknown users are created without a usable password and unknown
+    projects are created owned by their first issue's reporter. Reporters
+    and assignees are made members of the issue's project, and each chunk's
+    issues are added to the search index with it. The checkpoint for
+    source is saved with every chunk, so an interrupted import picks up
+    where it stopped.
+    """
+
+    def __init__(self, source, default_project=None, chunk_size=1000):
+        self.source = source
+        self.default_project = default_project
+        self.chunk_size = chunk_size
+        self.users = dict(db.session.execute(select(User.username, User.id)).all())
+        self.projects = dict(db.session.execute(select(Project.name, Project.id)).all())
+        self.members = set()
+        self._member_projects = set()
+        self.touched_projects = set()
+        self.stats = Counter()
+
+    def checkpoint(self):
+        return db.session.get(ImportCheckpoint, self.source)
+
+    def run(self, records, restart=False, progress=None):
+        """Import records, skipping those an earlier run got through.
+
+        progress(importer, seconds) is called after every chunk. Returns the
+        number of records imported by this run.
+        """
+        checkpoint = self.checkpoint()
+        if checkpoint is None:
+            checkpoint = ImportCheckpoint(source=self.source, position=0)
+            db.session.add(checkpoint)
+        elif restart:
+            checkpoint.position = 0
+        position = checkpoint.position
+        records = islice(records, position, None)
+
+        began = time.perf_counter()
+        try:
+            while True:
+                chunk = list(islice(records, self.chunk_size))
+                if not chunk:
+                    break
+                # saved in the chunk's transaction, and flushed first so that
+                # on SQLite the chunk holds the write lock before _load picks
+                # issue ids; see _insert_issues()
+                checkpoint.position = position + len(chunk)
+                db.session.flush()
+                self._load(chunk, position)
+                position += len(chunk)
+                db.session.commit()
+                if progress is not None:
+                    progress(self, time.perf_counter() - began)
+        except Exception:
+            db.session.rollback()
+            raise
+        finally:
+            for project_id in self.touched_projects:
+                invalidate_project_access(project_id)
+                invalidate_project_members(project_id)
+            if self.touched_projects:
+                invalidate_my_issues()
+            # counts are derived, so they are rebuilt once for whatever was
+            # committed rather than maintained per row
+            for project_id in self.touched_projects:
+                counters.rebuild(project_id)
+            db.session.commit()
+        return self.stats["issues"]
+
+    @property
+    def rows(self):
+        return sum(self.stats.values())
+
+    def _clean(self, record, position):
+        title = (record.get("title") or "").strip()
+        if not title:
+            raise ImportRecordError(position, "title is required")
+        status = record.get("status") or "Open"
+        priority = record.get("priority") or "Medium"
+        if status not in ISSUE_STATUSES:
+            raise ImportRecordError(position, f"unknown status {status!r}")
+        if priority not in ISSUE_PRIORITIES:
+            raise ImportRecordError(position, f"unknown priority {priority!r}")
+        project = record.get("project") or self.default_project
+        if not project:
+            raise ImportRecordError(position, "no project given")
+        if not record.get("reporter"):
+            raise ImportRecordError(position, "reporter is required")
+
+        created_at = _datetime(record.get("created_at"), position, "created_at") or ist_now()
+        comments = [
+            dict(c, user=c.get("user") or record["reporter"],
+                 created_at=_datetime(c.get("created_at"), position, "comment created_at") or created_at)
+            for c in record.get("comments") or () if c.get("content")
+        ]
+        activity = [
+            dict(a, user=a.get("user") or record["reporter"],
+                 created_at=_datetime(a.get("created_at"), position, "activity created_at") or created_at)
+            for a in record.get("activity") or () if a.get("action")
+        ]
+        if not any(a["action"] == "Created" for a in activity):
+            activity.insert(0, {"user": record["reporter"], "action": "Created",
+                                "detail": f"Issue '{title}' created.", "created_at": created_at})
+        return {
+            "project": project,
+            "title": title,
+            "description": record.get("description"),
+            "status": status,
+            "priority": priority,
+            "reporter": record["reporter"],
+            "assignee": record.get("assignee"),
+            "created_at": created_at,
+            "updated_at": _datetime(record.get("updated_at"), position, "updated_at") or created_at,
+            "due_date": _datetime(record.get("due_date"), position, "due_date"),
+            "comments": comments,
+            "activity": activity,
+        }
+
+    def _create_users(self, names):
+        missing = sorted(name for name in names if name and name not in self.users)
+        if not missing:
+            return
+        rows = [{"username": name, "email": f"{name}@{IMPORTED_EMAIL_DOMAIN}", "password_hash": UNUSABLE_PASSWORD}
+                for name in missing]
+        result = db.session.execute(insert(User).returning(User.username, User.id), rows)
+        self.users.update(result.tuples().all())
+        self.stats["users"] += len(missing)
+
+    def _create_projects(self, owners):
+        missing = [name for name in owners if name not in self.projects]
+        if not missing:
+            return
+        now = ist_now()
+        rows = [{"name": name, "owner_id": self.users[owners[name]], "created_at": now} for name in missing]
+        result = db.session.execute(insert(Project).returning(Project.name, Project.id), rows)
+        self.projects.update(result.tuples().all())
+        owner_rows = [{"project_id": self.projects[name], "user_id": self.users[owners[name]], "role": "owner"}
+                      for name in missing]
+        db.session.execute(insert(ProjectMember), owner_rows)
+        self.members.update((row["project_id"], row["user_id"]) for row in owner_rows)
+        self._member_projects.update(row["project_id"] for row in owner_rows)
+        self.stats["projects"] += len(missing)
+
+    def _add_members(self, wanted):
+        unloaded = {project_id for project_id, _ in wanted} - self._member_projects
+        if unloaded:
+            self.members.update(db.session.execute(
+                select(ProjectMember.project_id, ProjectMember.user_id).where(ProjectMember.project_id.in_(unloaded))
+            ).tuples())
+            self._member_projects |= unloaded
+        missing = sorted(wanted - self.members)
+        if missing:
+            db.session.execute(insert(ProjectMember), [
+                {"project_id": project_id, "user_id": user_id, "role": "member"} for project_id, user_id in missing
+            ])
+            self.members.update(missing)
+
+    def _insert_issues(self, rows):
+        """Insert issue rows in one statement and return their ids, in order.
+
+        PostgreSQL returns a batched INSERT's ids in parameter order. SQLite
+        can only do that a row per statement, so there the ids are chosen up
+        front as max(id) + 1 onwards, which is what it would assign itself;
+        no one else can take them, as run() already holds the write lock.
+        """
+        if db.session.get_bind(Issue).dialect.name != "sqlite":
+            return db.session.scalars(insert(Issue).returning(Issue.id, sort_by_parameter_order=True), rows).all()
+        first = db.session.scalar(select(func.coalesce(func.max(Issue.id), 0))) + 1
+        ids = list(range(first, first + len(rows)))
+        db.session.execute(insert(Issue), [dict(row, id=issue_id) for issue_id, row in zip(ids, rows)])
+        return ids
+
+    def _load(self, chunk, first_position):
+        records = [self._clean(record, first_position + offset + 1) for offset, record in enumerate(chunk)]
+
+        names, owners = set(), {}
+        for record in records:
+            names.update((record["reporter"], record["assignee"]))
+            names.update(c["user"] for c in record["comments"])
+            names.update(a["user"] for a in record["activity"])
+            owners.setdefault(record["project"], record["reporter"])
+        self._create_users(names)
+        self._create_projects(owners)
+
+        wanted, issue_rows = set(), []
+        for record in records:
+            project_id = self.projects[record["project"]]
+            self.touched_projects.add(project_id)
+            reporter_id = self.users[record["reporter"]]
+            assignee_id = self.users.get(record["assignee"]) if record["assignee"] else None
+            wanted.update((project_id, user_id) for user_id in (reporter_id, assignee_id) if user_id)
+            issue_rows.append({
+                "title": record["title"], "description": record["description"],
+                "status": record["status"], "priority": record["priority"],
+                "project_id": project_id, "reporter_id": reporter_id, "assignee_id": assignee_id,
+                "created_at": record["created_at"], "updated_at": record["updated_at"],
+                "due_date": record["due_date"],
+            })
+        self._add_members(wanted)
+
+        issue_ids = self._insert_issues(issue_rows)
+
+        comment_rows, activity_rows = [], []
+        for issue_id, record in zip(issue_ids, records):
+            comment_rows += [
+                {"issue_id": issue_id, "user_id": self.users[c["user"]], "content": c["content"],
+                 "created_at": c["created_at"]}
+                for c in record["comments"]
+            ]
+            activity_rows += [
+                {"issue_id": issue_id, "user_id": self.users[a["user"]], "action": a["action"],
+                 "detail": a.get("detail"), "created_at": a["created_at"]}
+                for a in record["activity"]
+            ]
+        if comment_rows:
+            db.session.execute(insert(Comment), comment_rows)
+        db.session.execute(insert(Activity), activity_rows)
+        # in the chunk's transaction, so the index has exactly the issues committed
+        search.index_issues(issue_ids)
+
+        self.stats["issues"] += len(issue_rows)
+        self.stats["comments"] += len(comment_rows)
+        self.stats["activities"] += len(activity_rows)
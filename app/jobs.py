@@ -0,0 +1,275 @@
+# app/jobs.py
+import json
+import os
+import random
+import signal
+import socket
+import time
+import traceback
+from collections import namedtuple
+from datetime import timedelta
+
+from flask import current_app
+from sqlalchemy import delete, event, func, select, update
+
+from . import db
+from .metrics import registry
+from .models import Job, ist_now
+
+Task = namedtuple("Task", "name func max_attempts")
+
+# session.info keys for inline jobs waiting for their transaction to commit,
+# and for committed ones waiting to run when the app context ends
+_PENDING = "_pending_inline_jobs"
+_READY = "_ready_inline_jobs"
+
+
+class JobQueue:
+    """Flask extension running registered tasks in worker processes.
+
+    Jobs are rows in the job table, so enqueue() is part of the caller's
+    transaction: a job only becomes visible to workers once the request
+    commits, and disappears with it on rollback. Workers are started with
+    `flask jobs work`. A failed job is retried after an exponential backoff
+    and, after its task's max_attempts, kept with status "dead".
+
+    Deployments need a worker: /metrics reports the queue, and logs a
+    warning whenever a due job has waited longer than
+    JOBS_WARN_AFTER_SECONDS, as when none is running. With JOBS_INLINE set,
+    for a single process without one, the job is not stored; once the
+    caller's transaction commits, the task runs in the same process when
+    the app context ends, in a transaction of its own.
+    """
+
+    def __init__(self, app=None):
+        self.tasks = {}
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault("JOBS_INLINE", False)
+        app.config.setdefault("JOBS_POLL_SECONDS", 1.0)
+        app.config.setdefault("JOBS_MAX_ATTEMPTS", 5)
+        app.config.setdefault("JOBS_BACKOFF_SECONDS", 10)
+        app.config.setdefault("JOBS_MAX_BACKOFF_SECONDS", 3600)
+        app.config.setdefault("JOBS_LOCK_TIMEOUT_SECONDS", 600)
+        app.config.setdefault("JOBS_WARN_AFTER_SECONDS", 300)
+        app.extensions["jobs"] = self
+        # registered after Flask-SQLAlchemy's, so it runs before the session is removed
+        app.teardown_appcontext(self._run_inline)
+
+    def task(self, name, max_attempts=None):
+        """Register the decorated function as the task called name.
+
+        Its keyword arguments travel through JSON, so pass ids rather than
+        model instances and load them inside the task.
+        """
+        def decorator(func):
+            self.tasks[name] = Task(name, func, max_attempts)
+            return func
+        return decorator
+
+    def enqueue(self, name, delay=0, **kwargs):
+        """Run task name with kwargs once the current transaction commits.
+
+        Returns the Job row, or None under JOBS_INLINE, where delay is ignored.
+        """
+        task = self.tasks[name]
+        payload = json.dumps(kwargs)
+        if current_app.config["JOBS_INLINE"]:
+            # tie it to a transaction even before any SQL, so a rollback drops it
+            session = db.session()
+            if not session.in_transaction():
+                session.begin()
+            session.info.setdefault(_PENDING, []).append((name, payload))
+            return None
+        job = Job(
+            name=name,
+            payload=payload,
+            max_attempts=task.max_attempts or current_app.config["JOBS_MAX_ATTEMPTS"],
+            run_at=ist_now() + timedelta(seconds=delay),
+        )
+        db.session.add(job)
+        return job
+
+    def _run_inline(self, exc):
+        session = db.session()
+        if not session.info.get(_READY):
+            return
+        # whatever the app context left uncommitted is not the tasks' to commit
+        session.rollback()
+        while session.info.get(_READY):
+            name, payload = session.info[_READY].pop(0)
+            try:
+                self.tasks[name].func(**json.loads(payload))
+                session.commit()
+            except Exception:
+                session.rollback()
+                current_app.logger.exception("inline job %s failed", name)
+
+    def backlog(self):
+        """(due jobs waiting, seconds the oldest of them has waited)."""
+        now = ist_now()
+        count, oldest = db.session.execute(
+            select(func.count(Job.id), func.min(Job.run_at)).where(Job.status == "queued", Job.run_at <= now)
+        ).one()
+        if oldest is None:
+            return count, 0
+        # SQLite hands timestamps back without their zone
+        if oldest.tzinfo is None:
+            oldest = oldest.replace(tzinfo=now.tzinfo)
+        return count, max(0, (now - oldest).total_seconds())
+
+    def requeue_stale(self):
+        """Put back jobs whose worker died mid-run, returning how many."""
+        cutoff = ist_now() - timedelta(seconds=current_app.config["JOBS_LOCK_TIMEOUT_SECONDS"])
+        result = db.session.execute(
+            update(Job)
+            .where(Job.status == "running", Job.locked_at < cutoff)
+            .values(status="queued", locked_by=None, locked_at=None)
+        )
+        db.session.commit()
+        return result.rowcount
+
+    def claim(self, worker_id):
+        """Lock the oldest due job for worker_id and return it, or None if there is none.
+
+        The claim is a conditional UPDATE, so of two workers racing for the
+        same row only one gets it; the loser just looks again. PostgreSQL
+        also skips rows another worker has locked instead of waiting.
+        """
+        while True:
+            now = ist_now()
+            query = (
+                select(Job.id)
+                .where(Job.status == "queued", Job.run_at <= now)
+                .order_by(Job.run_at, Job.id)
+                .limit(1)
+            )
+            if db.engine.dialect.name == "postgresql":
+                query = query.with_for_update(skip_locked=True)
+            job_id = db.session.scalar(query)
+            if job_id is None:
+                db.session.rollback()
+                return None
+            result = db.session.execute(
+                update(Job)
+                .where(Job.id == job_id, Job.status == "queued")
+                .values(status="running", locked_by=worker_id, locked_at=now, attempts=Job.attempts + 1)
+            )
+            db.session.commit()
+            if result.rowcount == 1:
+                return db.session.get(Job, job_id)
+
+    def perform(self, job):
+        """Run a claimed job; delete it on success, reschedule or bury it on failure."""
+        job_id, name, attempts, max_attempts = job.id, job.name, job.attempts, job.max_attempts
+        try:
+            task = self.tasks.get(name)
+            if task is None:
+                raise LookupError(f"No task named {name!r}.")
+            task.func(**json.loads(job.payload))
+            db.session.execute(delete(Job).where(Job.id == job_id))
+            db.session.commit()
+            return True
+        except Exception:
+            db.session.rollback()
+            error = traceback.format_exc()
+
+        values = {"locked_by": None, "locked_at": None, "last_error": error}
+        if attempts >= max_attempts:
+            values["status"] = "dead"
+            current_app.logger.error("job %s (%s) failed %d times, giving up:\n%s", job_id, name, attempts, error)
+        else:
+            values["status"] = "queued"
+            values["run_at"] = ist_now() + timedelta(seconds=self.backoff(attempts))
+            current_app.logger.warning("job %s (%s) failed, will retry:\n%s", job_id, name, error)
+        db.session.execute(update(Job).where(Job.id == job_id).values(**values))
+        db.session.commit()
+        return False
+
+    def backoff(self, attempts):
+        """Seconds to wait before another try, doubling per attempt, with jitter
+        so jobs that failed together do not all come back together."""
+        config = current_app.config
+        delay = min(config["JOBS_BACKOFF_SECONDS"] * 2 ** (attempts - 1), config["JOBS_MAX_BACKOFF_SECONDS"])
+        return delay * random.uniform(0.5, 1.0)
+
+    def work(self, worker_id=None, burst=False, poll=None):
+        """Claim and run jobs until SIGTERM or SIGINT, returning how many ran.
+
+        With burst, return as soon as no job is due instead of polling.
+        """
+        worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}"
+        poll = current_app.config["JOBS_POLL_SECONDS"] if poll is None else poll
+        stopping = []
+
+        def stop(signum, frame):
+            stopping.append(signum)
+
+        previous = {sig: signal.signal(sig, stop) for sig in (signal.SIGTERM, signal.SIGINT)}
+        done = 0
+        try:
+            self.requeue_stale()
+            while not stopping:
+                job = self.claim(worker_id)
+                if job is None:
+                    if burst:
+                        break
+                    time.sleep(poll)
+                    self.requeue_stale()
+                    continue
+                self.perform(job)
+                done += 1
+        finally:
+            for sig, handler in previous.items():
+                signal.signal(sig, handler)
+            db.session.remove()
+        return done
+
+    def dead(self):
+        return db.session.scalars(select(Job).where(Job.status == "dead").order_by(Job.id)).all()
+
+    def retry(self, job_ids=None):
+        """Queue dead jobs again with a fresh set of attempts, returning how many."""
+        query = update(Job).where(Job.status == "dead")
+        if job_ids:
+            query = query.where(Job.id.in_(job_ids))
+        result = db.session.execute(
+            query.values(status="queued", attempts=0, run_at=ist_now(), last_error=None)
+        )
+        db.session.commit()
+        return result.rowcount
+
+
+jobs = JobQueue()
+
+
+@event.listens_for(db.session, "after_commit")
+def _inline_jobs_committed(session):
+    pending = session.info.pop(_PENDING, None)
+    if pending:
+        session.info.setdefault(_READY, []).extend(pending)
+
+
+@event.listens_for(db.session, "after_soft_rollback")
+def _drop_inline_jobs(session, previous_transaction):
+    # soft, as a transaction that never reached the database only rolls back softly
+    if not previous_transaction.nested:
+        session.info.pop(_PENDING, None)
+
+
+@registry.collector(shared=True)
+def _queue_state():
+    if current_app.config["JOBS_INLINE"]:
+        return []
+    count, age = jobs.backlog()
+    if age > current_app.config["JOBS_WARN_AFTER_SECONDS"]:
+        current_app.logger.warning(
+            "%d due jobs, the oldest waiting %ds; is `flask jobs work` running?", count, age)
+    return [
+        "# TYPE bugtracker_jobs_due gauge",
+        f"bugtracker_jobs_due {count}",
+        "# TYPE bugtracker_jobs_oldest_due_seconds gauge",
+        f"bugtracker_jobs_oldest_due_seconds {age:.0f}",
+    ]
@@ -0,0 +1,19 @@
+# app/loaders.py
+from sqlalchemy.orm import joinedload
+
+from .models import Issue
+
+# Loader profiles: every relationship a view's template touches, loaded up
+# front so the number of queries per page does not grow with the rows shown.
+# Pass them to .options(*PROFILE) on the view's main query.
+
+ISSUE_LIST = (
+    joinedload(Issue.reporter),
+    joinedload(Issue.assignee),
+)
+
+ISSUE_DETAIL = (
+    joinedload(Issue.project),
+    joinedload(Issue.reporter),
+    joinedload(Issue.assignee),
+)
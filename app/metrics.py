@@ -0,0 +1,423 @@
+# app/metrics.py
+import hmac
+import json
+import logging
+import os
+import threading
+import time
+from bisect import bisect_left
+
+from flask import Response, abort, current_app, g, has_app_context, request, before_render_template, template_rendered
+from sqlalchemy import event
+
+from . import db
+
+logger = logging.getLogger("bugtracker.sql")
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (1, 2, 3, 5, 8, 13, 21, 34, 55, 89)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in labels) + "}"
+
+
+class Histogram:
+    def __init__(self, name, help, buckets):
+        self.name = name
+        self.help = help
+        self.buckets = buckets
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(sorted(labels.items()))
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                # per-bucket counts (the last one is +Inf), then sum
+                series = self._series[key] = [0] * (len(self.buckets) + 1) + [0.0]
+            series[index] += 1
+            series[-1] += value
+
+    def snapshot(self):
+        with self._lock:
+            return {key: list(series) for key, series in self._series.items()}
+
+    def render(self, series_by_key=None):
+        """Exposition lines for series_by_key, by default this process's series."""
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        if series_by_key is None:
+            series_by_key = self.snapshot()
+        for key, series in sorted(series_by_key.items()):
+            cumulative = 0
+            for bound, count in zip((*self.buckets, "+Inf"), series):
+                cumulative += count
+                lines.append(f"{self.name}_bucket{_format_labels(key + (('le', bound),))} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(key)} {series[-1]}")
+            lines.append(f"{self.name}_count{_format_labels(key)} {cumulative}")
+        return lines
+
+
+class Counter:
+    def __init__(self, name, help):
+        self.name = name
+        self.help = help
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def snapshot(self):
+        with self._lock:
+            return dict(self._values)
+
+    def render(self, values=None):
+        """Exposition lines for values, by default this process's."""
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        if values is None:
+            values = self.snapshot()
+        lines += [f"{self.name}{_format_labels(key)} {value}" for key, value in sorted(values.items())]
+        return lines
+
+
+def _add(total, values):
+    """Add one process's series to total: counters are numbers, histograms lists."""
+    for key, value in values.items():
+        current = total.get(key)
+        if current is None:
+            total[key] = value
+        elif isinstance(value, list):
+            if len(value) == len(current):  # buckets changed between deploys otherwise
+                total[key] = [a + b for a, b in zip(current, value)]
+        else:
+            total[key] = current + value
+
+
+def _read(path):
+    """A file written by Registry.write: {metric name: {labels tuple: value}}."""
+    try:
+        with open(path) as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        # gone since listed, or a worker died mid-write before os.replace
+        return {}
+    return {
+        name: {tuple(tuple(pair) for pair in labels): value for labels, value in series}
+        for name, series in data.items()
+    }
+
+
+def _write(path, snapshot):
+    data = {name: [[list(key), value] for key, value in values.items()] for name, values in snapshot.items()}
+    temporary = f"{path}.tmp"
+    with open(temporary, "w") as f:
+        json.dump(data, f)
+    # readers see the old file or the new one, never half of one
+    os.replace(temporary, path)
+
+
+def combine(directory):
+    """Sum every process's file in directory."""
+    total = {}
+    for entry in sorted(os.listdir(directory)):
+        if entry.endswith(".json"):
+            for name, values in _read(os.path.join(directory, entry)).items():
+                _add(total.setdefault(name, {}), values)
+    return total
+
+
+def mark_process_dead(directory, pid):
+    """Fold an exited worker's file into dead.json so its counts outlive it.
+
+    Called by the gunicorn master (see gunicorn.conf.py), one worker at a
+    time, so the read-modify-write of dead.json does not race.
+    """
+    path = os.path.join(directory, f"{pid}.json")
+    if not os.path.exists(path):
+        return
+    dead_path = os.path.join(directory, "dead.json")
+    total = _read(dead_path)
+    for name, values in _read(path).items():
+        _add(total.setdefault(name, {}), values)
+    _write(dead_path, total)
+    os.remove(path)
+
+
+def _with_label(line, name, value):
+    if line.startswith("#"):
+        return line
+    series, _, sample = line.rpartition(" ")
+    label = f'{name}="{_escape(value)}"'
+    if series.endswith("}"):
+        series = f"{series[:-1]},{label}}}"
+    else:
+        series = f"{series}{{{label}}}"
+    return f"{series} {sample}"
+
+
+class Registry:
+    """Counters and histograms kept in process, plus collectors run at scrape time.
+
+    Each gunicorn worker has its own. With a directory (METRICS_DIR) every
+    worker also writes its counters and histograms there, as {pid}.json,
+    every METRICS_WRITE_SECONDS and whenever it serves /metrics, and
+    /metrics sums all the files, so whichever worker answers the scrape
+    reports the whole server. Collectors still describe the answering
+    worker and get a pid label, except shared ones, which read state every
+    worker sees, such as the database.
+    """
+
+    def __init__(self):
+        self._metrics = []
+        self._collectors = []
+        self._writer_pid = None
+        self._writer = None
+        self._writer_stop = threading.Event()
+        self._writer_lock = threading.Lock()
+
+    def histogram(self, name, help, buckets=LATENCY_BUCKETS):
+        metric = Histogram(name, help, buckets)
+        self._metrics.append(metric)
+        return metric
+
+    def counter(self, name, help):
+        metric = Counter(name, help)
+        self._metrics.append(metric)
+        return metric
+
+    def collector(self, func=None, *, shared=False):
+        """Register func() -> list of exposition lines, called at scrape time.
+
+        Use as @registry.collector, or @registry.collector(shared=True) when
+        the lines are the same whichever worker produces them.
+        """
+        if func is None:
+            return lambda func: self.collector(func, shared=shared)
+        self._collectors.append((func, shared))
+        return func
+
+    def write(self, directory):
+        """Write this process's counters and histograms to directory/{pid}.json."""
+        snapshot = {metric.name: metric.snapshot() for metric in self._metrics}
+        _write(os.path.join(directory, f"{os.getpid()}.json"), snapshot)
+
+    def start_writer(self, directory, interval):
+        """Call write(directory) every interval seconds from a daemon thread.
+
+        Once per process: a worker forked from a preloaded app has to start
+        its own, as threads do not survive the fork.
+        """
+        with self._writer_lock:
+            if self._writer_pid == os.getpid():
+                return
+            self._writer_pid = os.getpid()
+            stop = self._writer_stop = threading.Event()
+
+        def run():
+            while not stop.wait(interval):
+                try:
+                    self.write(directory)
+                except OSError:
+                    logger.exception("could not write metrics to %s", directory)
+
+        self._writer = threading.Thread(target=run, name="metrics-writer", daemon=True)
+        self._writer.start()
+
+    def stop_writer(self):
+        """Stop the thread start_writer() started in this process, if any."""
+        with self._writer_lock:
+            if self._writer_pid != os.getpid():
+                return
+            self._writer_pid = None
+            self._writer_stop.set()
+            writer, self._writer = self._writer, None
+        writer.join()
+
+    def render(self, directory=None):
+        lines = []
+        if directory is None:
+            for metric in self._metrics:
+                lines += metric.render()
+        else:
+            self.write(directory)
+            total = combine(directory)
+            for metric in self._metrics:
+                lines += metric.render(total.get(metric.name, {}))
+        for collect, shared in self._collectors:
+            collected = collect()
+            if directory is not None and not shared:
+                collected = [_with_label(line, "pid", os.getpid()) for line in collected]
+            lines += collected
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+request_duration = registry.histogram(
+    "bugtracker_request_duration_seconds", "Time to build a response, per endpoint.")
+request_sql_duration = registry.histogram(
+    "bugtracker_request_sql_duration_seconds", "Total time spent in SQL per request.")
+request_queries = registry.histogram(
+    "bugtracker_request_sql_queries", "SQL statements executed per request.", QUERY_COUNT_BUCKETS)
+template_duration = registry.histogram(
+    "bugtracker_template_render_seconds", "Time spent rendering templates per request.")
+requests_total = registry.counter(
+    "bugtracker_requests_total", "Responses sent, by endpoint, method and status.")
+
+
+@registry.collector
+def _identity_cache():
+    from .identity import identity_cache_stats
+
+    stats = identity_cache_stats()
+    return [
+        "# TYPE bugtracker_identity_cache_hits_total counter",
+        f"bugtracker_identity_cache_hits_total {stats['hits']}",
+        "# TYPE bugtracker_identity_cache_misses_total counter",
+        f"bugtracker_identity_cache_misses_total {stats['misses']}",
+        "# TYPE bugtracker_identity_cache_size gauge",
+        f"bugtracker_identity_cache_size {stats['size']}",
+    ]
+
+
+class _RequestStats:
+    __slots__ = ("started", "status", "queries", "sql_seconds", "template_seconds", "templates")
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        # set from the response in after_request, which an unhandled error skips
+        self.status = None
+        self.queries = 0
+        self.sql_seconds = 0.0
+        self.template_seconds = 0.0
+        # start times of templates being rendered, innermost last
+        self.templates = []
+
+
+def _current_stats():
+    return g.get("_metrics") if has_app_context() else None
+
+
+def _before_request():
+    directory = current_app.config["METRICS_DIR"]
+    # tests would leave the thread running; a scrape writes this process's file anyway
+    if directory and not current_app.testing:
+        registry.start_writer(directory, current_app.config["METRICS_WRITE_SECONDS"])
+    g._metrics = _RequestStats()
+
+
+def _after_request(response):
+    stats = _current_stats()
+    if stats is not None:
+        stats.status = response.status_code
+    return response
+
+
+def _teardown_request(exc):
+    # recorded here rather than in after_request, which does not run when
+    # a view raises, so failed requests are counted as 500s too
+    stats = g.pop("_metrics", None)
+    if stats is None:
+        return
+    status = stats.status if exc is None and stats.status is not None else 500
+    endpoint = request.endpoint or "unmatched"
+    request_duration.observe(time.perf_counter() - stats.started, endpoint=endpoint)
+    request_sql_duration.observe(stats.sql_seconds, endpoint=endpoint)
+    request_queries.observe(stats.queries, endpoint=endpoint)
+    template_duration.observe(stats.template_seconds, endpoint=endpoint)
+    requests_total.inc(endpoint=endpoint, method=request.method, status=status)
+
+
+def _template_started(sender, template, context, **extra):
+    stats = _current_stats()
+    if stats is not None:
+        stats.templates.append(time.perf_counter())
+
+
+def _template_finished(sender, template, context, **extra):
+    stats = _current_stats()
+    if stats is not None and stats.templates:
+        started = stats.templates.pop()
+        # a render_template call nested in another is already inside its time
+        if not stats.templates:
+            stats.template_seconds += time.perf_counter() - started
+
+
+def _explain(conn, cursor, statement, parameters):
+    prefix = "EXPLAIN QUERY PLAN " if conn.dialect.name == "sqlite" else "EXPLAIN "
+    # a raw DBAPI cursor, so the EXPLAIN is not itself timed and logged
+    explain_cursor = cursor.connection.cursor()
+    try:
+        explain_cursor.execute(prefix + statement, parameters)
+        return "\n".join(" ".join(str(col) for col in row) for row in explain_cursor.fetchall())
+    except Exception as error:  # the plan is best effort; never fail the query over it
+        return f"(no plan: {error})"
+    finally:
+        explain_cursor.close()
+
+
+def instrument_engine(engine, slow_query_seconds=None, explain=True):
+    @event.listens_for(engine, "before_cursor_execute")
+    def _query_started(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("_query_started", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _query_finished(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info["_query_started"].pop()
+        stats = _current_stats()
+        if stats is not None:
+            stats.queries += 1
+            stats.sql_seconds += elapsed
+
+        if slow_query_seconds is not None and elapsed >= slow_query_seconds:
+            plan = ""
+            if explain and not executemany and statement.lstrip()[:6].upper() == "SELECT":
+                plan = "\n" + _explain(conn, cursor, statement, parameters)
+            logger.warning("slow query (%.1f ms): %s%s", elapsed * 1000, statement, plan)
+
+
+def metrics_view():
+    token = current_app.config["METRICS_TOKEN"]
+    if not token and not current_app.config["METRICS_PUBLIC"]:
+        # not configured for scraping; don't advertise the endpoint
+        abort(404)
+    authorization = request.headers.get("Authorization", "")
+    if token and not hmac.compare_digest(authorization.encode(), f"Bearer {token}".encode()):
+        abort(401)
+    directory = current_app.config["METRICS_DIR"]
+    return Response(registry.render(directory), mimetype="text/plain; version=0.0.4")
+
+
+def init_app(app):
+    app.config.setdefault("METRICS_ENABLED", True)
+    app.config.setdefault("METRICS_TOKEN", None)
+    app.config.setdefault("METRICS_PUBLIC", False)
+    app.config.setdefault("METRICS_DIR", None)
+    app.config.setdefault("METRICS_WRITE_SECONDS", 5)
+    app.config.setdefault("SLOW_QUERY_MS", None)
+    app.config.setdefault("SLOW_QUERY_EXPLAIN", True)
+    if not app.config["METRICS_ENABLED"]:
+        return
+
+    slow_ms = app.config["SLOW_QUERY_MS"]
+    with app.app_context():
+        for engine in db.engines.values():
+            instrument_engine(engine, slow_ms / 1000 if slow_ms is not None else None, app.config["SLOW_QUERY_EXPLAIN"])
+
+    app.before_request(_before_request)
+    app.after_request(_after_request)
+    app.teardown_request(_teardown_request)
+    before_render_template.connect(_template_started, app)
+    template_rendered.connect(_template_finished, app)
+    app.add_url_rule("/metrics", "metrics", metrics_view)
@@ -3,10 +3,13 @@ from . import db
 from flask_login import UserMixin
 from datetime import datetime
 from zoneinfo import ZoneInfo
-from sqlalchemy import DateTime
+from sqlalchemy import DateTime, func
     
 IST = ZoneInfo("Asia/Kolkata")
 
+ISSUE_STATUSES = ["Open", "In Progress", "Resolved", "Closed"]
+ISSUE_PRIORITIES = ["Low", "Medium", "High", "Critical"]
+
 def ist_now():
     return datetime.now(tz=IST)
 
@@ -21,6 +24,9 @@ class User(db.Model, UserMixin):
     def __repr__(self):
         return f"<User {self.username}>"
 
+# case-insensitive username prefix search for the assignee picker
+db.Index("ix_user_username_lower", func.lower(User.username))
+
 class Project(db.Model):
     __tablename__ = "project"
 
@@ -38,25 +44,42 @@ class Project(db.Model):
 class Issue(db.Model):
     __tablename__ = "issue"
 
-    id = db.Column(db.Integer, primary_key=True, index=True)
-    title = db.Column(db.String(200), nullable=False, index=True)
-    description = db.Column(db.Text, nullable=True, index=True)
+    id = db.Column(db.Integer, primary_key=True)
+    title = db.Column(db.String(200), nullable=False)
+    description = db.Column(db.Text, nullable=True)
 
-    status = db.Column(db.String(30), default="Open", nullable=False, index=True)
-    priority = db.Column(db.String(20), default="Medium", nullable=False, index=True)
+    status = db.Column(db.String(30), default="Open", nullable=False)
+    priority = db.Column(db.String(20), default="Medium", nullable=False)
 
-    project_id = db.Column(db.Integer, db.ForeignKey("project.id"), nullable=False, index=True)
+    project_id = db.Column(db.Integer, db.ForeignKey("project.id"), nullable=False)
     project = db.relationship("Project", backref=db.backref("issues", lazy="dynamic"))
 
-    reporter_id = db.Column(db.Integer, db.ForeignKey("user.id"), nullable=False, index=True)
+    reporter_id = db.Column(db.Integer, db.ForeignKey("user.id"), nullable=False)
     reporter = db.relationship("User", foreign_keys=[reporter_id])
 
-    assignee_id = db.Column(db.Integer, db.ForeignKey("user.id"), nullable=True, index=True)
+    assignee_id = db.Column(db.Integer, db.ForeignKey("user.id"), nullable=True)
     assignee = db.relationship("User", foreign_keys=[assignee_id])
 
-    created_at = db.Column(DateTime(timezone=True), default=ist_now, index=True)
-    updated_at = db.Column(DateTime(timezone=True), default=ist_now, onupdate=ist_now, index=True)
-    due_date = db.Column(DateTime(timezone=True), nullable=True, index=True)
+    created_at = db.Column(DateTime(timezone=True), default=ist_now)
+    updated_at = db.Column(DateTime(timezone=True), default=ist_now, onupdate=ist_now)
+    due_date = db.Column(DateTime(timezone=True), nullable=True)
+
+    # bumped by every UPDATE, which only applies if the row still has the
+    # version it was loaded with; see app/edits.py
+    version = db.Column(db.Integer, nullable=False, default=1, server_default="1")
+
+    # Indexes follow the issue list's access paths: a project's issues newest
+    # first, optionally filtered by one of status, assignee or priority.
+    # Text search goes through the search index, not these.
+    __table_args__ = (
+        db.Index("ix_issue_project_created", "project_id", "created_at", "id"),
+        db.Index("ix_issue_project_status", "project_id", "status", "created_at", "id"),
+        db.Index("ix_issue_project_assignee", "project_id", "assignee_id", "created_at", "id"),
+        db.Index("ix_issue_project_priority", "project_id", "priority", "created_at", "id"),
+        # "My issues": a user's assigned issues in some statuses, latest change first
+        db.Index("ix_issue_assignee_status_updated", "assignee_id", "status", "updated_at"),
+    )
+    __mapper_args__ = {"version_id_col": version}
 
     def __repr__(self):
         return f"<Issue {self.title!r} ({self.status})>"
@@ -68,7 +91,8 @@ class Comment(db.Model):
     issue_id = db.Column(db.Integer, db.ForeignKey("issue.id"), nullable=False)
     issue = db.relationship(
         "Issue",
-        backref=db.backref("comments", cascade="all, delete-orphan", order_by="Comment.created_at"),
+        # a query, not a list: long-lived issues have thousands; see app/timeline.py
+        backref=db.backref("comments", lazy="dynamic", cascade="all, delete-orphan", order_by="Comment.created_at"),
     )
 
     user_id = db.Column(db.Integer, db.ForeignKey("user.id"), nullable=False)
@@ -77,6 +101,8 @@ class Comment(db.Model):
     content = db.Column(db.Text, nullable=False)
     created_at = db.Column(DateTime(timezone=True), default=ist_now)
 
+    __table_args__ = (db.Index("ix_comment_issue_created", "issue_id", "created_at"),)
+
     def __repr__(self):
         return f"<Comment by user_id={self.user_id} on issue_id={self.issue_id}>"
 
@@ -87,7 +113,7 @@ class Activity(db.Model):
     id=db.Column(db.Integer, primary_key=True)
 
     issue_id=db.Column(db.Integer, db.ForeignKey("issue.id"))
-    issue=db.relationship("Issue",backref=db.backref("activities", cascade="all, delete-orphan", order_by="Activity.created_at"))
+    issue=db.relationship("Issue",backref=db.backref("activities", lazy="dynamic", cascade="all, delete-orphan", order_by="Activity.created_at"))
 
     user_id=db.Column(db.Integer, db.ForeignKey("user.id"))
     user=db.relationship("User")
@@ -96,11 +122,51 @@ class Activity(db.Model):
 
     detail=db.Column(db.Text, nullable=True)
 
+    # an "Updated" activity records one changed field, values as text;
+    # app/history.py describes it. detail is only used by other actions
+    field=db.Column(db.String(30), nullable=True)
+    old_value=db.Column(db.String(200), nullable=True)
+    new_value=db.Column(db.String(200), nullable=True)
+
     created_at=db.Column(DateTime(timezone=True), default=ist_now)
 
+    __table_args__=(
+        db.Index("ix_activity_issue_created", "issue_id", "created_at"),
+        db.Index("ix_activity_created", "created_at"),
+    )
+
     def __repr__(self):
         return f"Activity {self.action} by {self.user.id} on issue {self.issue.id}"
-    
+
+
+class ActivityArchive(db.Model):
+    """Activity moved out of the activity table by `flask activity archive`.
+
+    Rows keep their ids, so the two tables together read as one log; see
+    app/activity.py.
+    """
+    __tablename__ = "activity_archive"
+
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    issue_id = db.Column(db.Integer, db.ForeignKey("issue.id"))
+    issue = db.relationship("Issue", backref=db.backref("archived_activities", lazy="dynamic", cascade="all, delete-orphan"))
+    user_id = db.Column(db.Integer, db.ForeignKey("user.id"))
+    action = db.Column(db.String(50), nullable=False)
+    detail = db.Column(db.Text, nullable=True)
+    field = db.Column(db.String(30), nullable=True)
+    old_value = db.Column(db.String(200), nullable=True)
+    new_value = db.Column(db.String(200), nullable=True)
+    created_at = db.Column(DateTime(timezone=True))
+
+    __table_args__ = (
+        db.Index("ix_activity_archive_issue_created", "issue_id", "created_at"),
+        db.Index("ix_activity_archive_created", "created_at"),
+    )
+
+    def __repr__(self):
+        return f"<ActivityArchive {self.id} {self.action} on issue_id={self.issue_id}>"
+
+
 class ProjectMember(db.Model):
     __tablename__="project_member"
 
@@ -114,3 +180,81 @@ class ProjectMember(db.Model):
 
     __table_args__=(db.UniqueConstraint("project_id", "user_id", name="uq_project_user"),)
 
+
+class SavedFilter(db.Model):
+    """A named set of issue list filters one user keeps for one project."""
+    __tablename__ = "saved_filter"
+
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey("user.id"), nullable=False)
+    project_id = db.Column(db.Integer, db.ForeignKey("project.id"), nullable=False)
+    name = db.Column(db.String(100), nullable=False)
+    # the filters as a query string, e.g. "status=Open&priority=High"
+    params = db.Column(db.String(500), nullable=False, default="")
+    created_at = db.Column(DateTime(timezone=True), default=ist_now)
+
+    __table_args__ = (db.UniqueConstraint("user_id", "project_id", "name", name="uq_saved_filter_name"),)
+
+    def __repr__(self):
+        return f"<SavedFilter {self.name!r} user_id={self.user_id} project_id={self.project_id}>"
+
+
+class ProjectIssueCount(db.Model):
+    """Denormalized issue counts per project bucket, kept up to date by issue writes.
+
+    See app/counters.py. assignee_id 0 stands for unassigned so that every
+    bucket has a non-null primary key to upsert on.
+    """
+    __tablename__ = "project_issue_count"
+
+    project_id = db.Column(db.Integer, db.ForeignKey("project.id"), primary_key=True)
+    status = db.Column(db.String(30), primary_key=True)
+    priority = db.Column(db.String(20), primary_key=True)
+    assignee_id = db.Column(db.Integer, primary_key=True, default=0)
+    count = db.Column(db.Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f"<ProjectIssueCount project_id={self.project_id} {self.status}/{self.priority}/{self.assignee_id}: {self.count}>"
+
+
+class ImportCheckpoint(db.Model):
+    """How far `flask import issues` has got through a named source.
+
+    Saved in the same transaction as each imported chunk, so a resumed
+    import neither skips nor repeats records.
+    """
+    __tablename__ = "import_checkpoint"
+
+    source = db.Column(db.String(255), primary_key=True)
+    position = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(DateTime(timezone=True), default=ist_now, onupdate=ist_now)
+
+    def __repr__(self):
+        return f"<ImportCheckpoint {self.source}: {self.position}>"
+
+
+class Job(db.Model):
+    """A queued background job; see app/jobs.py.
+
+    Rows are deleted once their job succeeds. A job that fails
+    max_attempts times stays behind with status "dead" for inspection.
+    """
+    __tablename__ = "job"
+
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(100), nullable=False)
+    payload = db.Column(db.Text, nullable=False, default="{}")
+    status = db.Column(db.String(20), nullable=False, default="queued")
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    max_attempts = db.Column(db.Integer, nullable=False, default=5)
+    run_at = db.Column(DateTime(timezone=True), nullable=False, default=ist_now)
+    locked_by = db.Column(db.String(100), nullable=True)
+    locked_at = db.Column(DateTime(timezone=True), nullable=True)
+    last_error = db.Column(db.Text, nullable=True)
+    created_at = db.Column(DateTime(timezone=True), default=ist_now)
+
+    # workers look for the oldest due job of a status
+    __table_args__ = (db.Index("ix_job_status_run_at", "status", "run_at"),)
+
+    def __repr__(self):
+        return f"<Job {self.id} {self.name} ({self.status})>"
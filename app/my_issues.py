@@ -0,0 +1,88 @@
+# app/my_issues.py
+from collections import namedtuple
+
+from flask import current_app
+from sqlalchemy import and_, event, inspect, select
+
+from . import db
+from .cache import TTLCache
+from .models import ISSUE_STATUSES, Issue, Project, ProjectMember
+
+MyIssue = namedtuple("MyIssue", "id title status priority due_date updated_at project_id project_name")
+
+# the statuses "My issues" shows unless asked for another: work still to do
+ACTIVE_STATUSES = ("Open", "In Progress")
+VIEWS = {"active": ACTIVE_STATUSES, "all": tuple(ISSUE_STATUSES), **{status: (status,) for status in ISSUE_STATUSES}}
+
+# session.info key for users whose lists go stale when the transaction commits
+_TOUCHED = "_touched_assignees"
+
+# (user_id, view) -> tuple of MyIssue
+_lists = TTLCache(maxsize=4096, ttl=60)
+
+
+def my_issues(user_id, view="active"):
+    """Issues assigned to the user in projects they belong to, latest change first.
+
+    At most MY_ISSUES_LIMIT of them. A range scan per status on
+    ix_issue_assignee_status_updated, cached per user and view until an
+    issue assigned to them, or just taken off them, changes.
+    """
+    key = (user_id, view)
+    items = _lists.get(key)
+    if items is None:
+        rows = db.session.execute(
+            select(Issue.id, Issue.title, Issue.status, Issue.priority, Issue.due_date, Issue.updated_at,
+                   Project.id, Project.name)
+            .join(Project, Issue.project_id == Project.id)
+            .join(ProjectMember, and_(ProjectMember.project_id == Issue.project_id, ProjectMember.user_id == user_id))
+            .where(Issue.assignee_id == user_id, Issue.status.in_(VIEWS[view]))
+            .order_by(Issue.updated_at.desc(), Issue.id.desc())
+            .limit(current_app.config["MY_ISSUES_LIMIT"])
+        )
+        items = tuple(MyIssue(*row) for row in rows)
+        _lists.set(key, items)
+    return items
+
+
+def invalidate_my_issues(user_ids=None):
+    if user_ids is None:
+        _lists.clear()
+    else:
+        user_ids = set(user_ids)
+        _lists.delete_where(lambda key: key[0] in user_ids)
+
+
+def touch_assignees(session, user_ids):
+    """Invalidate these users' lists once the session's transaction commits."""
+    session.info.setdefault(_TOUCHED, set()).update(user_id for user_id in user_ids if user_id)
+
+
+@event.listens_for(db.session, "after_flush")
+def _collect_touched(session, flush_context):
+    touched = set()
+    for issue in (*session.new, *session.dirty, *session.deleted):
+        if not isinstance(issue, Issue):
+            continue
+        touched.add(issue.assignee_id)
+        # the previous assignee loses the issue from their list
+        touched.update(inspect(issue).attrs.assignee_id.history.deleted)
+    if touched:
+        touch_assignees(session, touched)
+
+
+@event.listens_for(db.session, "after_commit")
+def _invalidate_touched(session):
+    touched = session.info.pop(_TOUCHED, None)
+    if touched:
+        invalidate_my_issues(touched)
+
+
+@event.listens_for(db.session, "after_rollback")
+def _drop_touched(session):
+    session.info.pop(_TOUCHED, None)
+
+
+def init_app(app):
+    app.config.setdefault("MY_ISSUES_LIMIT", 200)
+    _lists.ttl = app.config.setdefault("MY_ISSUES_CACHE_TTL", 60)
@@ -0,0 +1,90 @@
+# app/pagination.py
+import base64
+import json
+from datetime import datetime
+
+from sqlalchemy import tuple_
+
+from .cache import TTLCache
+from .models import Issue
+
+# Totals shown under paginated lists are allowed to lag by up to ttl seconds
+# so that a list page does not run a COUNT(*) on every request.
+_counts = TTLCache(maxsize=4096, ttl=30)
+
+
+def approximate_count(key, query):
+    return _counts.get_or_set(key, lambda: query.order_by(None).count())
+
+
+def encode_cursor(issue, direction):
+    payload = json.dumps([issue.created_at.isoformat(), issue.id, direction], separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(token):
+    """Return (created_at, id, direction) for a token, or None if it is malformed."""
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        created_at, issue_id, direction = json.loads(base64.urlsafe_b64decode(padded))
+        issue_id = int(issue_id)
+        # beyond a 64-bit integer the database driver refuses the parameter
+        if direction not in ("next", "prev") or not 0 <= issue_id < 2 ** 63:
+            return None
+        return datetime.fromisoformat(created_at), issue_id, direction
+    except (ValueError, TypeError, OverflowError):
+        return None
+
+
+class KeysetPagination:
+    """One page of issues ordered newest first, keyed on (created_at, id).
+
+    Each page is a single index range scan on (project_id, created_at, id)
+    however deep it is, unlike OFFSET which reads and discards every row
+    before the page.
+    """
+
+    def __init__(self, query, cursor=None, per_page=20, total=None):
+        self.per_page = per_page
+        self.total = total
+
+        key = tuple_(Issue.created_at, Issue.id)
+        decoded = decode_cursor(cursor) if cursor else None
+
+        if decoded is None:
+            rows = query.order_by(Issue.created_at.desc(), Issue.id.desc()).limit(per_page + 1).all()
+            self.has_prev = False
+            self.has_next = len(rows) > per_page
+        elif decoded[2] == "next":
+            rows = (
+                query.filter(key < decoded[:2])
+                .order_by(Issue.created_at.desc(), Issue.id.desc())
+                .limit(per_page + 1)
+                .all()
+            )
+            self.has_prev = True
+            self.has_next = len(rows) > per_page
+        else:
+            rows = (
+                query.filter(key > decoded[:2])
+                .order_by(Issue.created_at.asc(), Issue.id.asc())
+                .limit(per_page + 1)
+                .all()
+            )
+            self.has_prev = len(rows) > per_page
+            self.has_next = True
+            rows = list(reversed(rows[:per_page]))
+
+        self.items = rows[:per_page]
+
+    @property
+    def next_cursor(self):
+        if self.has_next and self.items:
+            return encode_cursor(self.items[-1], "next")
+        return None
+
+    @property
+    def prev_cursor(self):
+        if self.has_prev and self.items:
+            return encode_cursor(self.items[0], "prev")
+        return None
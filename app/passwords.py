@@ -0,0 +1,97 @@
+# app/passwords.py
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeout
+
+from flask import current_app
+from werkzeug.exceptions import ServiceUnavailable
+from werkzeug.security import check_password_hash, generate_password_hash
+
+
+class PasswordHasher:
+    """Flask extension hashing and checking passwords off the request thread.
+
+    PASSWORD_HASH_METHOD takes werkzeug's method syntax with the work
+    factor, e.g. "scrypt:32768:8:1" or "pbkdf2:sha256:600000". A hash made
+    with any other method or factor still verifies, and verify() returns
+    a replacement for it so the account moves to the configured setting on
+    its next login, whether that is stronger or cheaper.
+
+    Checks run in a pool of PASSWORD_CHECK_THREADS threads per process, so
+    a burst of logins takes at most that many cores (scrypt and PBKDF2
+    release the GIL) and the other request threads keep serving pages. At
+    most PASSWORD_CHECK_BACKLOG more wait their turn; beyond that a login
+    is turned away with a 503 rather than queued without bound.
+    """
+
+    def __init__(self, app=None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault("PASSWORD_HASH_METHOD", "scrypt:32768:8:1")
+        app.config.setdefault("PASSWORD_SALT_LENGTH", 16)
+        app.config.setdefault("PASSWORD_CHECK_THREADS", 4)
+        app.config.setdefault("PASSWORD_CHECK_BACKLOG", 64)
+        app.config.setdefault("PASSWORD_CHECK_TIMEOUT", 10)
+        threads = app.config["PASSWORD_CHECK_THREADS"]
+        app.extensions["passwords"] = {
+            "pool": ThreadPoolExecutor(max_workers=threads, thread_name_prefix="password-check"),
+            "slots": threading.BoundedSemaphore(threads + app.config["PASSWORD_CHECK_BACKLOG"]),
+            # werkzeug expands a bare "scrypt" to its full parameters; see _prefix()
+            "prefixes": {},
+        }
+
+    @property
+    def _state(self):
+        return current_app.extensions["passwords"]
+
+    def hash(self, password):
+        config = current_app.config
+        return generate_password_hash(
+            password, method=config["PASSWORD_HASH_METHOD"], salt_length=config["PASSWORD_SALT_LENGTH"]
+        )
+
+    def _prefix(self):
+        """The method part ("scrypt:32768:8:1") of a hash made with the configured method."""
+        prefixes, method = self._state["prefixes"], current_app.config["PASSWORD_HASH_METHOD"]
+        if method not in prefixes:
+            prefixes[method] = self.hash("").split("$", 1)[0]
+        return prefixes[method]
+
+    def _verify(self, pwhash, password, prefix, method, salt_length):
+        if not check_password_hash(pwhash, password):
+            return False, None
+        if pwhash.split("$", 1)[0] == prefix:
+            return True, None
+        return True, generate_password_hash(password, method=method, salt_length=salt_length)
+
+    def verify(self, pwhash, password):
+        """Check password against pwhash in the pool; return (ok, new_hash).
+
+        new_hash is None unless the password was right and pwhash was made
+        with another method or work factor; the caller should store it.
+        Raises ServiceUnavailable when the backlog is full or the check
+        did not finish within PASSWORD_CHECK_TIMEOUT seconds.
+        """
+        state, config = self._state, current_app.config
+        if not state["slots"].acquire(blocking=False):
+            raise ServiceUnavailable("Too many logins at once. Try again in a moment.", retry_after=1)
+        try:
+            future = state["pool"].submit(
+                self._verify, pwhash, password or "", self._prefix(),
+                config["PASSWORD_HASH_METHOD"], config["PASSWORD_SALT_LENGTH"],
+            )
+        except BaseException:
+            state["slots"].release()
+            raise
+        # the slot is held until the check itself is done, even if we stop waiting
+        future.add_done_callback(lambda future: state["slots"].release())
+        try:
+            return future.result(timeout=config["PASSWORD_CHECK_TIMEOUT"])
+        except FutureTimeout:
+            future.cancel()
+            raise ServiceUnavailable("Login is taking too long. Try again in a moment.", retry_after=1)
+
+
+passwords = PasswordHasher()
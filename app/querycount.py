@@ -0,0 +1,63 @@
+# app/querycount.py
+import threading
+from contextlib import contextmanager
+from functools import wraps
+
+from flask import current_app
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+_local = threading.local()
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+class QueryCounter:
+    def __init__(self):
+        self.count = 0
+        self.statements = []
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _count_query(conn, cursor, statement, parameters, context, executemany):
+    for counter in getattr(_local, "counters", ()):
+        counter.count += 1
+        counter.statements.append(statement)
+
+
+@contextmanager
+def count_queries():
+    """Count the SQL statements this thread executes inside the block."""
+    counter = QueryCounter()
+    stack = _local.__dict__.setdefault("counters", [])
+    stack.append(counter)
+    try:
+        yield counter
+    finally:
+        stack.remove(counter)
+
+
+def query_budget(limit):
+    """Fail a view that runs more than ``limit`` queries, template included.
+
+    Only enforced when QUERY_BUDGETS_ENFORCED is set (it defaults to on under
+    app.testing), so production requests pay nothing for it. Put it below
+    @login_required so the user loader's query is not charged to the view.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            if not current_app.config.get("QUERY_BUDGETS_ENFORCED", current_app.testing):
+                return view(*args, **kwargs)
+            with count_queries() as counter:
+                response = view(*args, **kwargs)
+            if counter.count > limit:
+                raise QueryBudgetExceeded(
+                    f"{view.__name__} ran {counter.count} queries, budget is {limit}:\n"
+                    + "\n".join(counter.statements)
+                )
+            return response
+        return wrapper
+    return decorator
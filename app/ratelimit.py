@@ -0,0 +1,282 @@
+# app/ratelimit.py
+import re
+import threading
+import time
+
+from flask import current_app, request
+from flask_login import current_user
+from sqlalchemy.pool import QueuePool
+from werkzeug.exceptions import ServiceUnavailable, TooManyRequests
+from werkzeug.utils import import_string
+
+from . import db
+from .cache import TTLCache
+from .metrics import registry
+
+SAFE_METHODS = frozenset(("GET", "HEAD", "OPTIONS"))
+# never limited or shed: scrapes must get through precisely when things are busy
+_ALWAYS_EXEMPT = frozenset(("static", "metrics"))
+AUTH_ENDPOINTS = frozenset(("main.login", "main.register"))
+SEARCH_ENDPOINTS = frozenset(("main.project_issues", "api.project_issues", "main.member_search", "main.issue_export"))
+# a numbered search page costs one more token for every this many pages in
+DEEP_PAGE_STEP = 5
+
+_RATE_RE = re.compile(r"^\s*(\d+)\s*/\s*(\d*)\s*(second|minute|hour|s|m|h)?\s*$")
+_UNITS = {None: 1, "s": 1, "second": 1, "m": 60, "minute": 60, "h": 3600, "hour": 3600}
+
+decisions = registry.counter(
+    "bugtracker_ratelimit_requests_total", "Requests checked against a rate limit budget, by budget and result.")
+shed = registry.counter(
+    "bugtracker_load_shed_total", "Requests turned away before running, by reason.")
+
+
+def parse_rate(rate):
+    """(capacity, period seconds) for "20/60", "20/minute" or "100/5m"; None for an empty rate."""
+    if not rate:
+        return None
+    match = _RATE_RE.match(rate)
+    if match is None:
+        raise ValueError(f"bad rate {rate!r}; expected e.g. '20/60' or '20/minute'")
+    count, amount, unit = match.groups()
+    return int(count), int(amount or 1) * _UNITS[unit]
+
+
+class RateLimitStore:
+    """Interface for token bucket stores."""
+
+    def take(self, key, capacity, period, cost=1):
+        """Take cost tokens from the bucket at key, which holds capacity
+        tokens and refills completely over period seconds.
+
+        Returns (allowed, retry_after seconds, tokens left).
+        """
+        raise NotImplementedError
+
+    def size(self):
+        return None
+
+
+class LocalRateLimitStore(RateLimitStore):
+    """Per-process buckets, bounded to RATELIMIT_STORE_SIZE keys.
+
+    Each gunicorn worker counts separately, so a client can get up to
+    workers times its budget; use a shared store to enforce it exactly.
+    """
+
+    def __init__(self, config):
+        # a bucket left alone for longer than the longest period is full
+        # again, so forgetting it then changes nothing
+        self.buckets = TTLCache(maxsize=config["RATELIMIT_STORE_SIZE"], ttl=3600)
+        self._lock = threading.Lock()
+
+    def take(self, key, capacity, period, cost=1):
+        now = time.monotonic()
+        rate = capacity / period
+        with self._lock:
+            tokens, updated = self.buckets.get(key, (capacity, now))
+            tokens = min(capacity, tokens + (now - updated) * rate)
+            allowed = tokens >= cost
+            if allowed:
+                tokens -= cost
+            self.buckets.set(key, (tokens, now))
+        retry_after = 0 if allowed else (cost - tokens) / rate
+        return allowed, retry_after, tokens
+
+    def size(self):
+        return self.buckets.stats()["size"]
+
+
+class RedisRateLimitStore(RateLimitStore):
+    """Buckets shared by every worker in Redis at RATELIMIT_STORE_URL.
+
+    Needs the redis package. Each take is one atomic script call.
+    """
+
+    prefix = "bugtracker:ratelimit:"
+    script = """
+    local capacity, rate, cost, now = tonumber(ARGV[1]), tonumber(ARGV[2]), tonumber(ARGV[3]), tonumber(ARGV[4])
+    local bucket = redis.call('HMGET', KEYS[1], 'tokens', 'updated')
+    local tokens = tonumber(bucket[1]) or capacity
+    local updated = tonumber(bucket[2]) or now
+    tokens = math.min(capacity, tokens + math.max(0, now - updated) * rate)
+    local allowed = 0
+    if tokens >= cost then
+        tokens = tokens - cost
+        allowed = 1
+    end
+    redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'updated', tostring(now))
+    redis.call('EXPIRE', KEYS[1], math.ceil(capacity / rate) + 1)
+    return {allowed, tostring(tokens)}
+    """
+
+    def __init__(self, config):
+        import redis
+
+        self.client = redis.Redis.from_url(config["RATELIMIT_STORE_URL"])
+        self._take = self.client.register_script(self.script)
+
+    def take(self, key, capacity, period, cost=1):
+        rate = capacity / period
+        allowed, tokens = self._take(keys=[self.prefix + key], args=[capacity, rate, cost, time.time()])
+        tokens = float(tokens)
+        return bool(allowed), 0 if allowed else (cost - tokens) / rate, tokens
+
+
+STORES = {
+    "local": LocalRateLimitStore,
+    "redis": RedisRateLimitStore,
+}
+
+
+def exempt(view):
+    """Leave a view out of rate limiting and load shedding, e.g. a long-lived stream."""
+    view._ratelimit_exempt = True
+    return view
+
+
+def _pool_saturated(engine):
+    pool = engine.pool
+    if not isinstance(pool, QueuePool) or pool._max_overflow < 0:
+        return False
+    return pool.checkedout() >= pool.size() + pool._max_overflow
+
+
+class RateLimiter:
+    """Flask extension applying token bucket budgets and load shedding.
+
+    Every request is first checked for overload: with more than
+    SHED_MAX_IN_FLIGHT requests already running in this process, or every
+    connection of the database pool checked out, it gets an immediate 503
+    instead of queueing behind them. It is then charged to its budget, both
+    per user (when logged in) and per client IP:
+
+    - "auth": logging in and registering;
+    - "search": the issue list and API with ?q, the assignee search and
+      exports, with deep ?page numbers costing more;
+    - "write": any other POST, PUT, PATCH or DELETE.
+
+    Budgets are RATELIMIT_AUTH, RATELIMIT_SEARCH and RATELIMIT_WRITE rates
+    such as "20/minute"; an empty one is unlimited. Other requests are only
+    shed, never limited. RATELIMIT_STORE may be a key of STORES or a dotted
+    import path to a callable taking the app config and returning a
+    RateLimitStore.
+
+    RATELIMIT_ENABLED off turns both limiting and shedding off. Client
+    IPs come from request.remote_addr; behind a proxy, wrap the app
+    in werkzeug's ProxyFix so they are the clients' and not the proxy's.
+    """
+
+    def __init__(self, app=None):
+        self._in_flight = 0
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault("RATELIMIT_ENABLED", True)
+        app.config.setdefault("RATELIMIT_STORE", "local")
+        app.config.setdefault("RATELIMIT_STORE_SIZE", 100000)
+        app.config.setdefault("RATELIMIT_STORE_URL", None)
+        app.config.setdefault("RATELIMIT_AUTH", "10/minute")
+        app.config.setdefault("RATELIMIT_SEARCH", "30/minute")
+        app.config.setdefault("RATELIMIT_WRITE", "60/minute")
+        app.config.setdefault("SHED_MAX_IN_FLIGHT", None)
+        app.config.setdefault("SHED_ON_DB_POOL", True)
+        if not app.config["RATELIMIT_ENABLED"]:
+            return
+
+        name = app.config["RATELIMIT_STORE"]
+        factory = STORES.get(name) or import_string(name)
+        app.extensions["ratelimit"] = {
+            "store": factory(app.config),
+            "budgets": {
+                budget: parse_rate(app.config[f"RATELIMIT_{budget.upper()}"])
+                for budget in ("auth", "search", "write")
+            },
+        }
+        app.before_request(self._before_request)
+        app.teardown_request(self._teardown_request)
+
+    def _exempt(self):
+        if request.endpoint is None or request.endpoint in _ALWAYS_EXEMPT:
+            return True
+        view = current_app.view_functions.get(request.endpoint)
+        return getattr(view, "_ratelimit_exempt", False)
+
+    def _before_request(self):
+        if self._exempt():
+            return
+        with self._lock:
+            self._in_flight += 1
+            in_flight = self._in_flight
+        request.environ["bugtracker.ratelimit.counted"] = True
+
+        limit = current_app.config["SHED_MAX_IN_FLIGHT"]
+        if limit and in_flight > limit:
+            self._shed("in_flight")
+        if current_app.config["SHED_ON_DB_POOL"] and any(_pool_saturated(e) for e in db.engines.values()):
+            self._shed("db_pool")
+
+        budget, cost = self.classify()
+        if budget is not None:
+            self.charge(budget, cost)
+
+    def _teardown_request(self, exc):
+        if request.environ.pop("bugtracker.ratelimit.counted", False):
+            with self._lock:
+                self._in_flight -= 1
+
+    def _shed(self, reason):
+        shed.inc(reason=reason)
+        raise ServiceUnavailable("The server is busy. Try again in a moment.", retry_after=1)
+
+    def classify(self):
+        """(budget, cost) for the current request, or (None, 0) if it has none."""
+        if request.endpoint in AUTH_ENDPOINTS:
+            return ("auth", 1) if request.method not in SAFE_METHODS else (None, 0)
+        if request.method not in SAFE_METHODS:
+            return "write", 1
+        if request.endpoint in SEARCH_ENDPOINTS:
+            if request.endpoint.endswith("project_issues") and not request.args.get("q"):
+                return None, 0
+            page = max(request.args.get("page", 1, type=int), 1)
+            return "search", 1 + (page - 1) // DEEP_PAGE_STEP
+        return None, 0
+
+    def charge(self, budget, cost=1):
+        """Take cost from the budget for this client; raise 429 if it is spent."""
+        state = current_app.extensions["ratelimit"]
+        rate = state["budgets"].get(budget)
+        if rate is None:
+            return
+        capacity, period = rate
+        cost = min(cost, capacity)
+        keys = [f"{budget}:ip:{request.remote_addr}"]
+        if current_user.is_authenticated:
+            keys.append(f"{budget}:user:{current_user.id}")
+        for key in keys:
+            allowed, retry_after, _ = state["store"].take(key, capacity, period, cost)
+            if not allowed:
+                decisions.inc(budget=budget, result="limited")
+                raise TooManyRequests("Too many requests. Slow down and try again shortly.",
+                                      retry_after=max(1, round(retry_after)))
+        decisions.inc(budget=budget, result="allowed")
+
+
+limiter = RateLimiter()
+
+
+@registry.collector
+def _limiter_state():
+    lines = [
+        "# TYPE bugtracker_requests_in_flight gauge",
+        f"bugtracker_requests_in_flight {limiter._in_flight}",
+    ]
+    state = current_app.extensions.get("ratelimit")
+    size = state["store"].size() if state else None
+    if size is not None:
+        lines += [
+            "# TYPE bugtracker_ratelimit_buckets gauge",
+            f"bugtracker_ratelimit_buckets {size}",
+        ]
+    return lines
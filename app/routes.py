@@ -1,24 +1,32 @@
 # app/routes.py
-from flask import Blueprint, render_template, redirect, url_for, request, flash
+from flask import Blueprint, render_template, redirect, url_for, request, flash, g, current_app, abort, Response, stream_with_context, jsonify
 from flask_login import login_user, logout_user, login_required, current_user
-from werkzeug.security import generate_password_hash, check_password_hash
 from datetime import datetime
-
-from .models import User, Project, Issue, Comment, Activity, ProjectMember
+from functools import partial
+from sqlalchemy import update
+
+from .models import User, Project, Issue, Comment, Activity, ProjectMember, SavedFilter, ISSUE_STATUSES, ISSUE_PRIORITIES, ist_now
+from .access import require_project_access, invalidate_project_access
+from .assignees import member_list, search_members, invalidate_project_members
+from .bulk import bulk_update
+from .edits import EditConflict, read_form, save_edit
+from . import counters, history
+from .loaders import ISSUE_LIST, ISSUE_DETAIL
+from .my_issues import VIEWS as MY_ISSUE_VIEWS, my_issues, invalidate_my_issues, touch_assignees
+from .events import events, issue_channel, project_channel
+from .export import FORMATS as EXPORT_FORMATS, export_issues, gzip_stream
+from .filters import issue_filters, filter_issues, saved_filters, save_filter
+from .jobs import jobs
+from .pagination import KeysetPagination, approximate_count
+from .passwords import passwords
+from .querycount import query_budget
+from .ratelimit import exempt
+from .search import search
+from .timeline import Timeline
 from . import db
 
 main = Blueprint("main", __name__)
 
-def user_can_access_project(user, project):
-    if project.owner_id == user.id:
-        return True
-
-    return ProjectMember.query.filter_by(
-        project_id=project.id,
-        user_id=user.id
-    ).first() is not None
-
-
 @main.route("/")
 def home():
     return render_template("home.html")
@@ -45,7 +53,7 @@ def register():
             flash("Username or email already exists.", "error")
             return redirect(url_for("main.register"))
 
-        hashed = generate_password_hash(password)
+        hashed = passwords.hash(password)
         user = User(username=username, email=email, password_hash=hashed)
         db.session.add(user)
         db.session.commit()
@@ -63,9 +71,14 @@ def login():
         password = request.form.get("password")
 
         user = User.query.filter_by(email=email).first()
-        if not user or not check_password_hash(user.password_hash, password):
+        valid, new_hash = passwords.verify(user.password_hash, password) if user else (False, None)
+        if not valid:
             flash("Invalid email or password.", "error")
             return redirect(url_for("main.login"))
+        if new_hash:
+            # hashed with an older PASSWORD_HASH_METHOD; move it to the current one
+            user.password_hash = new_hash
+            db.session.commit()
 
         login_user(user)
         flash("Logged in successfully.", "success")
@@ -84,6 +97,7 @@ def logout():
 
 @main.route("/dashboard")
 @login_required
+@query_budget(3)
 def dashboard():
     projects = (
         Project.query
@@ -92,7 +106,8 @@ def dashboard():
         .order_by(Project.created_at.desc())
         .all()
     )
-    return render_template("dashboard.html", projects=projects)
+    summaries = counters.project_summaries([project.id for project in projects])
+    return render_template("dashboard.html", projects=projects, summaries=summaries)
 
 @main.route("/projects/new", methods=["GET", "POST"])
 @login_required
@@ -110,13 +125,15 @@ def project_create():
             flash("Project with this name already exists.", "error")
             return redirect(url_for("main.project_create"))
 
-        project = Project(name=name, description=description, owner=current_user)
+        project = Project(name=name, description=description, owner_id=current_user.id)
         db.session.add(project)
         db.session.flush()
 
         member=ProjectMember(project_id=project.id, user_id=current_user.id, role="owner")
         db.session.add(member)
         db.session.commit()
+        invalidate_project_access(project.id)
+        invalidate_project_members(project.id)
 
         flash("Project created successfully.", "success")
         return redirect(url_for("main.my_projects"))
@@ -127,67 +144,191 @@ def project_create():
 
 @main.route("/projects/<int:project_id>/issues")
 @login_required
+@require_project_access
+@query_budget(7)
 def project_issues(project_id):
     project = Project.query.get_or_404(project_id)
 
-    if not user_can_access_project(current_user, project):
-        flash("You do not have access to this project.", "error")
-        return redirect(url_for("main.dashboard"))
-
-    status = request.args.get("status",type=str)
-    priority = request.args.get("priority",type=str)
-    assignee = request.args.get("assignee",type=str)
-    q = request.args.get("q",type=str)
+    filters = issue_filters(request.args)
+    q = filters["q"]
     page = request.args.get("page", 1, type=int)
+    cursor = request.args.get("cursor", type=str)
     per_page = 20
 
-    query=Issue.query.filter(Issue.project_id==project.id)
+    # with q the search ranks the results; created_at below only breaks ties
+    query=filter_issues(Issue.query.options(*ISSUE_LIST).filter(Issue.project_id==project.id), filters)
 
-    if status:
-        query=query.filter(Issue.status==status)
-    if priority:
-        query=query.filter(Issue.priority==priority)
-    if assignee:
-        if assignee=="unassigned":
-            query=query.filter(Issue.assignee_id.is_(None))
-        else:
-            try:
-                query=query.filter(Issue.assignee_id==int(assignee))
-            except ValueError:
-                query=query.filter(False)
-    if q:
-        query=query.filter(Issue.title.ilike(f"%{q}%")) 
+    total = approximate_count((project.id, *filters.values()), query)
 
-    query=query.order_by(Issue.created_at.desc())
-    pagination = query.paginate(page=page, per_page=per_page, error_out=False)
+    if q:
+        # search results are ordered by rank, so they keep numbered pages
+        query=query.order_by(Issue.created_at.desc())
+        pagination = query.paginate(page=page, per_page=per_page, error_out=False, count=False)
+    else:
+        pagination = KeysetPagination(query, cursor=cursor, per_page=per_page)
     issues = pagination.items
 
-    statuses = ["Open", "In Progress", "Resolved", "Closed"]
-    priorities = ["Low", "Medium", "High", "Critical"]
-
-    users = User.query.order_by(User.username).all()
-
     return render_template(
         "issues/list.html",
         project=project,
         issues=issues,
         pagination=pagination,
-        statuses=statuses,
-        priorities=priorities,
-        users=users,
-        current_filters={"status": status, "priority": priority, "assignee": assignee, "q": q},
+        total=total,
+        statuses=ISSUE_STATUSES,
+        priorities=ISSUE_PRIORITIES,
+        members=member_list(project.id),
+        current_filters=filters,
+        saved_filters=saved_filters(current_user.id, project.id),
     )
 
 
+@main.route("/projects/<int:project_id>/filters", methods=["POST"])
+@login_required
+@require_project_access
+def saved_filter_create(project_id):
+    filters = issue_filters(request.form)
+    name = (request.form.get("name") or "").strip()
+    if not name:
+        flash("Give the filter a name.", "error")
+    elif not any(filters.values()):
+        flash("Pick some filters to save first.", "error")
+    else:
+        save_filter(current_user.id, project_id, name[:100], filters)
+        db.session.commit()
+        flash(f"Filter '{name[:100]}' saved.", "success")
+    return redirect(url_for("main.project_issues", project_id=project_id, **{k: v for k, v in filters.items() if v}))
+
+
+@main.route("/filters/<int:filter_id>/delete", methods=["POST"])
+@login_required
+def saved_filter_delete(filter_id):
+    saved = db.get_or_404(SavedFilter, filter_id)
+    if saved.user_id != current_user.id:
+        abort(404)
+    project_id = saved.project_id
+    db.session.delete(saved)
+    db.session.commit()
+    flash(f"Filter '{saved.name}' deleted.", "success")
+    return redirect(url_for("main.project_issues", project_id=project_id))
+
+
+@main.route("/my-issues")
+@login_required
+@query_budget(1)
+def my_issue_list():
+    view = request.args.get("view", "active")
+    if view not in MY_ISSUE_VIEWS:
+        abort(404)
+    return render_template("issues/mine.html", issues=my_issues(current_user.id, view), view=view,
+                           views=MY_ISSUE_VIEWS)
+
+
+@main.route("/projects/<int:project_id>/issues/export")
+@login_required
+@require_project_access
+def issue_export(project_id):
+    format = request.args.get("format", "csv")
+    if format not in EXPORT_FORMATS:
+        abort(400)
+
+    body = export_issues(project_id, issue_filters(request.args), format)
+    headers = {"Content-Disposition": f"attachment; filename=project-{project_id}-issues.{format}"}
+    if "gzip" in request.accept_encodings:
+        body = gzip_stream(body)
+        headers["Content-Encoding"] = "gzip"
+        headers["Vary"] = "Accept-Encoding"
+    return Response(stream_with_context(body), mimetype=EXPORT_FORMATS[format], headers=headers)
+
+
+def _event_stream(channel, **scope):
+    if not current_app.config["EVENTS_ENABLED"]:
+        abort(404)
+    # EventSource sends Last-Event-ID itself when it reconnects
+    last_event_id = request.headers.get("Last-Event-ID", type=int)
+    if last_event_id is None:
+        last_event_id = request.args.get("last_event_id", type=int)
+    body = events.stream(channel, last_event_id, **scope)
+    return Response(stream_with_context(body), mimetype="text/event-stream",
+                    headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+
+@main.route("/projects/<int:project_id>/events")
+@exempt
+@login_required
+@require_project_access
+def project_events(project_id):
+    return _event_stream(project_channel(project_id), project_id=project_id)
+
+
+@main.route("/issues/<int:issue_id>/events")
+@exempt
+@login_required
+@require_project_access
+def issue_events(issue_id):
+    return _event_stream(issue_channel(issue_id), issue_id=issue_id)
+
+
+@main.route("/projects/<int:project_id>/issues/bulk", methods=["POST"])
+@login_required
+@require_project_access
+@query_budget(8)
+def issue_bulk_update(project_id):
+    back = redirect(request.referrer or url_for("main.project_issues", project_id=project_id))
+
+    issue_ids = request.form.getlist("issue_ids", type=int)
+    if not issue_ids:
+        flash("Select at least one issue.", "error")
+        return back
+    limit = current_app.config["BULK_MAX_ISSUES"]
+    if len(issue_ids) > limit:
+        flash(f"At most {limit} issues can be changed at once.", "error")
+        return back
+
+    values = {}
+    status = request.form.get("status")
+    priority = request.form.get("priority")
+    assignee = request.form.get("assignee_id")
+    if status:
+        if status not in ISSUE_STATUSES:
+            flash("Invalid status.", "error")
+            return back
+        values["status"] = status
+    if priority:
+        if priority not in ISSUE_PRIORITIES:
+            flash("Invalid priority.", "error")
+            return back
+        values["priority"] = priority
+    if assignee == "unassigned":
+        values["assignee_id"] = None
+    elif assignee:
+        try:
+            values["assignee_id"] = int(assignee)
+        except ValueError:
+            flash("Invalid assignee.", "error")
+            return back
+        if values["assignee_id"] not in member_list(project_id).by_id:
+            abort(400, "The assignee is not a member of this project.")
+    if not values:
+        flash("Choose a status, priority or assignee to apply.", "error")
+        return back
+
+    changed = bulk_update(project_id, issue_ids, values, current_user.id, g.project_access.is_owner(current_user.id))
+    db.session.commit()
+
+    skipped = len(set(issue_ids)) - len(changed)
+    message = f"Updated {len(changed)} issue{'s' if len(changed) != 1 else ''}."
+    if skipped:
+        message += f" {skipped} unchanged or not editable by you."
+    flash(message, "success")
+    return back
+
+
 @main.route("/projects/<int:project_id>/issues/new", methods=["GET", "POST"])
 @login_required
+@require_project_access
 def issue_create(project_id):
     project = Project.query.get_or_404(project_id)
 
-    if not user_can_access_project(current_user, project):
-        flash("You do not have access to this project.", "error")
-        return redirect(url_for("main.projects_list"))
-
     if request.method == "POST":
         title = request.form.get("title")
         description = request.form.get("description")
@@ -218,6 +359,8 @@ def issue_create(project_id):
 
         activity=Activity(issue_id=issue.id,user_id=current_user.id,action="Created",detail=f"Issue '{issue.title}' created.")
         db.session.add(activity)
+        counters.issue_added(issue)
+        jobs.enqueue("search.index_issue", issue_id=issue.id)
         db.session.commit()
 
         flash("Issue created", "success")
@@ -228,8 +371,12 @@ def issue_create(project_id):
 
 @main.route("/issues/<int:issue_id>", methods=["GET", "POST"])
 @login_required
+@require_project_access
+@query_budget(8)
 def issue_detail(issue_id):
-    issue = Issue.query.get_or_404(issue_id)
+    # only the GET renders the page; a comment POST just redirects
+    options = ISSUE_DETAIL if request.method == "GET" else ()
+    issue = Issue.query.options(*options).get_or_404(issue_id)
 
     if request.method == "POST":
         content = request.form.get("content")
@@ -243,24 +390,39 @@ def issue_detail(issue_id):
         snippet=(comment.content[:50]+"...") if len(comment.content or "")>50 else comment.content or ""
         activity=Activity(issue_id=issue.id,user_id=current_user.id,action="Commented",detail=snippet)
         db.session.add(activity)
+        # a new comment changes the issue as API clients see it, but none of
+        # its fields, so it leaves the version edits are checked against alone
+        db.session.execute(
+            update(Issue).where(Issue.id == issue.id).values(updated_at=ist_now())
+            .execution_options(synchronize_session=False)
+        )
+        touch_assignees(db.session, [issue.assignee_id])
+        jobs.enqueue("search.index_issue", issue_id=issue.id)
 
         db.session.commit()
 
         flash("Comment added", "success")
         return redirect(url_for("main.issue_detail", issue_id=issue_id))
 
-    return render_template("issues/detail.html", issue=issue)
+    # every write that adds a comment or activity also bumps updated_at
+    cursor = request.args.get("cursor", type=str)
+    timeline_key = ("issue-timeline", issue.id, issue.updated_at, cursor)
+    # loaded by the cached block itself, so only when it is rendered
+    load_timeline = partial(Timeline, issue.id, cursor=cursor)
+    return render_template("issues/detail.html", issue=issue, load_timeline=load_timeline, timeline_key=timeline_key)
 
 
 @main.route("/issues/<int:issue_id>/edit", methods=["GET", "POST"])
 @login_required
+@require_project_access
+# a changed-field activity row apiece, which SQLite inserts one at a time
+@query_budget(8 + len(history.TRACKED_FIELDS))
 def issue_edit(issue_id):
     issue=Issue.query.get_or_404(issue_id)
-    project=issue.project
 
     allowed = (
     current_user.id == issue.reporter_id or
-    current_user.id == project.owner_id or
+    g.project_access.is_owner(current_user.id) or
     (issue.assignee_id is not None and current_user.id == issue.assignee_id)
     )
 
@@ -270,108 +432,60 @@ def issue_edit(issue_id):
         return redirect(url_for("main.issue_detail",issue_id=issue_id))
     
     if request.method == "POST":
-        old_title = issue.title
-        old_description = issue.description or ""
-        old_priority = issue.priority
-        old_status = issue.status
-        old_assignee_id = issue.assignee_id
-        old_due_date = issue.due_date
-
-  
-        old_assignee_name = None
-        if old_assignee_id:
-            old_assignee = User.query.get(old_assignee_id)
-            old_assignee_name = old_assignee.username if old_assignee else f"id:{old_assignee_id}"
-
-        title = request.form.get("title")
-        description = request.form.get("description") or ""
-        priority = request.form.get("priority") or "Medium"
-        status = request.form.get("status") or issue.status
-        assignee_id_raw = request.form.get("assignee_id")
-        due_date_raw = request.form.get("due_date")
+        try:
+            values = read_form(request.form, issue)
+            # the version and values the form was rendered with, to merge
+            # this edit with any saved since; see app/edits.py
+            version = request.form.get("version", type=int)
+            base = read_form(request.form, issue, prefix="base_") if version is not None else None
+        except ValueError as exc:
+            flash(str(exc), "error")
+            return redirect(url_for("main.issue_edit", issue_id=issue.id))
 
-        if not title:
+        if not values["title"]:
             flash("Title is required.", "error")
             return redirect(url_for("main.issue_edit", issue_id=issue.id))
 
-        new_assignee_id = None
-        new_assignee_name = None
-        if assignee_id_raw:
-            try:
-                new_assignee_id = int(assignee_id_raw)
-                new_assignee = User.query.get(new_assignee_id)
-                new_assignee_name = new_assignee.username if new_assignee else f"id:{new_assignee_id}"
-            except ValueError:
-                flash("Invalid assignee ID.", "error")
-                return redirect(url_for("main.issue_edit", issue_id=issue.id))
-
-        # parse due date
-        new_due_date = None
-        if due_date_raw:
-            try:
-                new_due_date = datetime.strptime(due_date_raw, "%Y-%m-%d")
-            except ValueError:
-                flash("Invalid due date format. Use YYYY-MM-DD.", "error")
-                return redirect(url_for("main.issue_edit", issue_id=issue.id))
-
-        issue.title = title
-        issue.description = description
-        issue.priority = priority
-        issue.status = status
-        issue.assignee_id = new_assignee_id
-        issue.due_date = new_due_date
-
-        changes = []
-        if old_title != issue.title:
-            changes.append(f"title: '{old_title}' -> '{issue.title}'")
-        if old_description != issue.description:
-            changes.append("description: (changed)")
-        if old_priority != issue.priority:
-            changes.append(f"priority: {old_priority} -> {issue.priority}")
-        # compare datetimes carefully (None handling)
-        if (old_due_date and new_due_date and str(old_due_date) != str(new_due_date)) or (bool(old_due_date) != bool(new_due_date)):
-            changes.append(f"due_date: {old_due_date or 'None'} -> {new_due_date or 'None'}")
-        if old_status != issue.status:
-            changes.append(f"status: {old_status} -> {issue.status}")
-        # assignee name change
-        if old_assignee_id != new_assignee_id:
-            changes.append(f"assignee: {old_assignee_name or 'Unassigned'} -> {new_assignee_name or 'Unassigned'}")
-
-        db.session.add(issue)
-
-        if changes:
-            activity = Activity(
-                issue_id=issue.id,
-                user_id=current_user.id,
-                action="Updated",
-                detail="; ".join(changes)
-            )
-            db.session.add(activity)
-        db.session.commit()
+        try:
+            save_edit(issue, values, current_user.id, version, base)
+        except EditConflict as conflict:
+            if not conflict.conflicts:
+                flash("The issue kept changing while your edit was saved. Check it and save again.", "error")
+            return _render_issue_edit(issue, conflict.values, conflict.conflicts), 409
 
         flash("Issue updated.", "success")
         return redirect(url_for("main.issue_detail", issue_id=issue.id))
 
-    
-    #if method is GET
-    users=User.query.order_by(User.username).all()
-    statuses=["Open","In Progress","Resolved","Closed"]
-    priorities=["Low","Medium","High","Critical"]
+    return _render_issue_edit(issue, history.snapshot(issue))
+
 
+def _render_issue_edit(issue, values, conflicts=()):
+    """The edit form showing values, based on the issue's current version."""
+    names = history.usernames(
+        [values["assignee_id"]] + [value for c in conflicts if c.field == "assignee_id" for value in (c.mine, c.theirs)]
+    )
     return render_template(
                            "issues/edit.html",
                            issue=issue,
-                           users=users,
-                           statuses=statuses,
-                           priorities=priorities
+                           values=values,
+                           base=history.snapshot(issue),
+                           conflicts=[
+                               (c.field, history.display(c.field, c.mine, names), history.display(c.field, c.theirs, names))
+                               for c in conflicts
+                           ],
+                           assignee_label=names.get(values["assignee_id"]),
+                           members=member_list(issue.project_id),
+                           statuses=ISSUE_STATUSES,
+                           priorities=ISSUE_PRIORITIES
                         )
 
 @main.route("/projects/<int:project_id>/members/add", methods=["POST","GET"])
 @login_required
+@require_project_access
 def add_project_member(project_id):
     project=Project.query.get_or_404(project_id)
 
-    if project.owner_id != current_user.id:
+    if not g.project_access.is_owner(current_user.id):
         flash("Only the project owner can add members","error")
         return redirect(url_for("main.project_issues",project_id=project.id))
     
@@ -397,12 +511,27 @@ def add_project_member(project_id):
 
     db.session.add(member)
     db.session.commit()
+    invalidate_project_access(project.id, user.id)
+    invalidate_project_members(project.id)
+    # issues of this project already assigned to them now show up
+    invalidate_my_issues([user.id])
 
     flash(f"{user.username} added to the project","success")
     return redirect(url_for("main.project_issues", project_id=project.id))
     
+@main.route("/projects/<int:project_id>/members/search")
+@login_required
+@require_project_access
+@query_budget(1)
+def member_search(project_id):
+    """Typeahead for assignee pickers: members whose username starts with ?q=."""
+    members = search_members(project_id, request.args.get("q", ""))
+    return jsonify(items=[member._asdict() for member in members])
+
+
 @main.route("/my-projects")
 @login_required
+@query_budget(3)
 def my_projects():
     projects = (
         Project.query
@@ -411,8 +540,9 @@ def my_projects():
         .order_by(Project.created_at.desc())
         .all()
     )
+    summaries = counters.project_summaries([project.id for project in projects])
 
-    return render_template("projects/my_projects.html", projects=projects)
+    return render_template("projects/my_projects.html", projects=projects, summaries=summaries)
 
 
 
@@ -0,0 +1,65 @@
+# app/routing.py
+import random
+import time
+
+from flask import current_app, g, has_request_context, request, session
+from flask_sqlalchemy.session import Session
+
+from .database import engine_options
+
+SAFE_METHODS = frozenset(("GET", "HEAD", "OPTIONS"))
+# flask session key holding the time until which this client reads from the primary
+STICKY_KEY = "_primary_until"
+
+
+def _replica_key():
+    """Bind key of the replica this request reads from, or None for the primary."""
+    keys = current_app.config["REPLICA_BIND_KEYS"]
+    if not keys or not has_request_context() or request.method not in SAFE_METHODS:
+        return None
+    if session.get(STICKY_KEY, 0) > time.time():
+        return None
+    # one replica per request so every read sees the same snapshot
+    if "_replica_key" not in g:
+        g._replica_key = random.choice(keys)
+    return g._replica_key
+
+
+class RoutingSession(Session):
+    """Sends reads in GET/HEAD/OPTIONS requests to a replica, everything else to the primary.
+
+    Flushes always go to the primary, as do all statements outside a request
+    (CLI commands, migrations) and for a client that has just written.
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and not self._flushing:
+            key = _replica_key()
+            if key is not None:
+                return self._db.engines[key]
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+def _stick_to_primary(response):
+    # read-your-writes: after a POST, the redirect that follows (and anything
+    # else in the next few seconds) is served by the primary, so the client
+    # never sees a replica that has not caught up with its own change yet
+    if request.method not in SAFE_METHODS and current_app.config["REPLICA_BIND_KEYS"]:
+        session[STICKY_KEY] = time.time() + current_app.config["REPLICA_STICKY_SECONDS"]
+    return response
+
+
+def init_app(app):
+    """Register replica binds from SQLALCHEMY_REPLICA_URIS. Call before db.init_app."""
+    app.config.setdefault("SQLALCHEMY_REPLICA_URIS", [])
+    app.config.setdefault("REPLICA_STICKY_SECONDS", 10)
+
+    binds = app.config.setdefault("SQLALCHEMY_BINDS", {})
+    keys = []
+    for index, url in enumerate(app.config["SQLALCHEMY_REPLICA_URIS"]):
+        key = f"replica_{index}"
+        binds[key] = {"url": url, **engine_options(app.config, url)}
+        keys.append(key)
+    app.config["REPLICA_BIND_KEYS"] = keys
+
+    app.after_request(_stick_to_primary)
@@ -0,0 +1,234 @@
+# app/search.py
+import re
+
+from flask import current_app
+from sqlalchemy import bindparam, column, func, literal_column, table, text
+from werkzeug.utils import import_string
+
+from . import db
+from .jobs import jobs
+from .models import Issue
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+
+class SearchBackend:
+    """Interface for issue full-text search backends."""
+
+    def apply(self, query, q):
+        """Restrict an Issue query to issues matching q, best matches first."""
+        raise NotImplementedError
+
+    def index_issue(self, issue_id):
+        """Refresh the index entry for one issue (title, description, comments)."""
+        self.index_issues([issue_id])
+
+    def index_issues(self, issue_ids):
+        """Refresh the index entries for the given issues."""
+
+    def rebuild(self):
+        """Re-index every issue, returning how many were indexed."""
+        return 0
+
+
+class LikeSearchBackend(SearchBackend):
+    """Portable fallback for databases without a full-text engine. Unranked,
+    and a scan of every issue in the project, so only for small databases."""
+
+    def apply(self, query, q):
+        pattern = f"%{q}%"
+        return query.filter(Issue.title.ilike(pattern) | Issue.description.ilike(pattern))
+
+
+class FTS5SearchBackend(SearchBackend):
+    """SQLite FTS5 index with BM25 ranking and prefix matching.
+
+    The index is a standalone FTS5 table whose rowid is the issue id, holding
+    the issue title, description and all comment text concatenated.
+    """
+
+    table_name = "issue_search"
+    # bm25 column weights: title, description, comments
+    weights = (10.0, 2.0, 1.0)
+
+    def __init__(self):
+        self.fts = table(self.table_name, column("rowid"))
+
+    @staticmethod
+    def match_expression(q):
+        # quote every token so FTS5 query syntax in user input is inert,
+        # and make each one a prefix query so "auth" finds "authentication"
+        tokens = _TOKEN_RE.findall(q or "")
+        if not tokens:
+            return None
+        return " ".join(f'"{token}"*' for token in tokens)
+
+    def apply(self, query, q):
+        match = self.match_expression(q)
+        if match is None:
+            return query.filter(False)
+
+        fts = literal_column(self.table_name)
+        return (
+            query.join(self.fts, self.fts.c.rowid == Issue.id)
+            .filter(fts.op("MATCH")(match))
+            .order_by(func.bm25(fts, *self.weights))
+        )
+
+    def _insert_documents(self, some=False):
+        # one pass over comment grouped by issue, instead of a lookup per
+        # issue; with some, only for the issues in the :ids parameter
+        issues, comments = ("WHERE issue.id IN :ids", "WHERE issue_id IN :ids ") if some else ("", "")
+        statement = text(
+            f"INSERT INTO {self.table_name} (rowid, title, description, comments) "
+            "SELECT issue.id, issue.title, coalesce(issue.description, ''), coalesce(c.comments, '') "
+            "FROM issue LEFT JOIN (SELECT issue_id, group_concat(content, ' ') AS comments "
+            f"FROM comment {comments}GROUP BY issue_id) AS c ON c.issue_id = issue.id {issues}"
+        )
+        return statement.bindparams(bindparam("ids", expanding=True)) if some else statement
+
+    def create_table(self):
+        db.session.execute(text(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {self.table_name} "
+            "USING fts5(title, description, comments, "
+            "tokenize='unicode61 remove_diacritics 2', prefix='2 3')"
+        ))
+
+    def index_issues(self, issue_ids):
+        db.session.flush()
+        ids = {"ids": list(issue_ids)}
+        delete = text(f"DELETE FROM {self.table_name} WHERE rowid IN :ids")
+        db.session.execute(delete.bindparams(bindparam("ids", expanding=True)), ids)
+        db.session.execute(self._insert_documents(some=True), ids)
+
+    def rebuild(self):
+        self.create_table()
+        db.session.execute(text(f"DELETE FROM {self.table_name}"))
+        result = db.session.execute(self._insert_documents())
+        return result.rowcount
+
+
+class PostgresSearchBackend(SearchBackend):
+    """PostgreSQL tsvector index with a GIN index, weighted ranking and prefix matching.
+
+    Like the FTS5 index, a separate issue_search table holds one document
+    per issue, built from its title, description and all comment text with
+    those weighted A, B and C. The 'simple' configuration neither stems nor
+    drops stop words, as FTS5's unicode61 tokenizer does not.
+    """
+
+    table_name = "issue_search"
+    # ts_rank weights for D, C, B, A: comments, description, title
+    weights = "{0, 0.1, 0.2, 1.0}"
+
+    def __init__(self):
+        self.documents = table(self.table_name, column("issue_id"), column("document"))
+
+    @staticmethod
+    def tsquery(q):
+        # every token is a quoted prefix term, so tsquery syntax in user input is inert
+        tokens = _TOKEN_RE.findall(q or "")
+        if not tokens:
+            return None
+        return " & ".join(f"'{token}':*" for token in tokens)
+
+    def apply(self, query, q):
+        tsquery = self.tsquery(q)
+        if tsquery is None:
+            return query.filter(False)
+
+        matches = func.to_tsquery("simple", tsquery)
+        document = self.documents.c.document
+        weights = literal_column(f"'{self.weights}'::float4[]")
+        return (
+            query.join(self.documents, self.documents.c.issue_id == Issue.id)
+            .filter(document.op("@@")(matches))
+            .order_by(func.ts_rank(weights, document, matches).desc())
+        )
+
+    def _insert_documents(self, some=False):
+        # as FTS5SearchBackend._insert_documents
+        issues, comments = ("WHERE issue.id IN :ids", "WHERE issue_id IN :ids ") if some else ("", "")
+        statement = text(
+            f"INSERT INTO {self.table_name} (issue_id, document) "
+            "SELECT issue.id, "
+            "setweight(to_tsvector('simple', issue.title), 'A') || "
+            "setweight(to_tsvector('simple', coalesce(issue.description, '')), 'B') || "
+            "setweight(to_tsvector('simple', coalesce(c.comments, '')), 'C') "
+            "FROM issue LEFT JOIN (SELECT issue_id, string_agg(content, ' ') AS comments "
+            f"FROM comment {comments}GROUP BY issue_id) AS c ON c.issue_id = issue.id {issues}"
+        )
+        return statement.bindparams(bindparam("ids", expanding=True)) if some else statement
+
+    def index_issues(self, issue_ids):
+        db.session.flush()
+        ids = {"ids": list(issue_ids)}
+        delete = text(f"DELETE FROM {self.table_name} WHERE issue_id IN :ids")
+        db.session.execute(delete.bindparams(bindparam("ids", expanding=True)), ids)
+        db.session.execute(self._insert_documents(some=True), ids)
+
+    def rebuild(self):
+        db.session.execute(text(f"DELETE FROM {self.table_name}"))
+        result = db.session.execute(self._insert_documents())
+        return result.rowcount
+
+
+BACKENDS = {
+    "fts5": FTS5SearchBackend,
+    "postgresql": PostgresSearchBackend,
+    "like": LikeSearchBackend,
+}
+
+# the default backend for each dialect; LIKE for any other
+DIALECT_BACKENDS = {
+    "sqlite": "fts5",
+    "postgresql": "postgresql",
+}
+
+
+class IssueSearch:
+    """Flask extension that owns the configured search backend.
+
+    SEARCH_BACKEND may be a key of BACKENDS or a dotted import path to a
+    SearchBackend subclass. When unset, FTS5 is used on SQLite, a tsvector
+    index on PostgreSQL and the LIKE fallback everywhere else.
+    """
+
+    def __init__(self, app=None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault("SEARCH_BACKEND", None)
+        app.extensions["issue_search"] = {}
+
+    @property
+    def backend(self):
+        state = current_app.extensions["issue_search"]
+        if "backend" not in state:
+            name = current_app.config["SEARCH_BACKEND"]
+            if not name:
+                name = DIALECT_BACKENDS.get(db.engine.dialect.name, "like")
+            cls = BACKENDS.get(name) or import_string(name)
+            state["backend"] = cls()
+        return state["backend"]
+
+    def apply(self, query, q):
+        return self.backend.apply(query, q)
+
+    def index_issue(self, issue_id):
+        self.backend.index_issue(issue_id)
+
+    def index_issues(self, issue_ids):
+        self.backend.index_issues(issue_ids)
+
+    def rebuild(self):
+        return self.backend.rebuild()
+
+
+search = IssueSearch()
+
+
+@jobs.task("search.index_issue")
+def index_issue_job(issue_id):
+    search.index_issue(issue_id)
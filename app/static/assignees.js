@@ -0,0 +1,40 @@
+// Search-as-you-type for assignee pickers on projects too big to list
+// every member (see issues/_assignee_picker.html).
+(function () {
+  document.querySelectorAll("select[data-member-search]").forEach(function (select) {
+    var input = document.createElement("input");
+    input.type = "search";
+    input.placeholder = "Find member...";
+    select.parentNode.insertBefore(input, select);
+
+    // options that are not users ("Any", "Unassigned", ...) always stay
+    var fixed = Array.prototype.filter.call(select.options, function (option) {
+      return !/^\d+$/.test(option.value);
+    });
+    var timer = null;
+
+    input.addEventListener("input", function () {
+      clearTimeout(timer);
+      timer = setTimeout(function () {
+        var q = input.value.trim();
+        if (!q) return;
+        fetch(select.dataset.memberSearch + "?q=" + encodeURIComponent(q), {credentials: "same-origin"})
+          .then(function (response) { return response.json(); })
+          .then(function (data) {
+            var current = select.options[select.selectedIndex];
+            select.innerHTML = "";
+            fixed.forEach(function (option) { select.appendChild(option); });
+            data.items.forEach(function (member) {
+              var option = new Option(member.username, member.id);
+              select.appendChild(option);
+            });
+            if (data.items.length) {
+              select.value = String(data.items[0].id);
+            } else if (current) {
+              select.value = current.value;
+            }
+          });
+      }, 200);
+    });
+  });
+})();
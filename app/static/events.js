@@ -0,0 +1,37 @@
+// Live activity: adds new entries to an issue's timeline, and counts them on
+// the issue list so the user knows when a reload is worth it.
+(function () {
+  function listen(url, lastEventId, onActivity) {
+    if (!window.EventSource) return;
+    // the browser resends Last-Event-ID itself after a dropped connection;
+    // the query string only covers what happened since the page was rendered
+    var source = new EventSource(lastEventId == null ? url : url + "?last_event_id=" + lastEventId);
+    source.addEventListener("activity", function (e) {
+      onActivity(JSON.parse(e.data));
+    });
+  }
+
+  var activity = document.getElementById("activity");
+  if (activity) {
+    listen(activity.dataset.eventsUrl, activity.dataset.lastEventId, function (item) {
+      var li = document.createElement("li");
+      var user = item.user ? item.user.username : "Unknown";
+      li.textContent = item.created_at.slice(0, 16).replace("T", " ") + " — " + user + " " +
+        item.action.toLowerCase() + ": " + (item.detail || "");
+      // the timeline is newest first
+      activity.insertBefore(li, activity.firstChild);
+      var empty = document.getElementById("no-activity");
+      if (empty) empty.remove();
+    });
+  }
+
+  var notice = document.getElementById("live-updates");
+  if (notice) {
+    var count = 0;
+    listen(notice.dataset.eventsUrl, null, function () {
+      count += 1;
+      notice.querySelector("span").textContent = count + (count === 1 ? " new update." : " new updates.");
+      notice.hidden = false;
+    });
+  }
+})();
@@ -0,0 +1,108 @@
+# app/timeline.py
+import base64
+import json
+from collections import namedtuple
+from datetime import datetime
+
+from sqlalchemy import func, literal, select, tuple_, union_all
+
+from . import db, history
+from .activity import SOURCES
+from .models import Activity, Comment, User
+
+Entry = namedtuple("Entry", "kind id created_at user_id username action body")
+
+# a comment already shows up as itself, so its "Commented" activity is left out
+_HIDDEN_ACTIONS = ("Commented",)
+
+
+def encode_cursor(entry):
+    payload = json.dumps([entry.created_at.isoformat(), entry.kind, entry.id], separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(token):
+    """Return (created_at, kind, id) for a token, or None if it is malformed."""
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        created_at, kind, entry_id = json.loads(base64.urlsafe_b64decode(padded))
+        if kind not in ("activity", "comment"):
+            return None
+        return datetime.fromisoformat(created_at), kind, int(entry_id)
+    except (ValueError, TypeError):
+        return None
+
+
+class Timeline:
+    """One page of an issue's comments and activity merged, newest first.
+
+    Entries are ordered by (created_at, kind, id) and paged by keyset on
+    that tuple. Comments, live activity and archived activity are each
+    their own range scan on an (issue_id, created_at) index, limited to a
+    page, before they are merged, so a page costs the same on an issue
+    with ten entries or ten thousand, wherever its activity is stored.
+    """
+
+    def __init__(self, issue_id, cursor=None, per_page=50):
+        self.issue_id = issue_id
+        self.cursor = cursor
+        self.per_page = per_page
+        decoded = decode_cursor(cursor) if cursor else None
+
+        none = literal(None)
+        branches = [
+            self._branch(Comment, "comment", decoded, (
+                none.label("action"), Comment.content.label("detail"),
+                none.label("field"), none.label("old_value"), none.label("new_value"),
+            )),
+        ]
+        # archived activity is merged in like a third source
+        for model in SOURCES:
+            branches.append(self._branch(
+                model, "activity", decoded,
+                (model.action, model.detail, model.field, model.old_value, model.new_value),
+                model.action.not_in(_HIDDEN_ACTIONS),
+            ))
+        merged = union_all(*branches).subquery()
+        rows = db.session.execute(
+            select(merged, User.username)
+            .outerjoin(User, merged.c.user_id == User.id)
+            .order_by(merged.c.created_at.desc(), merged.c.kind.desc(), merged.c.id.desc())
+            .limit(per_page + 1)
+        ).all()
+
+        rows, self.has_next = rows[:per_page], len(rows) > per_page
+        names = history.usernames(history.assignee_ids(rows))
+        self.items = [
+            Entry(row.kind, row.id, row.created_at, row.user_id, row.username, row.action,
+                  history.activity_detail(row.detail, row.field, row.old_value, row.new_value, names))
+            for row in rows
+        ]
+
+    def _branch(self, model, kind, decoded, columns, *criteria):
+        query = select(
+            literal(kind).label("kind"), model.id.label("id"), model.created_at.label("created_at"),
+            model.user_id.label("user_id"), *columns,
+        ).where(model.issue_id == self.issue_id, *criteria)
+        if decoded is not None:
+            created_at, after_kind, after_id = decoded
+            # this side's part of (created_at, kind, id) < cursor
+            if kind < after_kind:
+                query = query.where(model.created_at <= created_at)
+            elif kind > after_kind:
+                query = query.where(model.created_at < created_at)
+            else:
+                query = query.where(tuple_(model.created_at, model.id) < (created_at, after_id))
+        query = query.order_by(model.created_at.desc(), model.id.desc()).limit(self.per_page + 1)
+        return select(query.subquery())
+
+    @property
+    def next_cursor(self):
+        if self.has_next and self.items:
+            return encode_cursor(self.items[-1])
+        return None
+
+    @property
+    def last_activity_id(self):
+        """Newest activity id on the issue, where a live event stream picks up."""
+        return db.session.scalar(select(func.max(Activity.id)).where(Activity.issue_id == self.issue_id))
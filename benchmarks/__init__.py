@@ -0,0 +1 @@
+"""Performance benchmarks for BugTracker. Each module runs with ``python -m benchmarks.<name>``."""
@@ -0,0 +1,190 @@
+"""Fire parallel edits at one issue and check that none is lost.
+
+    python -m benchmarks.concurrency
+    python -m benchmarks.concurrency --clients 16 --edits 50 --same-field
+
+--clients clients each load the issue's edit form and save it with one
+field changed, --edits times, all at once through the Flask test client
+in threads against a throwaway SQLite database. Client n edits field
+n modulo the five editable ones, so with five clients or fewer every
+edit touches a field nobody else does and all of them should merge; with
+more, or --same-field, some are refused as conflicts.
+
+Afterwards every field must have exactly as many "Updated" activity rows
+as saves that changed it, and end at the value one of its clients saved
+last. An edit that overwrote others without seeing them shows up as
+changes nobody asked for; the run exits non-zero if any did, or if a
+request failed other than with a 409 conflict.
+"""
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from html.parser import HTMLParser
+
+from flask_migrate import upgrade
+
+from app import create_app, db
+from app.edits import saves
+from app.models import Activity, Issue, Project, ProjectMember, User
+from app.passwords import passwords
+
+from .run import summarize
+
+PASSWORD = "benchmark"
+FIELDS = ["title", "description", "priority", "status", "due_date"]
+PRIORITIES = ["Low", "Medium", "High", "Critical"]
+STATUSES = ["Open", "In Progress", "Resolved", "Closed"]
+
+
+class EditForm(HTMLParser):
+    """The values an edit form would submit: inputs, textareas and selected options."""
+
+    def __init__(self, page):
+        super().__init__()
+        self.values = {}
+        self._textarea = self._select = None
+        self.feed(page)
+
+    def handle_starttag(self, tag, attrs):
+        attrs = dict(attrs)
+        if tag == "input" and "name" in attrs:
+            self.values[attrs["name"]] = attrs.get("value") or ""
+        elif tag == "textarea":
+            self._textarea = attrs["name"]
+            self.values[self._textarea] = ""
+        elif tag == "select":
+            self._select = attrs["name"]
+        elif tag == "option" and self._select and "selected" in attrs:
+            self.values[self._select] = attrs.get("value") or ""
+
+    def handle_endtag(self, tag):
+        if tag == "textarea":
+            self._textarea = None
+        elif tag == "select":
+            self._select = None
+
+    def handle_data(self, data):
+        if self._textarea:
+            self.values[self._textarea] += data
+
+
+def new_value(field, client, n):
+    if field == "priority":
+        return PRIORITIES[(client + n) % len(PRIORITIES)]
+    if field == "status":
+        return STATUSES[(client + n) % len(STATUSES)]
+    if field == "due_date":
+        return f"2030-01-{(client + n) % 28 + 1:02d}"
+    return f"{field} from client {client}, edit {n}"
+
+
+def make_app():
+    database = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench.db')}"
+    app = create_app({
+        "SQLALCHEMY_DATABASE_URI": database,
+        # logging in is not what is measured
+        "PASSWORD_HASH_METHOD": "pbkdf2:sha256:1000",
+        "RATELIMIT_ENABLED": False,
+        "JOBS_INLINE": False,
+    })
+    with app.app_context():
+        upgrade()
+        user = User(username="editor", email="editor@bench.test", password_hash=passwords.hash(PASSWORD))
+        db.session.add(user)
+        db.session.flush()
+        project = Project(name="Contention", owner_id=user.id)
+        db.session.add(project)
+        db.session.flush()
+        db.session.add(ProjectMember(project_id=project.id, user_id=user.id, role="owner"))
+        issue = Issue(title="Contended", description="", project_id=project.id, reporter_id=user.id)
+        db.session.add(issue)
+        db.session.commit()
+        return app, issue.id
+
+
+def run(app, issue_id, clients, edits, same_field):
+    start = threading.Barrier(clients)
+
+    def client(number):
+        browser = app.test_client()
+        browser.post("/login", data={"email": "editor@bench.test", "password": PASSWORD})
+        field = "title" if same_field else FIELDS[number % len(FIELDS)]
+        start.wait()
+        samples, saved = [], []
+        for n in range(edits):
+            began = time.perf_counter()
+            form = EditForm(browser.get(f"/issues/{issue_id}/edit").get_data(as_text=True)).values
+            form[field] = new_value(field, number, n)
+            response = browser.post(f"/issues/{issue_id}/edit", data=form)
+            samples.append((response.status_code, time.perf_counter() - began, None))
+            if response.status_code == 302:
+                saved.append(form[field])
+        return samples, field, saved
+
+    with ThreadPoolExecutor(clients) as pool:
+        began = time.perf_counter()
+        results = list(pool.map(client, range(clients)))
+        wall = time.perf_counter() - began
+    return [sample for samples, _, _ in results for sample in samples], [(field, saved) for _, field, saved in results], wall
+
+
+def lost_updates(issue_id, saved):
+    """Per field, changes no client made plus 1 if its final value is not a client's last save.
+
+    saved is (field, values saved in order) for each client.
+    """
+    issue = db.session.get(Issue, issue_id)
+    rows = Counter(
+        field for field, in db.session.query(Activity.field).filter_by(issue_id=issue_id, action="Updated")
+    )
+    saves_by_field, last = Counter(), defaultdict(set)
+    for field, values in saved:
+        saves_by_field[field] += len(values)
+        if values:
+            last[field].add(values[-1])
+    lost = Counter()
+    for field in FIELDS:
+        lost[field] += max(0, rows[field] - saves_by_field[field])
+        value = getattr(issue, field)
+        if field == "due_date" and value is not None:
+            value = value.strftime("%Y-%m-%d")
+        if last[field] and value not in last[field]:
+            lost[field] += 1
+    return +lost
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--clients", type=int, default=5, help="clients editing at once")
+    parser.add_argument("--edits", type=int, default=20, help="edits per client")
+    parser.add_argument("--same-field", action="store_true", help="have every client edit the title")
+    args = parser.parse_args()
+
+    app, issue_id = make_app()
+    samples, saved, wall = run(app, issue_id, args.clients, args.edits, args.same_field)
+    summary = summarize(samples, wall)
+    statuses = Counter(status for status, _, _ in samples)
+    failed = sum(count for status, count in statuses.items() if status not in (302, 409))
+
+    with app.app_context():
+        lost = lost_updates(issue_id, saved)
+        version = db.session.get(Issue, issue_id).version
+    results = {key[0][1]: value for key, value in saves._values.items()}
+
+    print(f"{args.clients} clients x {args.edits} edits in {wall:.1f}s, "
+          f"p50 {summary['p50_ms']:.1f} ms, p95 {summary['p95_ms']:.1f} ms, {summary['throughput_rps']:.1f} edits/s")
+    print(f"applied {results.get('applied', 0)}, merged {results.get('merged', 0)}, "
+          f"conflicts {results.get('conflict', 0)}, gave up retrying {results.get('retries_exhausted', 0)}, "
+          f"failed {failed}, issue now at version {version}")
+    print(f"lost updates: {sum(lost.values())}" + (f" ({dict(lost)})" if lost else ""))
+    if lost or failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,162 @@
+"""Generate a synthetic BugTracker dataset at a configurable scale.
+
+    python -m benchmarks.datagen --database sqlite:////tmp/bench.db --scale medium
+
+Rows go in through batched Core inserts, so even the large scale loads in
+minutes. The counters and search index are rebuilt at the end. Every user
+gets the password ``benchmark``.
+"""
+import argparse
+import random
+from datetime import datetime, timedelta
+
+from sqlalchemy import func, insert, select
+from werkzeug.security import generate_password_hash
+
+from app import counters, db
+from app.models import Activity, Comment, Issue, Project, ProjectMember, User
+from app.search import search
+
+PASSWORD = "benchmark"
+
+SCALES = {
+    "small": dict(users=50, projects=5, members=10, issues=2000, comments=3, updates=2),
+    "medium": dict(users=500, projects=20, members=50, issues=50000, comments=4, updates=3),
+    "large": dict(users=5000, projects=100, members=200, issues=500000, comments=5, updates=3),
+}
+
+STATUSES = ["Open", "In Progress", "Resolved", "Closed"]
+PRIORITIES = ["Low", "Medium", "High", "Critical"]
+WORDS = (
+    "login crash timeout parser export button error page slow cache token null report sync "
+    "upload avatar email invite search filter sort dashboard mobile layout font render memory"
+).split()
+
+BATCH = 5000
+
+
+def _sentence(rng, low, high):
+    return " ".join(rng.choices(WORDS, k=rng.randint(low, high)))
+
+
+def _insert(model, rows):
+    for start in range(0, len(rows), BATCH):
+        db.session.execute(insert(model), rows[start:start + BATCH])
+
+
+def generate(scale, seed=1):
+    """Fill the app's database with the given scale dict. Call inside an app context.
+
+    Returns a description of the dataset that benchmark runs use to pick
+    who to log in as and which projects and issues to request.
+    """
+    rng = random.Random(seed)
+    now = datetime.now()
+    first_user = (db.session.scalar(select(func.max(User.id))) or 0) + 1
+    first_project = (db.session.scalar(select(func.max(Project.id))) or 0) + 1
+    first_issue = (db.session.scalar(select(func.max(Issue.id))) or 0) + 1
+
+    password_hash = generate_password_hash(PASSWORD)
+    user_ids = list(range(first_user, first_user + scale["users"]))
+    _insert(User, [
+        {"id": uid, "username": f"user{uid}", "email": f"user{uid}@bench.test", "password_hash": password_hash}
+        for uid in user_ids
+    ])
+
+    project_ids = list(range(first_project, first_project + scale["projects"]))
+    members = {}
+    projects, memberships = [], []
+    for pid in project_ids:
+        owner = rng.choice(user_ids)
+        # the first user belongs to every project so one login can reach all of them
+        team = {owner, user_ids[0], *rng.sample(user_ids, min(scale["members"], len(user_ids)))}
+        members[pid] = sorted(team)
+        projects.append({"id": pid, "name": f"Project {pid}", "description": _sentence(rng, 5, 20),
+                         "owner_id": owner, "created_at": now - timedelta(days=400)})
+        memberships += [{"project_id": pid, "user_id": uid, "role": "owner" if uid == owner else "member"}
+                        for uid in members[pid]]
+    _insert(Project, projects)
+    _insert(ProjectMember, memberships)
+
+    issue_ids = list(range(first_issue, first_issue + scale["issues"]))
+    for start in range(0, len(issue_ids), BATCH):
+        issues, comments, activities = [], [], []
+        for iid in issue_ids[start:start + BATCH]:
+            pid = rng.choice(project_ids)
+            team = members[pid]
+            reporter = rng.choice(team)
+            created = now - timedelta(minutes=rng.randint(60, 365 * 24 * 60))
+            title = _sentence(rng, 3, 9)
+            issues.append({
+                "id": iid, "title": title, "description": _sentence(rng, 10, 80),
+                "status": rng.choice(STATUSES), "priority": rng.choice(PRIORITIES),
+                "project_id": pid, "reporter_id": reporter,
+                "assignee_id": rng.choice([None, rng.choice(team)]),
+                "created_at": created, "updated_at": created,
+            })
+            activities.append({"issue_id": iid, "user_id": reporter, "action": "Created",
+                               "detail": f"Issue '{title}' created.", "created_at": created})
+            for n in range(rng.randint(0, 2 * scale["comments"])):
+                at = created + timedelta(minutes=10 * (n + 1))
+                author = rng.choice(team)
+                content = _sentence(rng, 5, 40)
+                comments.append({"issue_id": iid, "user_id": author, "content": content, "created_at": at})
+                activities.append({"issue_id": iid, "user_id": author, "action": "Commented",
+                                   "detail": content[:50], "created_at": at})
+            for n in range(rng.randint(0, 2 * scale["updates"])):
+                activities.append({"issue_id": iid, "user_id": rng.choice(team), "action": "Updated",
+                                   "detail": f"status: Open -> {rng.choice(STATUSES)}",
+                                   "created_at": created + timedelta(minutes=7 * (n + 1))})
+        _insert(Issue, issues)
+        _insert(Comment, comments)
+        _insert(Activity, activities)
+        db.session.commit()
+
+    counters.rebuild()
+    search.rebuild()
+    db.session.commit()
+
+    return {
+        "scale": scale,
+        "login_email": f"user{user_ids[0]}@bench.test",
+        "password": PASSWORD,
+        "user_ids": user_ids,
+        "project_ids": project_ids,
+        "issue_ids": [issue_ids[0], issue_ids[-1]],
+    }
+
+
+def scale_from_args(args):
+    scale = dict(SCALES[args.scale])
+    for key in scale:
+        if getattr(args, key, None) is not None:
+            scale[key] = getattr(args, key)
+    return scale
+
+
+def add_scale_arguments(parser):
+    parser.add_argument("--scale", choices=SCALES, default="small")
+    parser.add_argument("--seed", type=int, default=1)
+    for key in SCALES["small"]:
+        parser.add_argument(f"--{key}", type=int, help=f"override the preset's {key}")
+
+
+def main():
+    from flask_migrate import upgrade
+
+    from app import create_app
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--database", required=True, help="SQLAlchemy URL of the database to fill")
+    add_scale_arguments(parser)
+    args = parser.parse_args()
+
+    app = create_app({"SQLALCHEMY_DATABASE_URI": args.database})
+    with app.app_context():
+        upgrade()
+        dataset = generate(scale_from_args(args), seed=args.seed)
+    print(f"Generated {dataset['scale']}; log in as {dataset['login_email']} / {PASSWORD}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+"""Compare issue write and filter timings under the old and new index sets.
+
+    python -m benchmarks.indexes --issues 20000
+
+Builds one throwaway SQLite database per index set, inserts issues one
+transaction at a time (like issue_create), updates a share of them (like
+issue_edit), then times the project_issues filter queries.
+"""
+import argparse
+import os
+import random
+import statistics
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import create_engine, event, insert, select, text, update
+from sqlalchemy.schema import CreateTable
+
+from app.models import Issue
+
+STATUSES = ["Open", "In Progress", "Resolved", "Closed"]
+PRIORITIES = ["Low", "Medium", "High", "Critical"]
+
+INDEX_SETS = {
+    # b5e06189df89 plus the keyset index
+    "old": [
+        f"CREATE INDEX ix_issue_{column} ON issue ({column})"
+        for column in ("assignee_id", "created_at", "description", "due_date", "id", "priority",
+                       "project_id", "reporter_id", "status", "title", "updated_at")
+    ] + ["CREATE INDEX ix_issue_project_created ON issue (project_id, created_at, id)"],
+    "new": [
+        "CREATE INDEX ix_issue_project_created ON issue (project_id, created_at, id)",
+        "CREATE INDEX ix_issue_project_status ON issue (project_id, status, created_at, id)",
+        "CREATE INDEX ix_issue_project_assignee ON issue (project_id, assignee_id, created_at, id)",
+        "CREATE INDEX ix_issue_project_priority ON issue (project_id, priority, created_at, id)",
+    ],
+}
+
+FILTERS = {
+    "status": lambda rng, users: Issue.status == rng.choice(STATUSES),
+    "assignee": lambda rng, users: Issue.assignee_id == rng.randint(1, users),
+    "priority": lambda rng, users: Issue.priority == rng.choice(PRIORITIES),
+    "none": lambda rng, users: True,
+}
+
+WORDS = "login crash timeout parser export button error page slow cache token null report sync".split()
+
+
+def make_issue(rng, args, created_at):
+    return {
+        "title": " ".join(rng.choices(WORDS, k=6)),
+        "description": " ".join(rng.choices(WORDS, k=rng.randint(20, 120))),
+        "status": rng.choice(STATUSES),
+        "priority": rng.choice(PRIORITIES),
+        "project_id": rng.randint(1, args.projects),
+        "reporter_id": rng.randint(1, args.users),
+        "assignee_id": rng.choice([None, rng.randint(1, args.users)]),
+        "created_at": created_at,
+        "updated_at": created_at,
+    }
+
+
+def run(index_set, args):
+    rng = random.Random(args.seed)
+    path = os.path.join(tempfile.mkdtemp(), f"{index_set}.db")
+    engine = create_engine(f"sqlite:///{path}")
+
+    @event.listens_for(engine, "connect")
+    def _pragmas(dbapi_connection, connection_record):
+        # the same durability settings as the app's tuned SQLite mode
+        dbapi_connection.execute("PRAGMA journal_mode=WAL")
+        dbapi_connection.execute("PRAGMA synchronous=NORMAL")
+
+    with engine.begin() as conn:
+        conn.execute(CreateTable(Issue.__table__))
+        for ddl in INDEX_SETS[index_set]:
+            conn.execute(text(ddl))
+
+    start = datetime(2025, 1, 1)
+    began = time.perf_counter()
+    with engine.connect() as conn:
+        for n in range(args.issues):
+            with conn.begin():
+                conn.execute(insert(Issue.__table__), make_issue(rng, args, start + timedelta(minutes=n)))
+    insert_seconds = time.perf_counter() - began
+
+    began = time.perf_counter()
+    with engine.connect() as conn:
+        for _ in range(args.updates):
+            with conn.begin():
+                conn.execute(
+                    update(Issue.__table__)
+                    .where(Issue.id == rng.randint(1, args.issues))
+                    .values(status=rng.choice(STATUSES), assignee_id=rng.randint(1, args.users),
+                            updated_at=datetime.now())
+                )
+    update_seconds = time.perf_counter() - began
+
+    filters = {}
+    with engine.connect() as conn:
+        for name, make_filter in FILTERS.items():
+            timings = []
+            for _ in range(args.repeat):
+                query = (
+                    select(Issue.__table__)
+                    .where(Issue.project_id == rng.randint(1, args.projects), make_filter(rng, args.users))
+                    .order_by(Issue.created_at.desc(), Issue.id.desc())
+                    .limit(21)
+                )
+                began = time.perf_counter()
+                conn.execute(query).all()
+                timings.append((time.perf_counter() - began) * 1000)
+            filters[name] = statistics.median(timings)
+    engine.dispose()
+
+    return {
+        "insert_per_s": args.issues / insert_seconds,
+        "update_per_s": args.updates / update_seconds,
+        "filter_ms": filters,
+        "db_mb": os.path.getsize(path) / 1e6,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--issues", type=int, default=20000)
+    parser.add_argument("--updates", type=int, default=2000)
+    parser.add_argument("--projects", type=int, default=20)
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--repeat", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    results = {name: run(name, args) for name in INDEX_SETS}
+    print(f"{'':18}" + "".join(f"{name:>12}" for name in results))
+    print(f"{'inserts/s':18}" + "".join(f"{r['insert_per_s']:12.0f}" for r in results.values()))
+    print(f"{'updates/s':18}" + "".join(f"{r['update_per_s']:12.0f}" for r in results.values()))
+    for name in FILTERS:
+        print(f"{'filter ' + name + ' ms':18}" + "".join(f"{r['filter_ms'][name]:12.3f}" for r in results.values()))
+    print(f"{'database MB':18}" + "".join(f"{r['db_mb']:12.1f}" for r in results.values()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+"""Measure login throughput and latency at several password hash settings.
+
+    python -m benchmarks.passwords
+    python -m benchmarks.passwords --method pbkdf2:sha256:600000 --method scrypt:16384:8:1 --concurrency 16
+
+For each PASSWORD_HASH_METHOD a throwaway SQLite database gets --users
+accounts hashed with it, then --concurrency clients log in --requests
+times in total through the Flask test client, so the numbers are for
+one worker process and its check pool of --threads threads. A final
+pass logs in with the first setting's hashes under the second setting,
+timing the rehash-on-login path.
+"""
+import argparse
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from flask_migrate import upgrade
+from sqlalchemy import insert
+
+from app import create_app, db
+from app.models import User
+from app.passwords import passwords
+
+from .run import summarize
+
+PASSWORD = "benchmark"
+
+METHODS = [
+    "pbkdf2:sha256:1000000",
+    "pbkdf2:sha256:600000",
+    "pbkdf2:sha256:100000",
+    "scrypt:32768:8:1",
+    "scrypt:16384:8:1",
+]
+
+
+def make_app(method, threads):
+    database = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench.db')}"
+    return create_app({
+        "SQLALCHEMY_DATABASE_URI": database,
+        "PASSWORD_HASH_METHOD": method,
+        "PASSWORD_CHECK_THREADS": threads,
+        "RATELIMIT_ENABLED": False,
+    })
+
+
+def add_users(app, count, method):
+    with app.app_context():
+        upgrade()
+        app.config["PASSWORD_HASH_METHOD"] = method
+        # one hash per user, as real accounts have distinct salts
+        rows = [
+            {"username": f"user{n}", "email": f"user{n}@bench.test", "password_hash": passwords.hash(PASSWORD)}
+            for n in range(count)
+        ]
+        db.session.execute(insert(User), rows)
+        db.session.commit()
+
+
+def run(app, users, requests, concurrency):
+    local = threading.local()
+
+    def one(n):
+        if not hasattr(local, "client"):
+            local.client = app.test_client()
+        began = time.perf_counter()
+        response = local.client.post("/login", data={"email": f"user{n % users}@bench.test", "password": PASSWORD})
+        elapsed = time.perf_counter() - began
+        # a successful login redirects to the dashboard, a failed one back to the form
+        ok = response.status_code == 302 and "/login" not in response.headers.get("Location", "")
+        return (response.status_code if ok else 500), elapsed, None
+
+    with ThreadPoolExecutor(concurrency) as pool:
+        began = time.perf_counter()
+        samples = list(pool.map(one, range(requests)))
+        wall = time.perf_counter() - began
+    return summarize(samples, wall)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--method", action="append", help="hash methods to compare (default: a spread of each)")
+    parser.add_argument("--requests", type=int, default=200, help="logins per setting")
+    parser.add_argument("--users", type=int, default=50, help="accounts to log in as, round robin")
+    parser.add_argument("--concurrency", type=int, default=8, help="clients logging in at once")
+    parser.add_argument("--threads", type=int, default=4, help="PASSWORD_CHECK_THREADS")
+    args = parser.parse_args()
+    methods = args.method or METHODS
+
+    print(f"{'setting':34}{'p50 ms':>10}{'p95 ms':>10}{'logins/s':>10}{'errors':>8}")
+
+    def report(name, summary):
+        print(f"{name:34}{summary['p50_ms']:>10.1f}{summary['p95_ms']:>10.1f}"
+              f"{summary['throughput_rps']:>10.1f}{summary['errors']:>8}")
+
+    for method in methods:
+        app = make_app(method, args.threads)
+        add_users(app, args.users, method)
+        report(method, run(app, args.users, args.requests, args.concurrency))
+
+    if len(methods) > 1:
+        # every account's first login rehashes, later ones do not
+        app = make_app(methods[1], args.threads)
+        add_users(app, args.users, methods[0])
+        app.config["PASSWORD_HASH_METHOD"] = methods[1]
+        report(f"rehash -> {methods[1]}", run(app, args.users, args.users, args.concurrency))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,255 @@
+"""Drive the core routes and report latency, throughput and queries per request.
+
+    python -m benchmarks.run --scale small --out results.json
+    python -m benchmarks.run --database sqlite:////tmp/bench.db --url http://127.0.0.1:8000 --concurrency 8
+    python -m benchmarks.run --database sqlite:////tmp/bench.db --baseline before.json
+
+Without --database a throwaway SQLite database is generated at --scale.
+By default requests go through the Flask test client in this process,
+which also records SQL queries per request. With --url they go over HTTP
+to a running server (e.g. gunicorn) sharing the same --database, and
+queries are not counted; start that server with RATELIMIT_ENABLED=0 or
+the rate limiter turns most of the run away.
+"""
+import argparse
+import http.cookiejar
+import json
+import os
+import random
+import statistics
+import subprocess
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+from flask_migrate import upgrade
+from sqlalchemy import or_, select
+from sqlalchemy.engine import make_url
+
+from app import create_app, db
+from app.models import Issue, Project, ProjectMember, User
+from app.querycount import count_queries
+
+from .datagen import PASSWORD, add_scale_arguments, generate, scale_from_args
+
+STATUSES = ["Open", "In Progress", "Resolved", "Closed"]
+PRIORITIES = ["Low", "Medium", "High", "Critical"]
+SEARCH_TERMS = ["login", "crash", "cache tok", "export", "slow page", "sea"]
+
+
+class TestClientDriver:
+    def __init__(self, app):
+        self.app = app
+        self.client = app.test_client()
+
+    def request(self, method, url, data=None):
+        with count_queries() as counter:
+            began = time.perf_counter()
+            response = self.client.open(url, method=method, data=data)
+            elapsed = time.perf_counter() - began
+        return response.status_code, elapsed, counter.count
+
+
+class HTTPDriver:
+    def __init__(self, base_url):
+        self.base_url = base_url.rstrip("/")
+        self.opener = urllib.request.build_opener(
+            urllib.request.HTTPCookieProcessor(http.cookiejar.CookieJar()), _NoRedirect()
+        )
+
+    def request(self, method, url, data=None):
+        body = urllib.parse.urlencode(data).encode() if data is not None else None
+        req = urllib.request.Request(self.base_url + url, data=body, method=method)
+        began = time.perf_counter()
+        try:
+            with self.opener.open(req) as response:
+                response.read()
+                status = response.status
+        except urllib.error.HTTPError as error:
+            status = error.code
+        return status, time.perf_counter() - began, None
+
+
+class _NoRedirect(urllib.request.HTTPRedirectHandler):
+    # time each request on its own, like the test client does
+    def redirect_request(self, *args, **kwargs):
+        return None
+
+
+def build_scenarios(targets):
+    """name -> function(rng) returning (method, url, form data)."""
+    projects, issues, editable = targets["project_ids"], targets["issue_ids"], targets["editable_ids"]
+    users = targets["user_ids"]
+
+    def issues_filtered(rng):
+        params = {}
+        for key, choices in (("status", STATUSES), ("priority", PRIORITIES), ("assignee", users), ("q", SEARCH_TERMS)):
+            if rng.random() < 0.35:
+                params[key] = rng.choice(choices)
+        return "GET", f"/projects/{rng.choice(projects)}/issues?{urllib.parse.urlencode(params)}", None
+
+    def issue_edit_post(rng):
+        return "POST", f"/issues/{rng.choice(editable)}/edit", {
+            "title": f"Benchmark edit {rng.randint(1, 10 ** 6)}",
+            "description": "edited by the benchmark",
+            "status": rng.choice(STATUSES),
+            "priority": rng.choice(PRIORITIES),
+        }
+
+    return {
+        "dashboard": lambda rng: ("GET", "/dashboard", None),
+        "issues_list": lambda rng: ("GET", f"/projects/{rng.choice(projects)}/issues", None),
+        "issues_filtered": issues_filtered,
+        "issue_detail": lambda rng: ("GET", f"/issues/{rng.choice(issues)}", None),
+        "issue_edit": lambda rng: ("GET", f"/issues/{rng.choice(editable)}/edit", None),
+        "issue_edit_post": issue_edit_post,
+    }
+
+
+def pick_targets(login_email, sample=2000):
+    """Projects and issues the benchmark user can reach. Call inside an app context."""
+    user = db.session.execute(select(User.id).where(User.email == login_email)).scalar_one()
+    project_ids = db.session.scalars(select(ProjectMember.project_id).where(ProjectMember.user_id == user)).all()
+    issue_ids = db.session.scalars(
+        select(Issue.id).where(Issue.project_id.in_(project_ids)).order_by(Issue.id.desc()).limit(sample)
+    ).all()
+    editable_ids = db.session.scalars(
+        select(Issue.id).join(Project).where(
+            Issue.project_id.in_(project_ids),
+            or_(Issue.reporter_id == user, Issue.assignee_id == user, Project.owner_id == user),
+        ).limit(sample)
+    ).all()
+    user_ids = db.session.scalars(select(User.id).limit(sample)).all()
+    return {"project_ids": project_ids, "issue_ids": issue_ids, "editable_ids": editable_ids, "user_ids": user_ids}
+
+
+def summarize(samples, wall_seconds):
+    latencies = sorted(s[1] * 1000 for s in samples)
+    cuts = statistics.quantiles(latencies, n=100, method="inclusive")
+    queries = [s[2] for s in samples if s[2] is not None]
+    return {
+        "requests": len(samples),
+        "errors": sum(1 for s in samples if s[0] >= 400),
+        "p50_ms": round(cuts[49], 3),
+        "p95_ms": round(cuts[94], 3),
+        "p99_ms": round(cuts[98], 3),
+        "mean_ms": round(statistics.fmean(latencies), 3),
+        "throughput_rps": round(len(samples) / wall_seconds, 1),
+        "queries_per_request": round(statistics.fmean(queries), 2) if queries else None,
+    }
+
+
+def run_scenario(make_driver, login, scenario, requests, concurrency, seed):
+    local = threading.local()
+
+    def driver():
+        if not hasattr(local, "driver"):
+            local.driver = make_driver()
+            local.driver.request("POST", "/login", login)
+            local.rng = random.Random(seed + threading.get_ident())
+        return local.driver
+
+    def one(_):
+        d = driver()
+        return d.request(*scenario(local.rng))
+
+    # warm caches and connections before measuring
+    with ThreadPoolExecutor(concurrency) as pool:
+        list(pool.map(one, range(min(requests // 10 + 1, 50))))
+        began = time.perf_counter()
+        samples = list(pool.map(one, range(requests)))
+        wall = time.perf_counter() - began
+    return summarize(samples, wall)
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results, baseline_path):
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    print(f"\ncompared with {baseline_path} ({baseline.get('commit')}):")
+    for name, current in results["scenarios"].items():
+        before = baseline["scenarios"].get(name)
+        if not before:
+            continue
+        deltas = []
+        for key in ("p50_ms", "p95_ms", "throughput_rps"):
+            if before[key]:
+                deltas.append(f"{key} {100 * (current[key] - before[key]) / before[key]:+.1f}%")
+        if before.get("queries_per_request") is not None and current.get("queries_per_request") is not None:
+            deltas.append(f"queries {before['queries_per_request']} -> {current['queries_per_request']}")
+        print(f"  {name:18} " + ", ".join(deltas))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--database", help="benchmark an existing database instead of generating one")
+    parser.add_argument("--url", help="base URL of a running server to drive over HTTP")
+    parser.add_argument("--login", help="email to log in as (default: the generated first user)")
+    parser.add_argument("--requests", type=int, default=300, help="requests per scenario")
+    parser.add_argument("--concurrency", type=int, default=1, help="parallel clients (HTTP mode)")
+    parser.add_argument("--scenario", action="append", help="only run these scenarios")
+    parser.add_argument("--out", help="write results JSON here")
+    parser.add_argument("--baseline", help="results JSON from an earlier run to compare against")
+    add_scale_arguments(parser)
+    args = parser.parse_args()
+
+    database = args.database or f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench.db')}"
+    # one client replaying hundreds of requests is exactly what the limiter stops
+    app = create_app({"SQLALCHEMY_DATABASE_URI": database, "RATELIMIT_ENABLED": False})
+    with app.app_context():
+        upgrade()
+        dataset = None
+        if not args.database:
+            dataset = generate(scale_from_args(args), seed=args.seed)
+        login_email = args.login or (dataset["login_email"] if dataset else "user1@bench.test")
+        targets = pick_targets(login_email)
+
+    if args.url:
+        make_driver = lambda: HTTPDriver(args.url)
+        concurrency = args.concurrency
+    else:
+        make_driver = lambda: TestClientDriver(app)
+        # the test client runs in this process, so extra threads only add GIL contention
+        concurrency = 1
+
+    scenarios = build_scenarios(targets)
+    selected = args.scenario or list(scenarios)
+    login = {"email": login_email, "password": PASSWORD}
+    results = {
+        "commit": git_commit(),
+        "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "mode": "http" if args.url else "test_client",
+        "concurrency": concurrency,
+        "database": make_url(database).render_as_string(hide_password=True),
+        "scale": dataset["scale"] if dataset else None,
+        "scenarios": {},
+    }
+
+    print(f"{'scenario':18}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'req/s':>10}{'queries':>9}{'errors':>8}")
+    for index, name in enumerate(selected):
+        summary = run_scenario(make_driver, login, scenarios[name], args.requests, concurrency, args.seed + index)
+        results["scenarios"][name] = summary
+        queries = summary["queries_per_request"]
+        print(f"{name:18}{summary['p50_ms']:10.2f}{summary['p95_ms']:10.2f}{summary['p99_ms']:10.2f}"
+              f"{summary['throughput_rps']:10.1f}{queries if queries is not None else '-':>9}{summary['errors']:8}")
+
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(results, f, indent=2)
+    if args.baseline:
+        compare(results, args.baseline)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+# config.py
+import os
+
+
+def _env_bool(name, default):
+    value = os.environ.get(name)
+    if value is None:
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+
+def _env_int(name, default):
+    value = os.environ.get(name)
+    return int(value) if value else default
+
+
+def _database_url():
+    url = os.environ.get("DATABASE_URL", "sqlite:///BUGTRACKER.db")
+    # some hosts still hand out the scheme SQLAlchemy dropped in 1.4
+    if url.startswith("postgres://"):
+        url = "postgresql://" + url[len("postgres://"):]
+    return url
+
+
+class Config:
+    SECRET_KEY = os.environ.get("SECRET_KEY", "CHANGE_IT_LATER")
+
+    SQLALCHEMY_DATABASE_URI = _database_url()
+    SQLALCHEMY_TRACK_MODIFICATIONS = False
+
+    # Connection pool for server databases such as PostgreSQL. Size it so
+    # workers * (DB_POOL_SIZE + DB_MAX_OVERFLOW) stays under max_connections.
+    DB_POOL_SIZE = _env_int("DB_POOL_SIZE", 5)
+    DB_MAX_OVERFLOW = _env_int("DB_MAX_OVERFLOW", 10)
+    DB_POOL_TIMEOUT = _env_int("DB_POOL_TIMEOUT", 30)
+    DB_POOL_RECYCLE = _env_int("DB_POOL_RECYCLE", 1800)
+    DB_POOL_PRE_PING = _env_bool("DB_POOL_PRE_PING", True)
+
+    # Read replicas, comma separated. GET requests read from a random replica
+    # unless the client wrote within the last REPLICA_STICKY_SECONDS. To try
+    # it locally, point DATABASE_URL and DATABASE_REPLICA_URLS at two SQLite
+    # files and copy the primary over with `flask replica sync`.
+    SQLALCHEMY_REPLICA_URIS = [url for url in os.environ.get("DATABASE_REPLICA_URLS", "").split(",") if url]
+    REPLICA_STICKY_SECONDS = _env_int("REPLICA_STICKY_SECONDS", 10)
+
+    # SQLite tuning, applied to every new connection when SQLITE_TUNED is on:
+    # WAL lets readers run alongside the single writer, busy_timeout makes
+    # a locked writer wait instead of failing straight away.
+    SQLITE_TUNED = _env_bool("SQLITE_TUNED", True)
+    SQLITE_SYNCHRONOUS = os.environ.get("SQLITE_SYNCHRONOUS", "NORMAL")
+    SQLITE_BUSY_TIMEOUT_MS = _env_int("SQLITE_BUSY_TIMEOUT_MS", 5000)
+    SQLITE_MMAP_SIZE = _env_int("SQLITE_MMAP_SIZE", 256 * 1024 * 1024)
+    # negative values are KiB, so this is a 64 MiB page cache per connection
+    SQLITE_CACHE_SIZE = _env_int("SQLITE_CACHE_SIZE", -64000)
+
+    # Prometheus metrics at /metrics. The scraper has to send
+    # "Authorization: Bearer <METRICS_TOKEN>"; without a token the endpoint
+    # is a 404 unless METRICS_PUBLIC is set, for when only the scraper can
+    # reach the app anyway. Under several gunicorn workers set METRICS_DIR
+    # to a directory they share, so /metrics sums all of them instead of
+    # reporting whichever worker answered (see gunicorn.conf.py).
+    METRICS_ENABLED = _env_bool("METRICS_ENABLED", True)
+    METRICS_TOKEN = os.environ.get("METRICS_TOKEN")
+    METRICS_PUBLIC = _env_bool("METRICS_PUBLIC", False)
+    METRICS_DIR = os.environ.get("METRICS_DIR")
+    METRICS_WRITE_SECONDS = _env_int("METRICS_WRITE_SECONDS", 5)
+    # log queries slower than this many milliseconds, with their plan
+    SLOW_QUERY_MS = _env_int("SLOW_QUERY_MS", None)
+    SLOW_QUERY_EXPLAIN = _env_bool("SLOW_QUERY_EXPLAIN", True)
+
+    # "My issues" lists at most this many, and each worker caches a user's
+    # list for up to MY_ISSUES_CACHE_TTL seconds after another worker changes it
+    MY_ISSUES_LIMIT = _env_int("MY_ISSUES_LIMIT", 200)
+    MY_ISSUES_CACHE_TTL = _env_int("MY_ISSUES_CACHE_TTL", 60)
+
+    # most issues one bulk triage request may change
+    BULK_MAX_ISSUES = _env_int("BULK_MAX_ISSUES", 500)
+
+    # live activity streams, off by default. Each open stream holds a worker
+    # thread (GUNICORN_WORKER_CLASS=gevent makes that a greenlet), and the
+    # "local" broker is in-process pub/sub, so with more than one gunicorn
+    # worker use "redis" (at EVENTS_BROKER_URL, needs the redis package) or
+    # a dotted path to a factory returning an app.events.Broker
+    EVENTS_ENABLED = _env_bool("EVENTS_ENABLED", False)
+    EVENTS_BROKER = os.environ.get("EVENTS_BROKER", "local")
+    EVENTS_BROKER_URL = os.environ.get("EVENTS_BROKER_URL")
+    # streams close after this long and the browser reconnects, resuming
+    # from its Last-Event-ID
+    EVENTS_MAX_SECONDS = _env_int("EVENTS_MAX_SECONDS", 300)
+
+    # rendered issue rows and timelines: "local" (per-process LRU of
+    # FRAGMENT_CACHE_SIZE fragments), "redis" (shared, at FRAGMENT_CACHE_URL,
+    # needs the redis package) or "null" to turn it off
+    FRAGMENT_CACHE_BACKEND = os.environ.get("FRAGMENT_CACHE_BACKEND", "local")
+    FRAGMENT_CACHE_SIZE = _env_int("FRAGMENT_CACHE_SIZE", 10000)
+    FRAGMENT_CACHE_URL = os.environ.get("FRAGMENT_CACHE_URL")
+
+    # background jobs need a `flask jobs work` process running next to
+    # gunicorn; without one new issues and comments are never indexed for
+    # search, and /metrics warns once a due job has waited
+    # JOBS_WARN_AFTER_SECONDS. JOBS_INLINE runs them in the web process
+    # instead, after the request's transaction commits
+    JOBS_INLINE = _env_bool("JOBS_INLINE", False)
+    JOBS_WARN_AFTER_SECONDS = _env_int("JOBS_WARN_AFTER_SECONDS", 300)
+    JOBS_MAX_ATTEMPTS = _env_int("JOBS_MAX_ATTEMPTS", 5)
+    # a failed job waits this long, doubling per attempt, before its retry
+    JOBS_BACKOFF_SECONDS = _env_int("JOBS_BACKOFF_SECONDS", 10)
+    # a running job whose worker has not finished it after this long is
+    # assumed lost with its worker and handed to another
+    JOBS_LOCK_TIMEOUT_SECONDS = _env_int("JOBS_LOCK_TIMEOUT_SECONDS", 600)
+
+    # activity retention: `flask activity archive` moves activity older than
+    # ACTIVITY_ARCHIVE_AFTER_DAYS to the archive table, and `flask activity
+    # prune` deletes archived rows older than ACTIVITY_RETENTION_DAYS
+    # (unset keeps them forever)
+    ACTIVITY_ARCHIVE_AFTER_DAYS = _env_int("ACTIVITY_ARCHIVE_AFTER_DAYS", 90)
+    ACTIVITY_RETENTION_DAYS = _env_int("ACTIVITY_RETENTION_DAYS", None)
+
+    # password hashing in werkzeug's method syntax, work factor included,
+    # e.g. "scrypt:32768:8:1" or "pbkdf2:sha256:600000". Existing hashes
+    # move to this setting when their user next logs in.
+    PASSWORD_HASH_METHOD = os.environ.get("PASSWORD_HASH_METHOD", "scrypt:32768:8:1")
+    # login checks run on this many threads per worker; past the backlog,
+    # logins get a 503 instead of tying up request threads
+    PASSWORD_CHECK_THREADS = _env_int("PASSWORD_CHECK_THREADS", 4)
+    PASSWORD_CHECK_BACKLOG = _env_int("PASSWORD_CHECK_BACKLOG", 64)
+
+    # per-user and per-IP token buckets, as "<requests>/<period>" with the
+    # period in seconds or a unit ("20/60", "20/minute", "100/5m"); empty
+    # means unlimited. "local" buckets are per worker; "redis" shares them
+    # through RATELIMIT_STORE_URL (needs the redis package).
+    RATELIMIT_ENABLED = _env_bool("RATELIMIT_ENABLED", True)
+    RATELIMIT_STORE = os.environ.get("RATELIMIT_STORE", "local")
+    RATELIMIT_STORE_URL = os.environ.get("RATELIMIT_STORE_URL")
+    RATELIMIT_AUTH = os.environ.get("RATELIMIT_AUTH", "10/minute")
+    RATELIMIT_SEARCH = os.environ.get("RATELIMIT_SEARCH", "30/minute")
+    RATELIMIT_WRITE = os.environ.get("RATELIMIT_WRITE", "60/minute")
+    # load shedding: answer 503 straight away once this many requests are
+    # running in a worker (set it near GUNICORN_THREADS), or while every
+    # database pool connection is checked out
+    SHED_MAX_IN_FLIGHT = _env_int("SHED_MAX_IN_FLIGHT", None)
+    SHED_ON_DB_POOL = _env_bool("SHED_ON_DB_POOL", True)
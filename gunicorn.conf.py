@@ -0,0 +1,49 @@
+# gunicorn.conf.py
+import os
+
+bind = os.environ.get("GUNICORN_BIND", "0.0.0.0:8000")
+workers = int(os.environ.get("GUNICORN_WORKERS", 2))
+
+# Live activity streams (/projects/<id>/events, /issues/<id>/events) are off
+# unless EVENTS_ENABLED is set. Each stays open for up to EVENTS_MAX_SECONDS
+# and holds one of a gthread worker's `threads` meanwhile, so a few dozen
+# open tabs leave none for ordinary requests: run them with
+# GUNICORN_WORKER_CLASS=gevent (pip install gevent), where a stream is a
+# greenlet. The default "local" event broker only reaches streams in the
+# worker that published the event, so it needs GUNICORN_WORKERS=1; set
+# EVENTS_BROKER=redis for more.
+worker_class = os.environ.get("GUNICORN_WORKER_CLASS", "gthread")
+threads = int(os.environ.get("GUNICORN_THREADS", 32))
+events_enabled = os.environ.get("EVENTS_ENABLED", "").lower() in ("1", "true", "yes", "on")
+
+# Background jobs (search indexing) need a worker alongside gunicorn with the
+# same environment, e.g. `flask jobs work --processes 2`; without one,
+# search stops finding new issues and comments. A single-process deployment
+# without a worker can set JOBS_INLINE=1 to run them after each request.
+
+# With METRICS_DIR set each worker writes its counters there and /metrics
+# sums them. Start every run from an empty directory, and fold the counts of
+# a worker that exits (max_requests, a crash) into the total it leaves behind.
+metrics_dir = os.environ.get("METRICS_DIR")
+
+
+def on_starting(server):
+    if events_enabled:
+        if worker_class == "gthread":
+            server.log.warning("EVENTS_ENABLED under gthread workers: each open event stream holds "
+                               "one of %d threads per worker; use GUNICORN_WORKER_CLASS=gevent", threads)
+        if workers > 1 and os.environ.get("EVENTS_BROKER", "local") == "local":
+            server.log.warning("EVENTS_ENABLED with %d workers and the local event broker: streams only "
+                               "see events from their own worker; set EVENTS_BROKER=redis", workers)
+    if metrics_dir:
+        os.makedirs(metrics_dir, exist_ok=True)
+        for entry in os.listdir(metrics_dir):
+            if entry.endswith((".json", ".tmp")):
+                os.remove(os.path.join(metrics_dir, entry))
+
+
+def child_exit(server, worker):
+    if metrics_dir:
+        from app.metrics import mark_process_dead
+
+        mark_process_dead(metrics_dir, worker.pid)
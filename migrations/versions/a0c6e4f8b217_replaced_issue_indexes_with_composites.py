@@ -0,0 +1,41 @@
+"""replaced issue indexes with composites
+
+Revision ID: a0c6e4f8b217
+Revises: 7d4b0c93e1a5
+Create Date: 2026-01-22 14:48:31.209655
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a0c6e4f8b217'
+down_revision = '7d4b0c93e1a5'
+branch_labels = None
+depends_on = None
+
+# single-column indexes from b5e06189df89; none of them matches how issues
+# are queried, and the ones on id and description were never useful at all
+OLD_INDEXES = [
+    'assignee_id', 'created_at', 'description', 'due_date', 'id', 'priority',
+    'project_id', 'reporter_id', 'status', 'title', 'updated_at',
+]
+
+
+def upgrade():
+    with op.batch_alter_table('issue', schema=None) as batch_op:
+        for column in OLD_INDEXES:
+            batch_op.drop_index(batch_op.f(f'ix_issue_{column}'))
+        batch_op.create_index('ix_issue_project_status', ['project_id', 'status', 'created_at', 'id'], unique=False)
+        batch_op.create_index('ix_issue_project_assignee', ['project_id', 'assignee_id', 'created_at', 'id'], unique=False)
+        batch_op.create_index('ix_issue_project_priority', ['project_id', 'priority', 'created_at', 'id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('issue', schema=None) as batch_op:
+        batch_op.drop_index('ix_issue_project_priority')
+        batch_op.drop_index('ix_issue_project_assignee')
+        batch_op.drop_index('ix_issue_project_status')
+        for column in reversed(OLD_INDEXES):
+            batch_op.create_index(batch_op.f(f'ix_issue_{column}'), [column], unique=False)
@@ -0,0 +1,40 @@
+"""added issue search index
+
+Revision ID: c3f1a9d27b44
+Revises: e1c86f2b47e6
+Create Date: 2026-01-08 10:14:03.512208
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c3f1a9d27b44'
+down_revision = 'e1c86f2b47e6'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # FTS5 is SQLite only; PostgreSQL gets its own index in f2a8c61d0e94
+    if op.get_context().dialect.name != 'sqlite':
+        return
+    op.execute(
+        "CREATE VIRTUAL TABLE IF NOT EXISTS issue_search "
+        "USING fts5(title, description, comments, "
+        "tokenize='unicode61 remove_diacritics 2', prefix='2 3')"
+    )
+    # index the issues already there, as `flask search rebuild` would
+    op.execute(
+        "INSERT INTO issue_search (rowid, title, description, comments) "
+        "SELECT issue.id, issue.title, coalesce(issue.description, ''), coalesce(c.comments, '') "
+        "FROM issue LEFT JOIN (SELECT issue_id, group_concat(content, ' ') AS comments "
+        "FROM comment GROUP BY issue_id) AS c ON c.issue_id = issue.id"
+    )
+
+
+def downgrade():
+    if op.get_context().dialect.name != 'sqlite':
+        return
+    op.execute("DROP TABLE IF EXISTS issue_search")
@@ -0,0 +1,59 @@
+"""added postgresql issue search
+
+Revision ID: f2a8c61d0e94
+Revises: 7e4d2a9c5b10
+Create Date: 2026-10-17 11:02:41.208315
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = 'f2a8c61d0e94'
+down_revision = '7e4d2a9c5b10'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    dialect = op.get_context().dialect.name
+    if dialect == 'sqlite':
+        # c3f1a9d27b44 used to leave the FTS5 index empty; fill in whatever
+        # issues it is missing
+        op.execute(
+            "INSERT INTO issue_search (rowid, title, description, comments) "
+            "SELECT issue.id, issue.title, coalesce(issue.description, ''), coalesce(c.comments, '') "
+            "FROM issue LEFT JOIN (SELECT issue_id, group_concat(content, ' ') AS comments "
+            "FROM comment GROUP BY issue_id) AS c ON c.issue_id = issue.id "
+            "WHERE issue.id NOT IN (SELECT rowid FROM issue_search)"
+        )
+        return
+    if dialect != 'postgresql':
+        return
+    # kept out of the models like the FTS5 table; see app/search.py
+    op.create_table('issue_search',
+    sa.Column('issue_id', sa.Integer(), nullable=False),
+    sa.Column('document', postgresql.TSVECTOR(), nullable=False),
+    sa.ForeignKeyConstraint(['issue_id'], ['issue.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('issue_id')
+    )
+    op.create_index('ix_issue_search_document', 'issue_search', ['document'], unique=False,
+                    postgresql_using='gin')
+    op.execute(
+        "INSERT INTO issue_search (issue_id, document) "
+        "SELECT issue.id, "
+        "setweight(to_tsvector('simple', issue.title), 'A') || "
+        "setweight(to_tsvector('simple', coalesce(issue.description, '')), 'B') || "
+        "setweight(to_tsvector('simple', coalesce(c.comments, '')), 'C') "
+        "FROM issue LEFT JOIN (SELECT issue_id, string_agg(content, ' ') AS comments "
+        "FROM comment GROUP BY issue_id) AS c ON c.issue_id = issue.id"
+    )
+
+
+def downgrade():
+    if op.get_context().dialect.name != 'postgresql':
+        return
+    op.drop_index('ix_issue_search_document', table_name='issue_search')
+    op.drop_table('issue_search')
@@ -0,0 +1,55 @@
+import pytest
+from flask_migrate import upgrade
+
+from app import access, assignees, create_app, identity, my_issues, pagination
+
+
+def make_app(tmp_path, **config):
+    """A migrated app on a fresh database in tmp_path, with config over the test defaults."""
+    app = create_app({
+        "TESTING": True,
+        "SQLALCHEMY_DATABASE_URI": f"sqlite:///{tmp_path / 'test.db'}",
+        "PASSWORD_HASH_METHOD": "pbkdf2:sha256:1000",
+        "RATELIMIT_ENABLED": False,
+        "JOBS_INLINE": True,
+        **config,
+    })
+    with app.app_context():
+        upgrade()
+    # per-process caches outlive the app, and every test's database reuses the same ids
+    for cache in (access._access, access._issue_projects, assignees._members,
+                  identity._identities, my_issues._lists, pagination._counts):
+        cache.clear()
+    return app
+
+
+@pytest.fixture
+def app(tmp_path):
+    return make_app(tmp_path)
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+def register(client, username):
+    client.post("/register", data={
+        "username": username, "email": f"{username}@example.com", "password": "pw", "confirm": "pw",
+    })
+
+
+def login(client, username):
+    response = client.post("/login", data={"email": f"{username}@example.com", "password": "pw"})
+    assert response.status_code == 302 and "/login" not in response.location
+
+
+@pytest.fixture
+def owner(client):
+    """A logged in user owning project 1, which has issues 1 to 3."""
+    register(client, "owner")
+    login(client, "owner")
+    client.post("/projects/new", data={"name": "Tracker", "description": ""})
+    for n in range(1, 4):
+        client.post("/projects/1/issues/new", data={"title": f"Issue {n}", "description": "text"})
+    return client
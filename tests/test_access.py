@@ -0,0 +1,17 @@
+from app import db
+from app.models import ProjectMember
+
+from conftest import login, register
+
+
+def test_new_member_is_let_in_without_invalidation(app, owner):
+    outsider = app.test_client()
+    register(outsider, "outsider")
+    login(outsider, "outsider")
+    assert outsider.get("/projects/1/issues").status_code == 302
+
+    # added by another worker: this process's caches are never told
+    with app.app_context():
+        db.session.add(ProjectMember(project_id=1, user_id=2, role="member"))
+        db.session.commit()
+    assert outsider.get("/projects/1/issues").status_code == 200
@@ -0,0 +1,18 @@
+from datetime import timedelta
+
+from app import activity
+from app.models import Activity, ActivityArchive, ist_now
+
+
+def test_archive_moves_every_action(app, owner):
+    owner.post("/issues/1", data={"content": "A comment"})
+    with app.app_context():
+        before = sorted((row.id, row.action) for row in Activity.query)
+        assert "Commented" in {action for _, action in before}
+        assert activity.archive(ist_now() + timedelta(days=1), batch_size=2) == len(before)
+        assert Activity.query.count() == 0
+        assert sorted((row.id, row.action) for row in ActivityArchive.query) == before
+        issue_actions = [row.action for row in ActivityArchive.query.filter_by(issue_id=1).order_by(ActivityArchive.id)]
+
+    items = owner.get("/api/v1/issues/1/activity").get_json()["items"]
+    assert [item["action"] for item in items] == issue_actions == ["Created", "Commented"]
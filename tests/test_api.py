@@ -0,0 +1,67 @@
+from conftest import login, make_app, register
+
+
+def test_issue_not_modified_until_it_changes(owner):
+    response = owner.get("/api/v1/issues/1")
+    assert response.status_code == 200 and response.json["title"] == "Issue 1"
+    etag, last_modified = response.headers["ETag"], response.headers["Last-Modified"]
+
+    assert owner.get("/api/v1/issues/1", headers={"If-None-Match": etag}).status_code == 304
+    assert owner.get("/api/v1/issues/1", headers={"If-Modified-Since": last_modified}).status_code == 304
+
+    owner.post("/issues/1", data={"content": "moves updated_at on"})
+    response = owner.get("/api/v1/issues/1", headers={"If-None-Match": etag})
+    assert response.status_code == 200 and response.headers["ETag"] != etag
+
+
+def test_issue_list_revalidates_on_etag_only(owner):
+    response = owner.get("/api/v1/projects/1/issues")
+    etag, last_modified = response.headers["ETag"], response.headers["Last-Modified"]
+    assert owner.get("/api/v1/projects/1/issues", headers={"If-None-Match": etag}).status_code == 304
+    # an issue filtered out of the list leaves its newest updated_at alone
+    assert owner.get("/api/v1/projects/1/issues", headers={"If-Modified-Since": last_modified}).status_code == 200
+    response = owner.get("/api/v1/projects/1/issues?status=Open", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+
+
+def test_fields_picks_and_rejects(owner):
+    response = owner.get("/api/v1/issues/1?fields=title,id")
+    assert set(response.json) == {"id", "title", "comments_url", "activity_url"}
+
+    response = owner.get("/api/v1/projects/1/issues?fields=title,secret,bogus")
+    assert response.status_code == 400
+    assert response.json == {"error": "Bad Request", "message": "Unknown fields: bogus, secret."}
+
+
+def test_issue_list_pages_by_cursor(owner):
+    first = owner.get("/api/v1/projects/1/issues?limit=2&fields=id").json
+    assert [item["id"] for item in first["items"]] == [3, 2] and first["total"] == 3
+    second = owner.get(f"/api/v1/projects/1/issues?limit=2&fields=id&cursor={first['next_cursor']}").json
+    assert [item["id"] for item in second["items"]] == [1] and second["next_cursor"] is None
+    back = owner.get(f"/api/v1/projects/1/issues?limit=2&fields=id&cursor={second['prev_cursor']}").json
+    assert back["items"] == first["items"]
+
+
+def test_comments_page_by_cursor(owner):
+    for n in range(3):
+        owner.post("/issues/1", data={"content": f"comment {n}"})
+    first = owner.get("/api/v1/issues/1/comments?limit=2").json
+    assert [item["content"] for item in first["items"]] == ["comment 0", "comment 1"]
+    rest = owner.get(f"/api/v1/issues/1/comments?limit=2&cursor={first['next_cursor']}").json
+    assert [item["content"] for item in rest["items"]] == ["comment 2"] and rest["next_cursor"] is None
+
+
+def test_errors_are_json_and_keep_retry_after(tmp_path):
+    app = make_app(tmp_path, RATELIMIT_ENABLED=True, RATELIMIT_SEARCH="1/minute")
+    client = app.test_client()
+    register(client, "owner")
+    login(client, "owner")
+    client.post("/projects/new", data={"name": "Tracker", "description": ""})
+
+    assert client.get("/api/v1/projects/1/issues?q=x").status_code == 200
+    response = client.get("/api/v1/projects/1/issues?q=x")
+    assert response.status_code == 429
+    assert response.json["error"] == "Too Many Requests"
+    assert int(response.headers["Retry-After"]) >= 1
+
+    assert app.test_client().get("/api/v1/projects").status_code == 401
@@ -0,0 +1,74 @@
+from app import db
+from app.models import Activity, Issue
+from app.querycount import count_queries
+
+
+def test_bulk_update_within_budget(app, owner):
+    with count_queries() as counter:
+        response = owner.post("/projects/1/issues/bulk", data={
+            "issue_ids": ["1", "2", "3"], "priority": "High", "status": "Closed",
+        })
+    assert response.status_code == 302
+    # six activity rows, one INSERT
+    inserts = [s for s in counter.statements if s.startswith("INSERT INTO activity")]
+    assert len(inserts) == 1
+    with app.app_context():
+        assert {(i.priority, i.status) for i in Issue.query} == {("High", "Closed")}
+        rows = Activity.query.filter_by(action="Updated").all()
+        assert sorted((row.issue_id, row.field) for row in rows) == [
+            (issue_id, field) for issue_id in (1, 2, 3) for field in ("priority", "status")
+        ]
+
+
+def test_bulk_update_events_carry_their_activity_ids(app, owner, monkeypatch):
+    from app import bulk
+
+    app.config["EVENTS_ENABLED"] = True
+    queued = []
+    monkeypatch.setattr(bulk, "queue_event", lambda session, event: queued.append(event))
+    owner.post("/projects/1/issues/bulk", data={"issue_ids": ["1", "2"], "priority": "Low"})
+    with app.app_context():
+        ids = {row.id: row.issue_id for row in Activity.query.filter_by(action="Updated")}
+    assert len(queued) == 2
+    for event in queued:
+        assert ids[event["id"]] == event["issue_id"]
+
+
+def test_bulk_update_retries_issues_edited_meanwhile(app, owner, monkeypatch):
+    """An edit landing between the bulk SELECT and UPDATE is not recorded over."""
+    from sqlalchemy import update
+
+    from app import bulk
+
+    real_diff = bulk.history.diff
+    edited = []
+
+    def diff_then_edit(before, after):
+        # the first time issue 2 is planned, another edit moves it on first
+        if before["id"] == 2 and not edited:
+            edited.append(True)
+            db.session.execute(update(Issue).where(Issue.id == 2).values(priority="Low", version=Issue.version + 1))
+        return real_diff(before, after)
+
+    monkeypatch.setattr(bulk.history, "diff", diff_then_edit)
+    # the injected edit and the retry are extra queries by design
+    app.config["QUERY_BUDGETS_ENFORCED"] = False
+    response = owner.post("/projects/1/issues/bulk", data={"issue_ids": ["1", "2", "3"], "priority": "High"})
+    assert response.status_code == 302
+    with app.app_context():
+        assert {issue.priority for issue in Issue.query} == {"High"}
+        row = Activity.query.filter_by(issue_id=2, action="Updated").one()
+        assert (row.old_value, row.new_value) == ("Low", "High")
+        assert db.session.get(Issue, 2).version == 3
+
+
+def test_bulk_assign_only_to_project_members(app, owner):
+    from conftest import register
+
+    register(app.test_client(), "outsider")
+    for assignee in ("2", "999"):
+        response = owner.post("/projects/1/issues/bulk", data={"issue_ids": ["1", "2"], "assignee_id": assignee})
+        assert response.status_code == 400
+    assert owner.post("/projects/1/issues/bulk", data={"issue_ids": ["1", "2"], "assignee_id": "1"}).status_code == 302
+    with app.app_context():
+        assert {issue.assignee_id for issue in Issue.query} == {1, None}
@@ -0,0 +1,96 @@
+from concurrent.futures import ThreadPoolExecutor
+from threading import Barrier
+
+from benchmarks.concurrency import FIELDS, EditForm, lost_updates, new_value
+from conftest import login
+
+from app import db, edits
+from app.models import Activity, Issue
+
+
+def edit_form(client, issue_id=1):
+    return EditForm(client.get(f"/issues/{issue_id}/edit").get_data(as_text=True)).values
+
+
+def test_stale_edit_of_other_fields_merges(app, owner):
+    form = edit_form(owner)
+    other = edit_form(owner)
+    other["priority"] = "High"
+    assert owner.post("/issues/1/edit", data=other).status_code == 302
+
+    # made from the version before that save, changing another field
+    form["title"] = "Renamed"
+    assert owner.post("/issues/1/edit", data=form).status_code == 302
+    with app.app_context():
+        issue = db.session.get(Issue, 1)
+        assert (issue.title, issue.priority, issue.version) == ("Renamed", "High", 3)
+
+
+def test_stale_edit_of_the_same_field_conflicts(app, owner):
+    form = edit_form(owner)
+    other = edit_form(owner)
+    other["title"] = "Theirs"
+    owner.post("/issues/1/edit", data=other)
+
+    form["title"] = "Mine"
+    response = owner.post("/issues/1/edit", data=form)
+    assert response.status_code == 409
+    page = response.get_data(as_text=True)
+    assert '<strong>title</strong>: yours "Mine", saved meanwhile\n        "Theirs"' in page
+    # the form comes back with this edit's values, based on the version that won
+    assert EditForm(page).values["title"] == "Mine"
+    with app.app_context():
+        assert db.session.get(Issue, 1).title == "Theirs"
+
+
+def test_edit_retries_when_the_update_finds_a_newer_version(app, owner, monkeypatch):
+    from sqlalchemy import update
+
+    real_diff = edits.history.diff
+    calls = []
+
+    def diff_then_edit(current, merged):
+        # another save moves the version on between the read and the UPDATE,
+        # so the first flush raises StaleDataError
+        if not calls:
+            db.session.execute(update(Issue).where(Issue.id == 1).values(version=Issue.version + 1)
+                               .execution_options(synchronize_session=False))
+        calls.append(current)
+        return real_diff(current, merged)
+
+    monkeypatch.setattr(edits.history, "diff", diff_then_edit)
+    app.config["QUERY_BUDGETS_ENFORCED"] = False
+    form = edit_form(owner)
+    form["title"] = "Retried"
+    assert owner.post("/issues/1/edit", data=form).status_code == 302
+    assert len(calls) == 2
+    with app.app_context():
+        assert db.session.get(Issue, 1).title == "Retried"
+        assert Activity.query.filter_by(issue_id=1, action="Updated").count() == 1
+
+
+def test_parallel_edits_lose_no_update(app, owner):
+    # retries under contention are extra queries by design
+    app.config["QUERY_BUDGETS_ENFORCED"] = False
+    clients, rounds = len(FIELDS), 4
+    start = Barrier(clients)
+
+    def client(number):
+        browser = app.test_client()
+        login(browser, "owner")
+        field, saved = FIELDS[number], []
+        start.wait()
+        for n in range(rounds):
+            form = edit_form(browser)
+            form[field] = new_value(field, number, n)
+            response = browser.post("/issues/1/edit", data=form)
+            assert response.status_code in (302, 409)
+            if response.status_code == 302:
+                saved.append(form[field])
+        return field, saved
+
+    with ThreadPoolExecutor(clients) as pool:
+        saved = list(pool.map(client, range(clients)))
+    assert sum(len(values) for _, values in saved) > 0
+    with app.app_context():
+        assert not lost_updates(1, saved)
@@ -0,0 +1,26 @@
+def test_streams_are_off_by_default(owner):
+    assert owner.get("/issues/1/events").status_code == 404
+    assert b"events.js" not in owner.get("/issues/1").data
+    assert b"events.js" not in owner.get("/projects/1/issues").data
+
+
+def test_writes_build_no_events_while_streams_are_off(app, owner, monkeypatch):
+    from app import events
+
+    queued = []
+    monkeypatch.setattr(events, "queue_event", lambda session, event: queued.append(event))
+    owner.post("/issues/1", data={"content": "unseen"})
+    assert queued == []
+    app.config["EVENTS_ENABLED"] = True
+    owner.post("/issues/1", data={"content": "seen"})
+    assert [event["action"] for event in queued] == ["Commented"]
+
+
+def test_stream_catches_up_from_last_event_id(app, owner):
+    app.config.update(EVENTS_ENABLED=True, EVENTS_MAX_SECONDS=0)
+    assert b"events.js" in owner.get("/issues/1").data
+    owner.post("/issues/1", data={"content": "hello"})
+    response = owner.get("/issues/1/events", headers={"Last-Event-ID": "0"})
+    assert response.mimetype == "text/event-stream"
+    body = response.get_data(as_text=True)
+    assert body.count("event: activity") == 2 and '"action": "Commented"' in body
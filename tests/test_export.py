@@ -0,0 +1,74 @@
+import csv
+import gzip
+import io
+import json
+from datetime import timedelta
+
+from app import activity
+from app.export import CSV_COLUMNS, export_issues
+from app.importer import read_csv
+from app.models import ist_now
+
+
+def exported(owner, format, **headers):
+    response = owner.get(f"/projects/1/issues/export?format={format}", headers=headers)
+    assert response.status_code == 200
+    return response
+
+
+def test_jsonl_has_each_issue_with_comments_and_activity(owner):
+    owner.post("/issues/2", data={"content": "Seen it too"})
+    owner.post("/issues/2/edit", data={"title": "Issue 2", "description": "text", "priority": "High",
+                                       "status": "Open", "assignee_id": "", "due_date": ""})
+    response = exported(owner, "jsonl")
+    assert response.mimetype == "application/x-ndjson"
+    documents = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    assert [document["title"] for document in documents] == ["Issue 1", "Issue 2", "Issue 3"]
+    second = documents[1]
+    assert [comment["content"] for comment in second["comments"]] == ["Seen it too"]
+    assert [(a["action"], a["detail"]) for a in second["activity"]][1:] == [
+        ("Commented", "Seen it too"), ("Updated", "priority: Medium -> High"),
+    ]
+
+
+def test_csv_rows_follow_their_issue(owner):
+    owner.post("/issues/1", data={"content": "Line one,\nline two"})
+    response = exported(owner, "csv")
+    assert response.mimetype == "text/csv"
+    rows = list(csv.reader(io.StringIO(response.get_data(as_text=True))))
+    assert tuple(rows[0]) == CSV_COLUMNS
+    assert [(row[0], row[1]) for row in rows[1:5]] == [
+        ("issue", "1"), ("comment", "1"), ("activity", "1"), ("activity", "1"),
+    ]
+    assert rows[2][-1] == "Line one,\nline two"
+    # and it reads back as the importer's records
+    records = list(read_csv(io.StringIO(response.get_data(as_text=True))))
+    assert [record["title"] for record in records] == ["Issue 1", "Issue 2", "Issue 3"]
+    assert records[0]["comments"][0]["content"] == "Line one,\nline two"
+
+
+def test_gzip_when_accepted(owner):
+    plain = exported(owner, "jsonl").data
+    response = exported(owner, "jsonl", **{"Accept-Encoding": "gzip"})
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert "Accept-Encoding" in response.headers["Vary"]
+    assert gzip.decompress(response.data) == plain
+
+
+def test_archived_activity_is_exported(app, owner):
+    owner.post("/issues/1", data={"content": "Before archiving"})
+    before = exported(owner, "jsonl").data
+    with app.app_context():
+        assert activity.archive(ist_now() + timedelta(days=1)) > 0
+    assert exported(owner, "jsonl").data == before
+
+
+def test_chunks_do_not_change_the_output(app, owner):
+    owner.post("/issues/3", data={"content": "Last"})
+    with app.app_context():
+        whole = "".join(export_issues(1, {}, "csv"))
+        assert "".join(export_issues(1, {}, "csv", chunk_size=1)) == whole
+
+
+def test_unknown_format_is_refused(owner):
+    assert owner.get("/projects/1/issues/export?format=xml").status_code == 400
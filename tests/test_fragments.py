@@ -0,0 +1,22 @@
+from app.querycount import count_queries
+
+
+def test_issue_timeline_fragment(owner):
+    owner.post("/issues/1", data={"content": "First comment"})
+    with count_queries() as miss:
+        first = owner.get("/issues/1")
+    with count_queries() as hit:
+        second = owner.get("/issues/1")
+    assert b"First comment" in first.data
+    assert b"First comment" in second.data
+    assert hit.count < miss.count
+
+
+def test_evicted_timeline_is_rendered_not_emptied(app, owner):
+    owner.post("/issues/1", data={"content": "First comment"})
+    owner.get("/issues/1")
+    with app.app_context():
+        app.extensions["fragments"]["backend"].cache.clear()
+    response = owner.get("/issues/1")
+    assert b"First comment" in response.data
+    assert b"No activity yet." not in response.data
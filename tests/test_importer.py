@@ -0,0 +1,55 @@
+from sqlalchemy import select
+
+from app import db
+from app.importer import Importer
+from app.models import Activity, Comment, Issue
+from app.querycount import count_queries
+
+
+def records(count):
+    for n in range(count):
+        yield {
+            "project": "Imported", "title": f"Issue {n}", "reporter": f"user{n % 5}", "assignee": "user0",
+            "comments": [{"user": "user1", "content": f"comment on {n}"}],
+        }
+
+
+def test_import_batches_issue_inserts(app):
+    with app.app_context():
+        with count_queries() as counter:
+            imported = Importer("test", chunk_size=25).run(records(50))
+        assert imported == 50
+        inserts = [s for s in counter.statements if s.startswith("INSERT INTO issue ")]
+        # one per chunk, not one per issue
+        assert len(inserts) == 2
+        assert counter.count < 40
+
+        # every comment and activity row belongs to its own issue
+        for issue in Issue.query:
+            n = issue.title.split()[-1]
+            assert [c.content for c in Comment.query.filter_by(issue_id=issue.id)] == [f"comment on {n}"]
+            assert Activity.query.filter_by(issue_id=issue.id, action="Created").one().detail == f"Issue '{issue.title}' created."
+
+
+def test_import_continues_after_existing_issues(app, owner):
+    with app.app_context():
+        Importer("test").run(records(3))
+        assert db.session.scalars(select(Issue.id).order_by(Issue.id)).all() == [1, 2, 3, 4, 5, 6]
+
+
+def test_import_indexes_only_its_issues(app, owner, monkeypatch):
+    from app.search import search
+
+    def rebuild():
+        raise AssertionError("an import should not re-index the whole database")
+
+    monkeypatch.setattr(search, "rebuild", rebuild)
+    with app.app_context():
+        with count_queries() as counter:
+            Importer("test", chunk_size=2).run(records(3))
+        # the rows of the issues the chunk inserted, never the whole table
+        assert [s for s in counter.statements if s.startswith("DELETE FROM issue_search")] == [
+            "DELETE FROM issue_search WHERE rowid IN (?, ?)", "DELETE FROM issue_search WHERE rowid IN (?)",
+        ]
+        found = search.apply(Issue.query, "comment on")
+        assert sorted(issue.id for issue in found) == [4, 5, 6]
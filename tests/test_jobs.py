@@ -0,0 +1,36 @@
+from datetime import timedelta
+
+from app import db
+from app.jobs import Task, jobs
+from app.models import Job, ist_now
+
+
+def test_backlog_warns_when_no_worker_runs(app, caplog):
+    app.config["JOBS_INLINE"] = False
+    with app.app_context():
+        jobs.enqueue("search.index_issue", issue_id=1)
+        db.session.commit()
+        assert jobs.backlog()[0] == 1
+        db.session.execute(db.update(Job).values(run_at=ist_now() - timedelta(hours=1)))
+        db.session.commit()
+        count, age = jobs.backlog()
+    assert count == 1 and age >= 3600
+
+    app.config["METRICS_TOKEN"] = "secret"
+    metrics = app.test_client().get("/metrics", headers={"Authorization": "Bearer secret"})
+    assert b"bugtracker_jobs_due 1" in metrics.data
+    assert "flask jobs work" in caplog.text
+
+
+def test_inline_jobs_run_after_commit(app, monkeypatch):
+    ran = []
+    monkeypatch.setitem(jobs.tasks, "test.record", Task("test.record", lambda n: ran.append(n), None))
+    with app.app_context():
+        jobs.enqueue("test.record", n=1)
+        db.session.rollback()
+        jobs.enqueue("test.record", n=2)
+        assert ran == []
+        db.session.commit()
+        # not inside the commit either, but once the app context ends
+        assert ran == []
+    assert ran == [2]
@@ -0,0 +1,57 @@
+import os
+import time
+
+import pytest
+
+from app.metrics import _write, combine, mark_process_dead, registry, requests_total
+
+
+def scrape(app, token="secret"):
+    app.config["METRICS_TOKEN"] = token
+    return app.test_client().get("/metrics", headers={"Authorization": f"Bearer {token}"})
+
+
+def test_metrics_need_a_token(app, client):
+    assert client.get("/metrics").status_code == 404
+    app.config["METRICS_TOKEN"] = "secret"
+    assert client.get("/metrics").status_code == 401
+    assert client.get("/metrics", headers={"Authorization": "Bearer secret"}).status_code == 200
+
+
+def test_unhandled_errors_are_counted(app, client):
+    def boom():
+        raise RuntimeError("boom")
+
+    app.add_url_rule("/boom", "boom", boom)
+    key = (("endpoint", "boom"), ("method", "GET"), ("status", 500))
+    before = requests_total.snapshot().get(key, 0)
+    with pytest.raises(RuntimeError):
+        client.get("/boom")
+    assert requests_total.snapshot()[key] == before + 1
+
+
+def test_scrape_sums_every_worker(app, tmp_path):
+    directory = tmp_path / "metrics"
+    directory.mkdir()
+    key = (("endpoint", "index"), ("method", "GET"), ("status", 200))
+    # two other workers, one of which has since exited
+    _write(directory / "1000001.json", {requests_total.name: {key: 5}})
+    _write(directory / "1000002.json", {requests_total.name: {key: 7}})
+    mark_process_dead(directory, 1000002)
+    assert sorted(os.listdir(directory)) == ["1000001.json", "dead.json"]
+
+    app.config["METRICS_DIR"] = str(directory)
+    ours = requests_total.snapshot().get(key, 0)
+    response = scrape(app)
+    assert f'bugtracker_requests_total{{endpoint="index",method="GET",status="200"}} {ours + 12}' in response.text
+    assert f'bugtracker_identity_cache_size{{pid="{os.getpid()}"}}' in response.text
+    assert combine(directory)[requests_total.name][key] == ours + 12
+
+
+def test_writer_thread_stops(tmp_path):
+    registry.start_writer(tmp_path, 0.01)
+    writer = registry._writer
+    while not os.path.exists(tmp_path / f"{os.getpid()}.json"):
+        time.sleep(0.01)
+    registry.stop_writer()
+    assert not writer.is_alive()
@@ -0,0 +1,55 @@
+import threading
+
+from conftest import login, make_app, register
+
+from app.models import User
+
+
+def password_hash(app, username="owner"):
+    with app.app_context():
+        return User.query.filter_by(username=username).one().password_hash
+
+
+def test_login_moves_the_hash_to_the_configured_method(app, client):
+    register(client, "owner")
+    assert password_hash(app).startswith("pbkdf2:sha256:1000$")
+
+    app.config["PASSWORD_HASH_METHOD"] = "pbkdf2:sha256:2000"
+    client.post("/login", data={"email": "owner@example.com", "password": "wrong"})
+    assert password_hash(app).startswith("pbkdf2:sha256:1000$")
+    login(client, "owner")
+    rehashed = password_hash(app)
+    assert rehashed.startswith("pbkdf2:sha256:2000$")
+
+    client.get("/logout")
+    login(client, "owner")
+    assert password_hash(app) == rehashed
+
+
+def test_logins_past_the_backlog_get_503(tmp_path):
+    app = make_app(tmp_path, PASSWORD_CHECK_THREADS=1, PASSWORD_CHECK_BACKLOG=0)
+    client = app.test_client()
+    register(client, "owner")
+
+    slots = app.extensions["passwords"]["slots"]
+    slots.acquire()
+    response = client.post("/login", data={"email": "owner@example.com", "password": "pw"})
+    assert response.status_code == 503 and response.headers["Retry-After"] == "1"
+    slots.release()
+    login(client, "owner")
+
+
+def test_slow_checks_time_out_with_503(tmp_path):
+    app = make_app(tmp_path, PASSWORD_CHECK_THREADS=1, PASSWORD_CHECK_BACKLOG=1, PASSWORD_CHECK_TIMEOUT=0.05)
+    client = app.test_client()
+    register(client, "owner")
+
+    # the only check thread is busy, so this login waits its turn past the timeout
+    busy = threading.Event()
+    app.extensions["passwords"]["pool"].submit(busy.wait)
+    try:
+        response = client.post("/login", data={"email": "owner@example.com", "password": "pw"})
+        assert response.status_code == 503
+    finally:
+        busy.set()
+    login(client, "owner")
@@ -0,0 +1,35 @@
+"""The budgeted views stay within their query budgets; under TESTING
+query_budget raises QueryBudgetExceeded, which fails the request."""
+from app import db
+from app.models import Activity, Issue
+
+
+def edit_form(**changes):
+    return {"title": "Issue 1", "description": "text", "priority": "Medium", "status": "Open",
+            "assignee_id": "", "due_date": "", **changes}
+
+
+def test_project_issues(owner):
+    assert owner.get("/projects/1/issues").status_code == 200
+    assert owner.get("/projects/1/issues?status=Open&priority=Medium").status_code == 200
+    assert owner.get("/projects/1/issues?q=issue").status_code == 200
+
+
+def test_issue_edit(app, owner):
+    assert owner.get("/issues/1/edit").status_code == 200
+    response = owner.post("/issues/1/edit", data=edit_form(
+        title="Renamed", description="new", priority="High", status="In Progress", assignee_id="1",
+        due_date="2030-01-01",
+    ))
+    assert response.status_code == 302
+    with app.app_context():
+        assert db.session.get(Issue, 1).title == "Renamed"
+        assert Activity.query.filter_by(issue_id=1, action="Updated").count() == 6
+
+
+def test_my_issue_list(owner):
+    owner.post("/issues/1/edit", data=edit_form(assignee_id="1"))
+    for view in ("active", "all", "Closed"):
+        response = owner.get(f"/my-issues?view={view}")
+        assert response.status_code == 200
+    assert b"Issue 1" in owner.get("/my-issues").data
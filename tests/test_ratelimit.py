@@ -0,0 +1,65 @@
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.pool import QueuePool
+
+from conftest import login, make_app, register
+
+from app.ratelimit import _pool_saturated, limiter
+
+
+@pytest.fixture
+def limited(tmp_path_factory):
+    """Build a logged-in client of a new app with limiting on and config."""
+    def build(**config):
+        app = make_app(tmp_path_factory.mktemp("app"), RATELIMIT_ENABLED=True, **config)
+        client = app.test_client()
+        register(client, "owner")
+        login(client, "owner")
+        client.post("/projects/new", data={"name": "Tracker", "description": ""})
+        return client
+    return build
+
+
+def test_spent_budget_gets_429_with_retry_after(limited):
+    client = limited(RATELIMIT_WRITE="3/minute")
+    # the project above was the first write
+    for n in range(2):
+        assert client.post("/projects/1/issues/new", data={"title": f"Issue {n}"}).status_code == 302
+    response = client.post("/projects/1/issues/new", data={"title": "One too many"})
+    assert response.status_code == 429
+    assert 1 <= int(response.headers["Retry-After"]) <= 60
+    # reads are not limited
+    assert client.get("/projects/1/issues").status_code == 200
+
+
+def test_deep_pages_cost_more(limited):
+    client = limited(RATELIMIT_SEARCH="3/minute")
+    # page 11 is two steps of five pages past the first, so it costs three
+    assert client.get("/projects/1/issues?q=x&page=11").status_code == 200
+    assert client.get("/projects/1/issues?q=x").status_code == 429
+
+    client = limited(RATELIMIT_SEARCH="3/minute")
+    for _ in range(3):
+        assert client.get("/projects/1/issues?q=x").status_code == 200
+
+
+def test_requests_past_the_in_flight_limit_are_shed(limited):
+    client = limited(SHED_MAX_IN_FLIGHT=2)
+    limiter._in_flight += 2
+    try:
+        response = client.get("/projects/1/issues")
+        assert response.status_code == 503 and response.headers["Retry-After"] == "1"
+        # exempt endpoints are never shed
+        assert client.get("/static/events.js").status_code == 200
+    finally:
+        limiter._in_flight -= 2
+    assert client.get("/projects/1/issues").status_code == 200
+    assert limiter._in_flight == 0
+
+
+def test_pool_saturation(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'pool.db'}", poolclass=QueuePool, pool_size=1, max_overflow=0)
+    assert not _pool_saturated(engine)
+    with engine.connect():
+        assert _pool_saturated(engine)
+    assert not _pool_saturated(engine)
@@ -0,0 +1,78 @@
+import pytest
+from flask_migrate import upgrade
+from sqlalchemy import text
+
+from app import create_app, db
+from app.models import Issue
+from app.search import search
+
+
+def test_migration_indexes_existing_issues(tmp_path):
+    app = create_app({"TESTING": True, "SQLALCHEMY_DATABASE_URI": f"sqlite:///{tmp_path / 'old.db'}"})
+    with app.app_context():
+        # a database from before search, with an issue and a comment on it
+        upgrade(revision="e1c86f2b47e6")
+        db.session.execute(text(
+            "INSERT INTO user (id, username, email, password_hash) VALUES (1, 'old', 'old@example.com', 'x')"))
+        db.session.execute(text(
+            "INSERT INTO project (id, name, created_at, owner_id) VALUES (1, 'Old', '2025-01-01', 1)"))
+        db.session.execute(text(
+            "INSERT INTO issue (id, title, status, priority, project_id, reporter_id) "
+            "VALUES (1, 'Crash on start', 'Open', 'Medium', 1, 1)"))
+        db.session.execute(text(
+            "INSERT INTO comment (issue_id, user_id, content) VALUES (1, 1, 'segfault in the loader')"))
+        db.session.commit()
+
+        upgrade()
+        assert [issue.id for issue in search.apply(Issue.query, "segfault")] == [1]
+
+
+def search_ids(app, q):
+    with app.app_context():
+        return [issue.id for issue in search.apply(Issue.query.filter_by(project_id=1), q)]
+
+
+def new_issue(client, title, description=""):
+    client.post("/projects/1/issues/new", data={"title": title, "description": description})
+
+
+def test_tokens_match_as_prefixes(app, owner):
+    new_issue(owner, "Authentication fails")
+    assert search_ids(app, "auth") == [4]
+    assert search_ids(app, "AUTHENTICATION fail") == [4]
+    assert search_ids(app, "authx") == []
+
+
+@pytest.mark.parametrize("q, found", [
+    ('"auth', [4]),
+    ("auth*", [4]),
+    ("*", []),
+    ('"', []),
+    ("NEAR(auth fails)", []),
+    ("auth NEAR fails", []),
+    ("title:auth", []),
+    ("-auth OR fails", []),
+    ("auth'; DROP TABLE issue; --", []),
+])
+def test_query_syntax_in_input_is_inert(app, owner, q, found):
+    new_issue(owner, "Authentication fails")
+    assert search_ids(app, q) == found
+    assert owner.get("/projects/1/issues", query_string={"q": q}).status_code == 200
+
+
+def test_title_ranks_above_description_above_comments(app, owner):
+    # created in the opposite order, so id order would not pass
+    new_issue(owner, "Hang")
+    owner.post("/issues/4", data={"content": "parser"})
+    new_issue(owner, "Crash", "parser")
+    new_issue(owner, "Parser")
+    assert search_ids(app, "parser") == [6, 5, 4]
+
+
+def test_edits_and_comments_refresh_the_index(app, owner):
+    owner.post("/issues/1/edit", data={"title": "Zebra", "description": "text", "priority": "Medium",
+                                       "status": "Open", "assignee_id": "", "due_date": ""})
+    assert search_ids(app, "zebra") == [1]
+    assert 1 not in search_ids(app, "issue")
+    owner.post("/issues/2", data={"content": "quokka sighting"})
+    assert search_ids(app, "quokka") == [2]